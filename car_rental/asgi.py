@@ -3,6 +3,12 @@ ASGI config for car_rental project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve checkout through this entry point (e.g. ``uvicorn car_rental.asgi:application``):
+the payment views are async, so a slow card authorization waits on the event
+loop instead of occupying a worker. ``settings.PAYMENT_GATEWAY`` selects the
+processor; the bundled simulator takes latency and failure rates from the
+``PAYMENT_SIM_*`` environment variables for offline load tests.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
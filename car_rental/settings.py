@@ -63,9 +63,34 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Reservations and payments take the write lock at BEGIN per
+            # transaction (cars.locking.write_transaction); writers wait
+            # this many seconds for it instead of failing at once.
+            'timeout': 20,
+        },
+        # A file-backed test database, unlike the shared-cache in-memory
+        # default, honours the busy timeout under concurrent writers.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Cache
+# Version stamps (availability, fleet and card caches), the review feed head and
+# review rate limits live here, so every worker process must share it. LocMem is
+# per process and only suits a single-process runserver; set CACHE_BACKEND and
+# CACHE_LOCATION (e.g. django.core.cache.backends.redis.RedisCache and
+# redis://127.0.0.1:6379) when running several workers. `check --deploy` warns
+# while a per-process cache is configured (cars.W001).
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+}
+
 # Password validators
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -96,6 +121,48 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@carrentaldemo.com'
 CONTACT_EMAIL = 'admin@carrentaldemo.com'
 
+# Outbound mail is queued in the database and delivered by `manage.py send_queued_mail`;
+# failed sends are retried after MAIL_QUEUE_RETRY_SECONDS, doubling each attempt
+MAIL_QUEUE_BATCH_SIZE = 50
+MAIL_QUEUE_MAX_ATTEMPTS = 8
+MAIL_QUEUE_RETRY_SECONDS = 30
+
+# Unpaid bookings hold the car for this long before the reaper releases them
+BOOKING_HOLD_MINUTES = 15
+
+# Card processor used by the payment views. The simulator's latency (seconds)
+# and failure/decline rates can be raised to load-test checkout offline.
+PAYMENT_GATEWAY = {
+    'BACKEND': 'cars.payments.SimulatedGateway',
+    'OPTIONS': {
+        'latency': float(os.environ.get('PAYMENT_SIM_LATENCY', '0')),
+        'jitter': float(os.environ.get('PAYMENT_SIM_JITTER', '0')),
+        'failure_rate': float(os.environ.get('PAYMENT_SIM_FAILURE_RATE', '0')),
+        'decline_rate': float(os.environ.get('PAYMENT_SIM_DECLINE_RATE', '0')),
+    },
+}
+
+# Render receipt PDFs on a background thread after the HTML receipt is stored
+RECEIPT_PDF_IN_BACKGROUND = True
+
+# Each client (user, or IP address when anonymous) may post this many reviews per window (seconds)
+REVIEW_RATE_LIMIT = 5
+REVIEW_RATE_WINDOW = 600
+
+# Chatbot intent model built by `manage.py train_intents`; keyword matching is used while it is missing
+CHATBOT_INTENT_MODEL = BASE_DIR / 'chatbot' / 'data' / 'intent_model.npz'
+
+# Per-chat context for follow-up questions, kept out of the DB session. The local
+# store is a bounded LRU per process; use chatbot.conversations.CacheConversationStore
+# with a shared cache alias when running several workers.
+CHATBOT_CONVERSATIONS = {
+    'BACKEND': 'chatbot.conversations.LocalConversationStore',
+    'OPTIONS': {
+        'max_conversations': int(os.environ.get('CHATBOT_MAX_CONVERSATIONS', '10000')),
+        'ttl': int(os.environ.get('CHATBOT_CONVERSATION_TTL', '1800')),
+    },
+}
+
 # Default primary key
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from cars.models import Car, CarImage, Booking, Review
+from django.utils import timezone
+from cars.models import Car, CarImage, Booking, BookingGroup, OutboundEmail, PricingRule, Review
+from cars.exports import streaming_export
+from cars.search import search_filter
 
 class CarImageInline(admin.TabularInline):
     model = CarImage
@@ -11,6 +14,12 @@ class CarAdmin(admin.ModelAdmin):
     search_fields = ['name', 'brand', 'location']
     inlines = [CarImageInline]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Served from the FTS5 index instead of LIKE '%term%' scans
+        if not search_term:
+            return queryset, False
+        return queryset.filter(search_filter(search_term)), False
+
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'brand', 'year', 'description')
@@ -19,7 +28,7 @@ class CarAdmin(admin.ModelAdmin):
             'fields': ('price_per_day', 'available')
         }),
         ('Car Details', {
-            'fields': ('seats', 'location')
+            'fields': ('seats', 'location', 'latitude', 'longitude')
         }),
         ('Images', {
             'fields': ('main_image',)
@@ -31,6 +40,39 @@ class ReviewAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['name', 'comment']
 
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ['id', 'customer_name', 'car', 'start_date', 'end_date', 'total_amount', 'is_paid', 'created_at']
+    list_filter = ['is_paid', 'start_date']
+    list_select_related = ['car']
+    search_fields = ['customer_name', 'customer_email']
+    date_hierarchy = 'start_date'
+    actions = ['export_csv', 'export_jsonl']
+
+    @admin.action(description='Export selected bookings with payments (CSV)')
+    def export_csv(self, request, queryset):
+        return streaming_export(queryset, 'csv')
+
+    @admin.action(description='Export selected bookings with payments (JSONL)')
+    def export_jsonl(self, request, queryset):
+        return streaming_export(queryset, 'jsonl')
+
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'multiplier', 'brand', 'start_date', 'end_date', 'min_days', 'min_utilisation', 'active']
+    list_filter = ['kind', 'active']
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'to']
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        queryset.exclude(status=OutboundEmail.SENT).update(status=OutboundEmail.PENDING, attempts=0, next_attempt_at=timezone.now())
+
 admin.site.register(Car, CarAdmin)
-admin.site.register(Booking)
+admin.site.register(Booking, BookingAdmin)
+admin.site.register(BookingGroup)
 admin.site.register(Review, ReviewAdmin)
+admin.site.register(PricingRule, PricingRuleAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
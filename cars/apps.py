@@ -1,6 +1,12 @@
 # cars/apps.py
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class CarsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'cars'  # Should be just 'cars'
\ No newline at end of file
+    name = 'cars'  # Should be just 'cars'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registers the system checks)
+        from . import signals
+        post_migrate.connect(signals.install_search_index, sender=self)
@@ -0,0 +1,222 @@
+from bisect import bisect_left, insort
+import random
+import threading
+
+from django.core.cache import cache
+from django.utils import timezone
+
+# Every booking change takes the next number of the sequence and is logged
+# under it with the id of the car it touched
+SEQUENCE_KEY = 'cars:availability:sequence'
+CHANGE_KEY = 'cars:availability:change:{}'
+CHANGE_TTL = 24 * 60 * 60
+# A process further behind than this reloads everything instead of replaying
+MAX_REPLAY = 1000
+
+
+class CarIntervals:
+    """Sorted, half-open [start, end) booking intervals for a single car.
+
+    Confirmed bookings live in a sorted list with a prefix max of end dates.
+    Unpaid holds are few and short-lived, so they sit in a plain list and are
+    dropped lazily once their TTL has passed.
+    """
+
+    def __init__(self):
+        self.intervals = []
+        self.starts = []
+        self.max_ends = []
+        self.holds = []
+
+    def _reindex(self):
+        self.starts = [start for start, _, _ in self.intervals]
+        self.max_ends = []
+        running = None
+        for _, end, _ in self.intervals:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def add(self, start, end, booking_id, expires_at=None):
+        if expires_at is None:
+            insort(self.intervals, (start, end, booking_id))
+            self._reindex()
+        else:
+            self.holds.append((start, end, booking_id, expires_at))
+
+    def remove(self, booking_id):
+        before = len(self.intervals)
+        self.intervals = [i for i in self.intervals if i[2] != booking_id]
+        if len(self.intervals) != before:
+            self._reindex()
+        self.holds = [h for h in self.holds if h[2] != booking_id]
+
+    def overlaps(self, start, end, now=None):
+        # Every interval left of ``i`` starts before ``end``; the prefix max of
+        # their ends tells us in O(log n) whether any of them reaches ``start``.
+        i = bisect_left(self.starts, end)
+        if i > 0 and self.max_ends[i - 1] > start:
+            return True
+        if self.holds:
+            now = now or timezone.now()
+            self.holds = [h for h in self.holds if h[3] > now]
+            return any(h[0] < end and h[1] > start for h in self.holds)
+        return False
+
+    def booking_ids(self):
+        return [i[2] for i in self.intervals] + [h[2] for h in self.holds]
+
+    def __len__(self):
+        return len(self.intervals) + len(self.holds)
+
+
+class AvailabilityIndex:
+    """In-memory per-car interval index of bookings.
+
+    The index is loaded lazily from the database and kept current by the
+    Booking signals in ``cars.signals``. Each change is published in the
+    cache as the next number of a sequence together with its car id; other
+    worker processes replay the changes they missed by reloading just those
+    cars, and only reload everything when they fall too far behind or the
+    log has been evicted. That needs a cache shared by all workers (see the
+    CACHES setting and the cars.W001 deploy check). Callers treat the index
+    as advisory and confirm a conflict with the database before refusing a
+    booking.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cars = {}
+        self._bookings = {}
+        self._sequence = None
+        self._loaded = False
+
+    def blocking_bookings(self):
+        from .models import Booking
+        return Booking.objects.filter(Booking.blocking_q())
+
+    def _read(self, car_ids=None):
+        """Return ({car_id: CarIntervals}, {booking_id: car_id}) from the database."""
+        rows = self.blocking_bookings()
+        if car_ids is not None:
+            rows = rows.filter(car_id__in=car_ids)
+        rows = rows.values_list('id', 'car_id', 'start_date', 'end_date', 'is_paid', 'hold_expires_at')
+        cars = {}
+        bookings = {}
+        for booking_id, car_id, start, end, is_paid, expires_at in rows.iterator(chunk_size=2000):
+            intervals = cars.setdefault(car_id, CarIntervals())
+            if is_paid or expires_at is None:
+                intervals.intervals.append((start, end, booking_id))
+            else:
+                intervals.holds.append((start, end, booking_id, expires_at))
+            bookings[booking_id] = car_id
+        for intervals in cars.values():
+            intervals.intervals.sort()
+            intervals._reindex()
+        return cars, bookings
+
+    def load(self):
+        # Read the sequence first: changes committed during the load are replayed later
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        cars, bookings = self._read()
+        with self._lock:
+            self._cars = cars
+            self._bookings = bookings
+            self._sequence = sequence
+            self._loaded = True
+
+    def reset(self):
+        with self._lock:
+            self._cars = {}
+            self._bookings = {}
+            self._sequence = None
+            self._loaded = False
+
+    def refresh(self, car_ids):
+        """Reload the bookings of ``car_ids`` from the database, leaving other cars alone."""
+        car_ids = set(car_ids)
+        cars, bookings = self._read(car_ids)
+        with self._lock:
+            if not self._loaded:
+                return
+            for car_id in car_ids:
+                intervals = self._cars.pop(car_id, None)
+                for booking_id in intervals.booking_ids() if intervals else []:
+                    self._bookings.pop(booking_id, None)
+            # A booking moved here from another car leaves that car too
+            for booking_id in bookings:
+                self._discard(booking_id)
+            self._cars.update(cars)
+            self._bookings.update(bookings)
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            self.load()
+            return
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        if sequence == self._sequence:
+            return
+        behind = sequence - self._sequence
+        changes = {}
+        if 0 < behind <= MAX_REPLAY:
+            changes = cache.get_many([CHANGE_KEY.format(n) for n in range(self._sequence + 1, sequence + 1)])
+        if len(changes) != behind:
+            # Too far behind, or the sequence or part of the log was evicted
+            self.load()
+            return
+        self.refresh(changes.values())
+        self._sequence = sequence
+
+    def _publish(self, car_id):
+        # A fresh sequence starts at a random number, so a process that read
+        # an evicted one never mistakes the new one for the stamp it holds
+        cache.add(SEQUENCE_KEY, random.randrange(1 << 40), timeout=None)
+        try:
+            sequence = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            self._loaded = False
+            return
+        cache.set(CHANGE_KEY.format(sequence), car_id, timeout=CHANGE_TTL)
+        # Our own change is applied already; anyone else's is replayed later
+        if self._sequence is not None and sequence == self._sequence + 1:
+            self._sequence = sequence
+
+    def add(self, booking_id, car_id, start, end, expires_at=None):
+        """Index a booking; pass ``expires_at`` for an unpaid hold."""
+        with self._lock:
+            if self._loaded:
+                self._discard(booking_id)
+                self._cars.setdefault(car_id, CarIntervals()).add(start, end, booking_id, expires_at)
+                self._bookings[booking_id] = car_id
+            self._publish(car_id)
+
+    def remove(self, booking_id, car_id):
+        with self._lock:
+            if self._loaded:
+                self._discard(booking_id)
+            self._publish(car_id)
+
+    def _discard(self, booking_id):
+        car_id = self._bookings.pop(booking_id, None)
+        if car_id is None:
+            return
+        intervals = self._cars.get(car_id)
+        if intervals is not None:
+            intervals.remove(booking_id)
+            if not intervals:
+                del self._cars[car_id]
+
+    def is_available(self, car_id, start, end):
+        with self._lock:
+            self._ensure_fresh()
+            intervals = self._cars.get(car_id)
+            return intervals is None or not intervals.overlaps(start, end)
+
+    def booked_car_ids(self, start, end):
+        """Return the ids of cars with a booking overlapping [start, end)."""
+        now = timezone.now()
+        with self._lock:
+            self._ensure_fresh()
+            return {car_id for car_id, intervals in self._cars.items() if intervals.overlaps(start, end, now)}
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,105 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .locking import write_transaction
+from .models import BookedDays, Booking
+
+# 366 bits, so leap years fit; bit n is day-of-year n + 1
+YEAR_BYTES = 46
+
+
+def day_index(day):
+    return day.timetuple().tm_yday - 1
+
+
+def year_spans(start, end):
+    """Yield (year, first, stop) day-index ranges covering [start, end)."""
+    day = start
+    while day < end:
+        stop = min(end, date(day.year + 1, 1, 1))
+        yield day.year, day_index(day), day_index(stop - timedelta(days=1)) + 1
+        day = stop
+
+
+def set_range(bitmap, first, stop, value=True):
+    for i in range(first, stop):
+        if value:
+            bitmap[i >> 3] |= 1 << (i & 7)
+        else:
+            bitmap[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+
+def is_set(bitmap, i):
+    return bool(bitmap[i >> 3] & (1 << (i & 7)))
+
+
+def _write(car_id, start, end, booked):
+    """Rewrite the bits for [start, end) so exactly the ``booked`` ranges are set."""
+    by_year = defaultdict(list)
+    for b_start, b_end in booked:
+        for year, first, stop in year_spans(max(b_start, start), min(b_end, end)):
+            by_year[year].append((first, stop))
+
+    with write_transaction():
+        for year, first, stop in year_spans(start, end):
+            row = BookedDays.objects.select_for_update().filter(car_id=car_id, year=year).first()
+            if row is None and not by_year[year]:
+                continue
+            bitmap = bytearray(row.days if row else bytes(YEAR_BYTES))
+            set_range(bitmap, first, stop, False)
+            for b_first, b_stop in by_year[year]:
+                set_range(bitmap, b_first, b_stop)
+            if row is None:
+                BookedDays.objects.create(car_id=car_id, year=year, days=bytes(bitmap))
+            else:
+                row.days = bytes(bitmap)
+                row.save(update_fields=['days'])
+
+
+def mark(car_id, start, end):
+    """Set the days of a new booking; needs no Booking query."""
+    _write(car_id, start, end, [(start, end)])
+
+
+def refresh(car_id, start, end):
+    """Recompute [start, end) from the bookings that still block it.
+
+    Used when a booking is moved, released or deleted, since another booking
+    may share a day with it (e.g. a lapsed hold that was booked over).
+    """
+    booked = Booking.objects.filter(
+        Booking.blocking_q(), car_id=car_id, start_date__lt=end, end_date__gt=start,
+    ).values_list('start_date', 'end_date')
+    _write(car_id, start, end, list(booked))
+
+
+def booked_dates(car_id, start, end):
+    """Return the booked days in [start, end) from the stored bitmaps, in one query."""
+    rows = dict(
+        BookedDays.objects.filter(car_id=car_id, year__gte=start.year, year__lte=(end - timedelta(days=1)).year)
+        .values_list('year', 'days')
+    )
+    days = []
+    for year, first, stop in year_spans(start, end):
+        bitmap = rows.get(year)
+        if bitmap is None:
+            continue
+        jan1 = date(year, 1, 1)
+        days.extend(jan1 + timedelta(days=i) for i in range(first, stop) if is_set(bitmap, i))
+    return days
+
+
+def rebuild():
+    """Recompute every bitmap from the Booking table, e.g. after bulk updates."""
+    bitmaps = defaultdict(lambda: bytearray(YEAR_BYTES))
+    rows = Booking.objects.filter(Booking.blocking_q()).values_list('car_id', 'start_date', 'end_date')
+    for car_id, start, end in rows.iterator(chunk_size=2000):
+        for year, first, stop in year_spans(start, end):
+            set_range(bitmaps[(car_id, year)], first, stop)
+    with transaction.atomic():
+        BookedDays.objects.all().delete()
+        BookedDays.objects.bulk_create(
+            BookedDays(car_id=car_id, year=year, days=bytes(bitmap)) for (car_id, year), bitmap in bitmaps.items()
+        )
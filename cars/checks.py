@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends whose data is private to one process
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """The version stamps that keep in-process indexes and cached cards fresh must reach every worker."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is private to each process.",
+        hint=(
+            "Availability and fleet indexes, car card and detail caches, the review feed and "
+            "review rate limits are only invalidated in the process that made the change. "
+            "Set CACHE_BACKEND/CACHE_LOCATION to a shared cache such as Redis or Memcached."
+        ),
+        id='cars.W001',
+    )]
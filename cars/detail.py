@@ -0,0 +1,25 @@
+from django.core.cache import cache
+
+from . import fragments
+from .models import Car
+
+DETAIL_TIMEOUT = 60 * 60
+
+
+def car_detail_payload(car_id):
+    """Return {'car', 'images'} for the detail page, or None if the car does not exist.
+
+    On a warm cache this costs no database queries; on a miss it costs two
+    (the car and its prefetched gallery). The key includes the car's version
+    stamp, which Car and CarImage changes replace.
+    """
+    version = fragments.car_versions([car_id])[car_id]
+    key = f'cars:detail:{car_id}:{version}'
+    payload = cache.get(key)
+    if payload is None:
+        car = Car.objects.prefetch_related('images').filter(id=car_id).first()
+        if car is None:
+            return None
+        payload = {'car': car, 'images': list(car.images.all())}
+        cache.set(key, payload, DETAIL_TIMEOUT)
+    return payload
@@ -0,0 +1,89 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# (column, Booking lookup) pairs; payment__* columns are empty for unpaid bookings
+EXPORT_COLUMNS = [
+    ('booking_id', 'id'),
+    ('group_id', 'group_id'),
+    ('car_id', 'car_id'),
+    ('car', 'car__name'),
+    ('brand', 'car__brand'),
+    ('customer_name', 'customer_name'),
+    ('customer_email', 'customer_email'),
+    ('customer_phone', 'customer_phone'),
+    ('start_date', 'start_date'),
+    ('end_date', 'end_date'),
+    ('total_amount', 'total_amount'),
+    ('is_paid', 'is_paid'),
+    ('created_at', 'created_at'),
+    ('payment_amount', 'payment__amount'),
+    ('card_last4', 'payment__card_last4'),
+    ('gateway_reference', 'payment__gateway_reference'),
+    ('paid_at', 'payment__timestamp'),
+]
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one tuple per booking, joined to its payment, in id order.
+
+    Rows come from ``.iterator(chunk_size=...)`` so the whole export never
+    sits in memory; on PostgreSQL this uses a server-side cursor.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.order_by('id').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_lines(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for row in export_rows(queryset, chunk_size):
+        yield writer.writerow([_text(value) for value in row])
+
+
+def jsonl_lines(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    for row in export_rows(queryset, chunk_size):
+        record = {
+            column: value if value is None or isinstance(value, (bool, int)) else _text(value)
+            for column, value in zip(columns, row)
+        }
+        yield json.dumps(record) + '\n'
+
+
+def export_lines(queryset, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    if fmt == 'csv':
+        return csv_lines(queryset, chunk_size)
+    if fmt == 'jsonl':
+        return jsonl_lines(queryset, chunk_size)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def streaming_export(queryset, fmt):
+    """Return a StreamingHttpResponse download of ``queryset`` as CSV or JSONL."""
+    response = StreamingHttpResponse(export_lines(queryset, fmt), content_type=FORMATS[fmt])
+    filename = f"bookings-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
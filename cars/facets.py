@@ -0,0 +1,86 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Car, FacetCount
+
+# (field, label) pairs shown as filters on the public catalog
+FACETS = [
+    ('brand', 'Brand'),
+    ('year', 'Year'),
+    ('seats', 'Seats'),
+    ('location', 'Location'),
+]
+FACET_FIELDS = [field for field, _ in FACETS]
+
+
+def contribution(values):
+    """Return the (facet, value) pairs a car counts towards, given its field values."""
+    if not values or not values.get('available'):
+        return set()
+    return {(field, str(values[field])) for field in FACET_FIELDS}
+
+
+def car_values(car):
+    return {field: getattr(car, field) for field in FACET_FIELDS + ['available']}
+
+
+def stored_values(car_id):
+    return Car.objects.filter(id=car_id).values(*FACET_FIELDS, 'available').first()
+
+
+def apply_delta(removed, added):
+    """Decrement the counts in ``removed`` and increment those in ``added``."""
+    for facet, value in removed - added:
+        FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') - 1)
+    for facet, value in added - removed:
+        if FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                FacetCount.objects.create(facet=facet, value=value, count=1)
+        except IntegrityError:
+            FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + 1)
+
+
+def rebuild():
+    """Recompute every count from the Car table, e.g. after bulk updates."""
+    counts = Counter()
+    for values in Car.objects.filter(available=True).values(*FACET_FIELDS).iterator(chunk_size=2000):
+        for field in FACET_FIELDS:
+            counts[(field, str(values[field]))] += 1
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(
+            FacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()
+        )
+
+
+def facet_counts():
+    """Return {facet: [(value, count), ...]} from the aggregate in one query."""
+    counts = {field: [] for field in FACET_FIELDS}
+    for facet, value, count in FacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count'):
+        if facet in counts:
+            counts[facet].append((value, count))
+    for field in ('year', 'seats'):
+        counts[field].sort(key=lambda item: int(item[0]))
+    return counts
+
+
+def selected_filters(params):
+    """Return {field: [values]} for the facet filters present in a QueryDict."""
+    selected = {}
+    for field in FACET_FIELDS:
+        values = [v for v in params.getlist(field) if v]
+        if field in ('year', 'seats'):
+            values = [v for v in values if v.isdigit()]
+        if values:
+            selected[field] = values
+    return selected
+
+
+def filter_cars(queryset, selected):
+    for field, values in selected.items():
+        queryset = queryset.filter(**{f'{field}__in': values})
+    return queryset
@@ -0,0 +1,101 @@
+import threading
+
+import numpy as np
+from django.core.cache import cache
+
+from . import fragments, geo
+from .availability import availability_index
+from .models import Car
+
+VERSION_KEY = 'cars:fleet:version'
+
+
+class FleetIndex:
+    """In-memory columns of the available catalog, for answering chat questions.
+
+    Loaded lazily in one query and kept as NumPy arrays, so a search is a few
+    vectorised comparisons and never touches the database. Car signals in
+    ``cars.signals`` replace a version stamp in the cache; every process
+    compares it with the stamp it loaded and reloads when they differ.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._loaded = False
+        self.cars = []
+
+    def load(self):
+        rows = list(
+            Car.objects.filter(available=True)
+            .order_by('price_per_day', 'id')
+            .values_list('id', 'brand', 'name', 'year', 'seats', 'location', 'price_per_day')
+        )
+        cars = []
+        for car_id, brand, name, year, seats, location, price in rows:
+            place = geo.resolve(location)
+            cars.append({
+                'id': car_id, 'brand': brand, 'name': name, 'year': year, 'seats': seats,
+                'location': location, 'place': place[0] if place else location, 'price': price,
+            })
+        with self._lock:
+            self.cars = cars
+            self.ids = np.array([c['id'] for c in cars], dtype=np.int64)
+            self.seats = np.array([c['seats'] for c in cars], dtype=np.int64)
+            self.prices = np.array([float(c['price']) for c in cars], dtype=np.float64)
+            self.brands = np.array([c['brand'].lower() for c in cars], dtype=object)
+            self.places = np.array([c['place'].lower() for c in cars], dtype=object)
+            self._version = cache.get(VERSION_KEY)
+            self._loaded = True
+
+    def reset(self):
+        with self._lock:
+            self.cars = []
+            self._version = None
+            self._loaded = False
+
+    def invalidate(self):
+        cache.set(VERSION_KEY, fragments.new_version(), timeout=None)
+        with self._lock:
+            self._loaded = False
+
+    def _ensure_fresh(self):
+        if not self._loaded or cache.get(VERSION_KEY) != self._version:
+            self.load()
+
+    def brand_names(self):
+        with self._lock:
+            self._ensure_fresh()
+            return {car['brand'] for car in self.cars}
+
+    def place_names(self):
+        with self._lock:
+            self._ensure_fresh()
+            return {car['place'] for car in self.cars}
+
+    def search(self, min_seats=None, max_price=None, brand=None, place=None, start=None, end=None):
+        """Return the matching cars (dicts), cheapest first.
+
+        ``brand`` and ``place`` are compared case-insensitively; with
+        ``start`` and ``end`` cars booked in [start, end) are left out, using
+        the in-memory availability index.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            mask = np.ones(len(self.cars), dtype=bool)
+            if min_seats is not None:
+                mask &= self.seats >= min_seats
+            if max_price is not None:
+                mask &= self.prices <= max_price
+            if brand:
+                mask &= self.brands == brand.lower()
+            if place:
+                mask &= self.places == place.lower()
+            if start and end:
+                booked = availability_index.booked_car_ids(start, end)
+                if booked:
+                    mask &= ~np.isin(self.ids, list(booked))
+            return [self.cars[i] for i in np.flatnonzero(mask)]
+
+
+fleet_index = FleetIndex()
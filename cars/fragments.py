@@ -0,0 +1,56 @@
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'cars/car_card.html'
+CARD_TIMEOUT = 24 * 60 * 60
+
+
+def version_key(car_id):
+    return f'cars:version:{car_id}'
+
+
+def new_version():
+    # A fresh stamp rather than a counter, so a version evicted from the
+    # cache can never come back as an old number with a stale fragment.
+    return time.time_ns()
+
+
+def bump_version(car_id):
+    cache.set(version_key(car_id), new_version(), timeout=None)
+
+
+def car_versions(car_ids):
+    """Return {car_id: version stamp}; cached views of a car include its stamp in their key."""
+    keys = {version_key(car_id): car_id for car_id in car_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    missing = {key: new_version() for key, car_id in keys.items() if car_id not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update({keys[key]: version for key, version in missing.items()})
+    return versions
+
+
+def render_cards(cars):
+    """Return [(car, html)] with each card served from the fragment cache when possible.
+
+    A page costs two cache round trips (versions, then fragments) plus one
+    render per card that changed since it was last cached.
+    """
+    versions = car_versions([car.id for car in cars])
+    keys = {car.id: f'cars:card:{car.id}:{versions[car.id]}' for car in cars}
+    cached = cache.get_many(keys.values())
+    rendered = {}
+    cards = []
+    for car in cars:
+        html = cached.get(keys[car.id])
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {'car': car})
+            rendered[keys[car.id]] = html
+        cards.append((car, mark_safe(html)))
+    if rendered:
+        cache.set_many(rendered, timeout=CARD_TIMEOUT)
+    return cards
@@ -0,0 +1,165 @@
+import csv
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.db.models import Q
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_PRECISION = 9
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Search radii tried in turn when looking for the nearest N cars
+NEAREST_RADII_KM = [5, 15, 40, 100, 250, 600]
+
+
+# ===== GAZETTEER =====
+def normalize(text):
+    return ' '.join(re.findall(r'[a-z0-9]+', (text or '').lower()))
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    """Return {normalized place name or alias: (name, lat, lon)} from the bundled CSV."""
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            place = (row['name'], float(row['latitude']), float(row['longitude']))
+            for key in [row['name']] + [a for a in (row['aliases'] or '').split('|') if a]:
+                places[normalize(key)] = place
+    return places
+
+
+def resolve(location):
+    """Resolve free text such as "123 Main Street, Negombo" to (name, lat, lon).
+
+    Tries the whole string first, then the longest place name or alias that
+    appears in it as whole words. Returns None when nothing matches.
+    """
+    text = normalize(location)
+    if not text:
+        return None
+    places = gazetteer()
+    if text in places:
+        return places[text]
+    padded = f' {text} '
+    for key in sorted(places, key=len, reverse=True):
+        if f' {key} ' in padded:
+            return places[key]
+    return None
+
+
+# ===== GEOHASH GRID =====
+def _cell_bits(precision):
+    bits = 5 * precision
+    return (bits + 1) // 2, bits // 2  # longitude bits, latitude bits
+
+
+def _cell_size(precision):
+    lon_bits, lat_bits = _cell_bits(precision)
+    return 360.0 / (1 << lon_bits), 180.0 / (1 << lat_bits)
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bit, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[ch])
+            bit, ch = 0, 0
+    return ''.join(chars)
+
+
+def covering_cells(lat, lon, radius_km, max_cells=32):
+    """Return geohash prefixes whose cells together cover the search circle.
+
+    Uses the finest precision that needs at most ``max_cells`` cells for the
+    circle's bounding box, so each prefix becomes one index range scan.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * max(math.cos(math.radians(lat)), 0.01)))
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    west, east = max(lon - dlon, -180.0), min(lon + dlon, 180.0)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        width, height = _cell_size(precision)
+        cols = range(int((west + 180) // width), int((east + 180) // width) + 1)
+        rows = range(int((south + 90) // height), int((north + 90) // height) + 1)
+        if len(cols) * len(rows) <= max_cells or precision == 1:
+            return sorted({
+                encode(-90 + (r + 0.5) * height, -180 + (c + 0.5) * width, precision)
+                for r in rows for c in cols
+            })
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# ===== QUERIES =====
+def cells_q(prefixes):
+    condition = Q()
+    for prefix in prefixes:
+        # A range rather than startswith, so SQLite can use the geohash index
+        condition |= Q(geohash__gte=prefix, geohash__lt=prefix + '~')
+    return condition
+
+
+def _distances(queryset, lat, lon, radius_km):
+    """Return [(distance_km, car_id)] for cars within ``radius_km``, nearest first.
+
+    Only the id and coordinates of cars in the covering geohash cells are
+    read; the exact distance check runs on those.
+    """
+    candidates = queryset.filter(cells_q(covering_cells(lat, lon, radius_km))).values_list('id', 'latitude', 'longitude')
+    found = []
+    for car_id, car_lat, car_lon in candidates:
+        distance_km = haversine_km(lat, lon, car_lat, car_lon)
+        if distance_km <= radius_km:
+            found.append((distance_km, car_id))
+    found.sort()
+    return found
+
+
+def _load(queryset, found):
+    """The cars of ``found`` in that order, each with a ``distance_km`` attribute."""
+    cars = queryset.in_bulk([car_id for _, car_id in found])
+    for distance_km, car_id in found:
+        cars[car_id].distance_km = distance_km
+    return [cars[car_id] for _, car_id in found]
+
+
+def within(queryset, lat, lon, radius_km, limit=None):
+    """Return up to ``limit`` cars within ``radius_km`` of (lat, lon), nearest first.
+
+    Each car gets a ``distance_km`` attribute. Candidates are ranked on
+    their coordinates alone, so a wide radius only loads the ``limit``
+    cars returned.
+    """
+    return _load(queryset, _distances(queryset, lat, lon, radius_km)[:limit])
+
+
+def nearest(queryset, lat, lon, limit):
+    """Return the ``limit`` cars closest to (lat, lon) by widening the search circle."""
+    found = []
+    for radius_km in NEAREST_RADII_KM:
+        found = _distances(queryset, lat, lon, radius_km)
+        if len(found) >= limit:
+            break
+    return _load(queryset, found[:limit])
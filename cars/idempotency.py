@@ -0,0 +1,142 @@
+import asyncio
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.utils import timezone
+
+from .locking import write_transaction
+from .models import IdempotencyKey
+
+FIELD_NAME = 'idempotency_key'
+HEADER_NAME = 'HTTP_IDEMPOTENCY_KEY'
+KEY_TTL = timedelta(days=1)
+
+
+def request_key(request):
+    """Return the client token from the Idempotency-Key header or the form, if any."""
+    key = (request.META.get(HEADER_NAME) or request.POST.get(FIELD_NAME) or '').strip()
+    return key[:64] or None
+
+
+def form_key(request):
+    """Token for a rendered form: the one just posted (so a corrected resubmit
+    keeps it) or a fresh one."""
+    return (request.POST.get(FIELD_NAME) or '').strip()[:64] or uuid.uuid4().hex
+
+
+def stored_response(scope, key):
+    """Return (request path, redirect URL) stored for a token, or None."""
+    return IdempotencyKey.objects.filter(scope=scope, key=key).values_list('request_path', 'response_url').first()
+
+
+def replay(request, stored):
+    """Answer a repeated token with its stored redirect, unless it was used for another resource."""
+    if stored is None:
+        return redirect(request.path)
+    path, url = stored
+    # Tokens stored before paths were recorded have none and still replay
+    if path and path != request.path:
+        return HttpResponse(
+            "This idempotency key was already used for a different request.", status=409, content_type='text/plain',
+        )
+    return redirect(url or request.path)
+
+
+def idempotent(scope):
+    """Make a POST view that answers with a redirect safe to retry.
+
+    The first request with a given token claims it in the same transaction
+    as the view's writes (a ``write_transaction``, since the view's own
+    read-check-write blocks run nested in it) and stores the redirect it
+    returned; a replay costs
+    one lookup on the unique (scope, key) index and gets that redirect back.
+    The token is bound to the request path: reusing it for another booking
+    or car gets a 409 instead of the other resource's redirect.
+    Responses other than redirects (e.g. a form with errors) roll back the
+    claim, so the same token can be submitted again once the input is fixed.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return _async_idempotent(scope, view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request_key(request) if request.method == 'POST' else None
+            if key is None:
+                return view(request, *args, **kwargs)
+
+            stored = stored_response(scope, key)
+            if stored:
+                return replay(request, stored)
+            try:
+                # The view's own write_transaction() blocks are nested in this
+                # one, so this is where SQLite must take its write lock
+                with write_transaction():
+                    record = IdempotencyKey.objects.create(scope=scope, key=key, request_path=request.path)
+                    response = view(request, *args, **kwargs)
+                    if response.status_code in (301, 302, 303):
+                        record.response_url = response['Location']
+                        record.save(update_fields=['response_url'])
+                    else:
+                        transaction.set_rollback(True)
+            except IntegrityError:
+                # A concurrent request with the same token committed first
+                stored = stored_response(scope, key)
+                if not stored:
+                    raise
+                return replay(request, stored)
+            return response
+        return wrapper
+    return decorator
+
+
+def claim(scope, key, path):
+    """Return (claimed, stored (path, URL)) for a token, inserting it for ``path`` if new."""
+    stored = stored_response(scope, key)
+    if stored is not None:
+        return False, stored
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(scope=scope, key=key, request_path=path)
+    except IntegrityError:
+        return False, stored_response(scope, key)
+    return True, None
+
+
+def _async_idempotent(scope, view):
+    # An async view cannot keep a transaction open across its awaits, so the
+    # token is claimed up front and a concurrent duplicate is sent back to the
+    # page instead of repeating work (e.g. charging a card) still in flight.
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        key = request_key(request) if request.method == 'POST' else None
+        if key is None:
+            return await view(request, *args, **kwargs)
+
+        claimed, stored = await sync_to_async(claim)(scope, key, request.path)
+        if not claimed:
+            return replay(request, stored)
+        claims = IdempotencyKey.objects.filter(scope=scope, key=key)
+        try:
+            response = await view(request, *args, **kwargs)
+        except BaseException:
+            await claims.adelete()
+            raise
+        if response.status_code in (301, 302, 303):
+            await claims.aupdate(response_url=response['Location'])
+        else:
+            await claims.adelete()
+        return response
+    return wrapper
+
+
+def purge(now=None):
+    """Delete tokens older than ``KEY_TTL``; returns how many were removed."""
+    cutoff = (now or timezone.now()) - KEY_TTL
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,119 @@
+import email
+import socketserver
+import threading
+from collections import namedtuple
+
+Envelope = namedtuple('Envelope', 'sender recipients message')
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        sender, recipients = None, []
+        self.reply('220 localsmtp ready')
+        for raw in self.rfile:
+            line = raw.decode('latin-1').rstrip('\r\n')
+            command, _, argument = line.partition(' ')
+            command = command.upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command == 'MAIL':
+                sender, recipients = argument.split(':', 1)[1].strip().strip('<>'), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                address = argument.split(':', 1)[1].strip().strip('<>')
+                if address in server.refused:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = self.read_data()
+                with server.lock:
+                    failing = server.fail_next > 0
+                    if failing:
+                        server.fail_next -= 1
+                    else:
+                        server.messages.append(Envelope(sender, recipients, email.message_from_bytes(data)))
+                self.reply('451 Try again later' if failing else '250 OK')
+                sender, recipients = None, []
+            elif command == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+    def read_data(self):
+        lines = []
+        for raw in self.rfile:
+            if raw in (b'.\r\n', b'.\n'):
+                break
+            lines.append(raw[1:] if raw.startswith(b'..') else raw)
+        return b''.join(lines)
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """In-process SMTP stand-in that keeps what it receives in ``messages``.
+
+    Speaks just enough SMTP for smtplib. ``fail_next`` answers that many
+    DATA commands with a temporary 451 error and ``refused`` rejects
+    recipients, so delivery failures can be rehearsed. Use it as a context
+    manager; it listens on a free port of 127.0.0.1 by default.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.refused = set()
+        self.fail_next = 0
+        self.connections = 0
+        self._thread = None
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def email_settings(self):
+        """Settings that point Django's SMTP backend at this server."""
+        return {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': self.host,
+            'EMAIL_PORT': self.port,
+            'EMAIL_USE_TLS': False,
+            'EMAIL_USE_SSL': False,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='localsmtp', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
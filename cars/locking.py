@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+@contextmanager
+def write_transaction(using=DEFAULT_DB_ALIAS):
+    """``transaction.atomic()`` for read-check-write sequences such as reservations.
+
+    Other backends serialise these with the SELECT ... FOR UPDATE row locks
+    taken inside the block. SQLite ignores FOR UPDATE, so there the
+    outermost block starts with BEGIN IMMEDIATE and holds the database
+    write lock from the first read: every such block is serialised with
+    all other writers, whichever car it touches. Plain ``atomic()`` blocks
+    elsewhere keep SQLite's default deferred BEGIN.
+    """
+    connection = transaction.get_connection(using)
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        # Nested blocks run in the outer transaction's mode
+        with transaction.atomic(using=using):
+            yield
+        return
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
@@ -0,0 +1,134 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .locking import write_transaction
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_TEMPLATE = 'cars/emails/booking_confirmation.txt'
+# A claimed message is retried after this long if its worker dies mid-batch
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def batch_size():
+    return getattr(settings, 'MAIL_QUEUE_BATCH_SIZE', 50)
+
+
+def max_attempts():
+    return getattr(settings, 'MAIL_QUEUE_MAX_ATTEMPTS', 8)
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``: doubling from the base, capped at an hour."""
+    base = getattr(settings, 'MAIL_QUEUE_RETRY_SECONDS', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+# ===== QUEUEING =====
+def enqueue(subject, body, to, reply_to=''):
+    """Store a message for the worker; cheap, and part of the caller's transaction."""
+    return OutboundEmail.objects.create(
+        subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=','.join(to), reply_to=reply_to,
+    )
+
+
+def booking_confirmation(booking):
+    return OutboundEmail(
+        subject=f"Booking #{booking.id} confirmed",
+        body=render_to_string(CONFIRMATION_TEMPLATE, {'booking': booking}),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=booking.customer_email,
+    )
+
+
+def queue_booking_confirmations(bookings):
+    OutboundEmail.objects.bulk_create([booking_confirmation(b) for b in bookings])
+
+
+# ===== DELIVERY =====
+def claim(limit):
+    """Take up to ``limit`` due messages, counting the attempt and leasing them to this worker."""
+    now = timezone.now()
+    with write_transaction():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        OutboundEmail.objects.filter(id__in=[e.id for e in emails]).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + CLAIM_LEASE,
+        )
+    for email in emails:
+        email.attempts += 1
+    return emails
+
+
+def to_message(email, connection):
+    return EmailMessage(
+        subject=email.subject, body=email.body, from_email=email.from_email, to=email.to.split(','),
+        reply_to=[email.reply_to] if email.reply_to else None, connection=connection,
+    )
+
+
+def retry_later(email, error):
+    email.last_error = str(error)[:1000]
+    if email.attempts >= max_attempts():
+        email.status = OutboundEmail.FAILED
+        logger.error("Giving up on outbound email #%s after %s attempts: %s", email.id, email.attempts, error)
+    else:
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
+    email.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def deliver(limit=None, connection=None):
+    """Send one batch of due messages over a single mail connection.
+
+    Returns (sent, failed). The connection is opened once for the batch and
+    each message goes through ``send_messages`` on it, so a refused message
+    only fails itself; failures are retried with exponential backoff until
+    ``MAIL_QUEUE_MAX_ATTEMPTS``.
+    """
+    emails = claim(limit or batch_size())
+    if not emails:
+        return 0, 0
+    connection = connection or get_connection(fail_silently=False)
+    sent, failed = [], 0
+    try:
+        connection.open()
+    except Exception as exc:
+        for email in emails:
+            retry_later(email, exc)
+        return 0, len(emails)
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([to_message(email, connection)])
+            except Exception as exc:
+                retry_later(email, exc)
+                failed += 1
+            else:
+                sent.append(email.id)
+    finally:
+        connection.close()
+        OutboundEmail.objects.filter(id__in=sent).update(
+            status=OutboundEmail.SENT, sent_at=timezone.now(), last_error='',
+        )
+    return len(sent), failed
+
+
+def drain(limit=None):
+    """Deliver batches until nothing is due; returns (sent, failed)."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = deliver(limit)
+        if not sent and not failed:
+            return total_sent, total_failed
+        total_sent += sent
+        total_failed += failed
@@ -0,0 +1,78 @@
+import random
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from cars import search
+from cars.models import Car
+
+BRANDS = ['Toyota', 'Honda', 'Nissan', 'Suzuki', 'Mitsubishi', 'BMW', 'Audi', 'Perodua', 'Mazda', 'Kia']
+MODELS = ['Axio', 'Premio', 'Vitz', 'Civic', 'Vezel', 'Fit', 'X-Trail', 'Alto', 'Lancer', 'Axia', 'Demio']
+LOCATIONS = ['Colombo', 'Negombo', 'Kandy', 'Galle', 'Jaffna', 'Matara', 'Kurunegala', 'Ella', 'Trincomalee']
+FEATURES = ['comfortable', 'hybrid', 'spacious', 'economical', 'automatic', 'family', 'reliable', 'clean',
+            'airport', 'luxury', 'compact', 'sunroof', 'bluetooth', 'diesel', 'manual', 'city', 'touring']
+SYLLABLES = ['ka', 'ro', 'mi', 'ten', 'vo', 'lu', 'sa', 'dra', 'pe', 'no', 'ki', 'zu', 'bel', 'ta', 'fi', 'gor']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time search_cars() (the car list ?q= path) with FTS5 and with the icontains fallback, "
+        "on synthetic cars inserted into the configured database and rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if not search.fts_enabled():
+            raise CommandError("The FTS5 index is not installed on this database.")
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(42)
+        # Free-text descriptions draw on a large vocabulary, so most words are rare
+        vocabulary = [''.join(rng.choices(SYLLABLES, k=3)) for _ in range(4000)]
+        cars = (
+            Car(
+                name=rng.choice(MODELS), brand=rng.choice(BRANDS), year=2020, seats=5,
+                location=rng.choice(LOCATIONS), price_per_day=Decimal('4000.00'), main_image='cars/bench.jpg',
+                description=' '.join(rng.sample(FEATURES, 4) + rng.sample(vocabulary, 20)),
+            )
+            for _ in range(options['rows'])
+        )
+        started = time.perf_counter()
+        # bulk_create sends no signals; the FTS triggers still index every row
+        Car.objects.bulk_create(cars, batch_size=5000)
+        self.stdout.write(f"Loaded {options['rows']} rows in {time.perf_counter() - started:.1f}s")
+
+        catalog = Car.objects.filter(available=True)
+        for query in [vocabulary[7], f'{vocabulary[11]} hybrid', 'toyota negombo', 'vezel']:
+            with mock.patch('cars.search.fts_enabled', return_value=False):
+                like_time = self.time(catalog, query, options['repeat'])
+            fts_time = self.time(catalog, query, options['repeat'])
+            self.stdout.write(
+                f"{query!r:26} icontains {like_time * 1000:8.2f} ms   "
+                f"fts5 {fts_time * 1000:8.2f} ms   {like_time / fts_time:6.1f}x"
+            )
+
+    def time(self, queryset, query, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            search.search_cars(queryset, query)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.exports import EXPORT_CHUNK_SIZE, FORMATS, export_lines
+from cars.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Stream bookings joined to their payments as CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--since', help="Only bookings starting on or after this date (YYYY-MM-DD)")
+        parser.add_argument('--until', help="Only bookings starting before this date (YYYY-MM-DD)")
+        parser.add_argument('--output', help="Write to this file instead of stdout")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.all()
+        try:
+            if options['since']:
+                bookings = bookings.filter(start_date__gte=date.fromisoformat(options['since']))
+            if options['until']:
+                bookings = bookings.filter(start_date__lt=date.fromisoformat(options['until']))
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        lines = export_lines(bookings, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
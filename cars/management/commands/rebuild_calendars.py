@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from cars import calendars
+from cars.models import BookedDays
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-car booked-day bitmaps from the Booking table"
+
+    def handle(self, *args, **options):
+        calendars.rebuild()
+        self.stdout.write(f"Rebuilt {BookedDays.objects.count()} car-year calendar(s).")
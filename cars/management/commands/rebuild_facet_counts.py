@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from cars import facets
+from cars.models import FacetCount
+
+
+class Command(BaseCommand):
+    help = "Recompute catalog facet counts from the Car table"
+
+    def handle(self, *args, **options):
+        facets.rebuild()
+        self.stdout.write(f"Rebuilt {FacetCount.objects.count()} facet count(s).")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from cars import reviews
+from cars.models import ReviewDay
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily review counts and sign reviews that have no MinHash signature"
+
+    def handle(self, *args, **options):
+        signed = reviews.sign_missing()
+        reviews.rebuild()
+        reviews.invalidate()
+        self.stdout.write(f"Rebuilt {ReviewDay.objects.count()} review day(s); signed {signed} review(s).")
@@ -0,0 +1,38 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from cars import payments
+
+
+class Command(BaseCommand):
+    help = "Compare Payment against Booking in streamed chunks and optionally settle unpaid bookings that have a payment"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--fix', action='store_true',
+                            help="Mark bookings paid when their Payment row exists and their dates are still free")
+        parser.add_argument('--show', type=int, default=20, help="Print at most this many problems")
+
+    def handle(self, *args, **options):
+        counts = Counter()
+        to_settle = []
+        for problem, booking_id, detail in payments.reconcile(chunk_size=options['chunk_size']):
+            counts[problem] += 1
+            if problem == payments.UNPAID_WITH_PAYMENT:
+                to_settle.append(booking_id)
+            if sum(counts.values()) <= options['show']:
+                self.stdout.write(f"booking #{booking_id}: {problem} ({detail})")
+
+        if not counts:
+            self.stdout.write("Payments and bookings agree.")
+        for problem, count in sorted(counts.items()):
+            self.stdout.write(f"{problem}: {count}")
+
+        if options['fix'] and to_settle:
+            settled, conflicts = payments.settle_paid_bookings(to_settle)
+            self.stdout.write(f"Settled {settled} booking(s).")
+            for booking_id in conflicts:
+                self.stdout.write(
+                    f"booking #{booking_id}: not settled, another booking holds its car and dates (refund the payment)"
+                )
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cars import idempotency
+from cars.reservations import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Release unpaid booking holds whose TTL has expired and purge old idempotency keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running, reaping every INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds(batch_size=options['batch_size'])
+            self.stdout.write(f"Released {released} expired hold(s).")
+            purged = idempotency.purge()
+            if purged:
+                self.stdout.write(f"Purged {purged} idempotency key(s).")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
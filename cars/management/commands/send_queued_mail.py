@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cars import mailqueue
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound email in batches over one mail connection per batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running, draining the queue every INTERVAL seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = mailqueue.drain(options['batch_size'])
+            self.stdout.write(f"Sent {sent} email(s); {failed} will be retried or gave up.")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:49
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def expire_unpaid_bookings(apps, schema_editor):
+    # Unpaid bookings made before holds existed become already-expired holds,
+    # so they stop blocking cars and the reaper can release them.
+    Booking = apps.get_model('cars', 'Booking')
+    Booking.objects.filter(is_paid=False).update(hold_expires_at=F('created_at') + timedelta(minutes=15))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0005_car_location_car_seats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Unpaid bookings stop blocking the car after this time', null=True),
+        ),
+        migrations.RunPython(expire_unpaid_bookings, migrations.RunPython.noop),
+    ]
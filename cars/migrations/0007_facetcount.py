@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:51
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_facets(apps, schema_editor):
+    Car = apps.get_model('cars', 'Car')
+    FacetCount = apps.get_model('cars', 'FacetCount')
+    counts = Counter()
+    for values in Car.objects.filter(available=True).values('brand', 'year', 'seats', 'location'):
+        for field, value in values.items():
+            counts[(field, str(value))] += 1
+    FacetCount.objects.bulk_create(
+        FacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0006_booking_hold_expires_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['facet', 'value'],
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value')],
+            },
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
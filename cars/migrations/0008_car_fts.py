@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from cars.search import FTS_TABLE, FTS_TRIGGERS, install
+
+
+def create_fts(apps, schema_editor):
+    install(schema_editor.connection, rebuild=True)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in FTS_TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0007_facetcount'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+from cars import geo
+
+
+def geocode_cars(apps, schema_editor):
+    Car = apps.get_model('cars', 'Car')
+    for car in Car.objects.all().only('id', 'location'):
+        place = geo.resolve(car.location)
+        if place:
+            _, lat, lon = place
+            Car.objects.filter(id=car.id).update(latitude=lat, longitude=lon, geohash=geo.encode(lat, lon))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0008_car_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='latitude',
+            field=models.FloatField(blank=True, help_text='Filled from the gazetteer when the location names a known place', null=True),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='longitude',
+            field=models.FloatField(blank=True, help_text='Filled from the gazetteer when the location names a known place', null=True),
+        ),
+        migrations.RunPython(geocode_cars, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+from collections import defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def fill_booked_days(apps, schema_editor):
+    Booking = apps.get_model('cars', 'Booking')
+    BookedDays = apps.get_model('cars', 'BookedDays')
+    blocking = Q(is_paid=True) | Q(hold_expires_at__isnull=True) | Q(hold_expires_at__gt=timezone.now())
+    bitmaps = defaultdict(lambda: bytearray(46))
+    for car_id, start, end in Booking.objects.filter(blocking).values_list('car_id', 'start_date', 'end_date'):
+        day = start
+        while day < end:
+            i = day.timetuple().tm_yday - 1
+            bitmaps[(car_id, day.year)][i >> 3] |= 1 << (i & 7)
+            day += timedelta(days=1)
+    BookedDays.objects.bulk_create(
+        BookedDays(car_id=car_id, year=year, days=bytes(bitmap)) for (car_id, year), bitmap in bitmaps.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0011_bookinggroup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedDays',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('days', models.BinaryField(default=b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_days', to='cars.car')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('car', 'year'), name='unique_car_year_days')],
+            },
+        ),
+        migrations.RunPython(fill_booked_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0012_booked_days'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('season', 'Season (between two dates)'), ('weekend', 'Weekend (Saturday and Sunday)'), ('long_stay', 'Long stay (whole rental)'), ('demand', 'Demand (share of the fleet booked)')], max_length=20)),
+                ('multiplier', models.DecimalField(decimal_places=3, help_text='e.g. 1.250 for +25%, 0.900 for 10% off', max_digits=5)),
+                ('start_date', models.DateField(blank=True, help_text='Season rules: first day', null=True)),
+                ('end_date', models.DateField(blank=True, help_text='Season rules: day after the last day', null=True)),
+                ('min_days', models.PositiveIntegerField(blank=True, help_text='Long-stay rules: minimum rental length', null=True)),
+                ('min_utilisation', models.DecimalField(blank=True, decimal_places=3, help_text='Demand rules: share of cars booked that day, 0 to 1', max_digits=4, null=True)),
+                ('brand', models.CharField(blank=True, help_text='Only apply to this brand; blank for every car', max_length=50)),
+                ('active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['kind', 'name'],
+            },
+        ),
+    ]
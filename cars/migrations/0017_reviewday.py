@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_review_days(apps, schema_editor):
+    Review = apps.get_model('cars', 'Review')
+    ReviewDay = apps.get_model('cars', 'ReviewDay')
+    counts = Counter(
+        timezone.localdate(created_at) for created_at in Review.objects.values_list('created_at', flat=True).iterator()
+    )
+    ReviewDay.objects.bulk_create(ReviewDay(day=day, count=count) for day, count in counts.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0016_receipt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.RunPython(fill_review_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from cars import minhash
+
+
+def fill_signatures(apps, schema_editor):
+    Review = apps.get_model('cars', 'Review')
+    ReviewBucket = apps.get_model('cars', 'ReviewBucket')
+    for review in Review.objects.only('id', 'comment').iterator():
+        sig = minhash.signature(review.comment)
+        Review.objects.filter(id=review.id).update(signature=minhash.to_bytes(sig))
+        ReviewBucket.objects.bulk_create(ReviewBucket(review_id=review.id, key=key) for key in minhash.band_keys(sig))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0017_reviewday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='signature',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReviewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='cars.review')),
+            ],
+        ),
+        migrations.RunPython(fill_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0019_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='request_path',
+            field=models.CharField(blank=True, help_text='Path the token was first used on', max_length=255),
+        ),
+    ]
@@ -0,0 +1,70 @@
+import re
+import zlib
+from hashlib import blake2b
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+PRIME = np.uint64((1 << 32) + 15)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed: signatures are stored, so every process must draw the same permutations
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def shingles(text):
+    """Return the set of character ``SHINGLE_SIZE``-grams of the normalized text."""
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """Return the ``NUM_PERM`` MinHash values of ``text`` as a uint32 array.
+
+    Each permutation is a universal hash (a*x + b) mod PRIME of the 32-bit
+    shingle hashes; one broadcast computes all of them at once. With ``a``
+    and ``x`` below 2**32 the product fits in uint64, and it is reduced mod
+    PRIME before ``b`` is added, so nothing wraps.
+    """
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles(text)), dtype=np.uint64)
+    permuted = (np.outer(hashes, _A) % PRIME + _B) % PRIME & MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def to_bytes(sig):
+    return sig.astype('<u4').tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def band_keys(sig):
+    """Return one signed 64-bit bucket key per band of ``ROWS`` values.
+
+    Two texts share a bucket when they agree on a whole band, which is
+    likely only when their shingle sets overlap heavily.
+    """
+    data = to_bytes(sig)
+    width = ROWS * 4
+    keys = []
+    for band in range(BANDS):
+        digest = blake2b(data[band * width:(band + 1) * width], digest_size=8, person=b'band%d' % band).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def similarity(sig, other):
+    """Estimated Jaccard similarity: the share of MinHash values that agree."""
+    return float(np.count_nonzero(sig == other)) / NUM_PERM
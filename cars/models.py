@@ -1,5 +1,12 @@
 # D:\mycar\cars\models.py
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from . import geo
 
 class Car(models.Model):
     name = models.CharField(max_length=100)
@@ -7,6 +14,9 @@ class Car(models.Model):
     year = models.IntegerField()
     seats = models.IntegerField(help_text="Number of seats in the car")
     location = models.CharField(max_length=200, help_text="Where the car is located")
+    latitude = models.FloatField(null=True, blank=True, help_text="Filled from the gazetteer when the location names a known place")
+    longitude = models.FloatField(null=True, blank=True, help_text="Filled from the gazetteer when the location names a known place")
+    geohash = models.CharField(max_length=12, null=True, blank=True, db_index=True, editable=False)
     price_per_day = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
     main_image = models.ImageField(upload_to='cars/')
@@ -16,8 +26,32 @@ class Car(models.Model):
     def __str__(self):
         return f"{self.brand} {self.name}"
 
+    def geocode(self, before=None):
+        """Set coordinates from the gazetteer (if the location resolves) and refresh the geohash.
+
+        ``before`` is the stored (location, latitude, longitude). A move to a
+        place the gazetteer does not know clears the old coordinates, unless
+        they were edited in the same change.
+        """
+        place = geo.resolve(self.location)
+        if place:
+            _, self.latitude, self.longitude = place
+        elif before is not None:
+            location, latitude, longitude = before
+            if self.location != location and (self.latitude, self.longitude) == (latitude, longitude):
+                self.latitude = self.longitude = None
+        if self.latitude is None or self.longitude is None:
+            self.geohash = None
+        else:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+
     class Meta:
         app_label = 'cars'
+        indexes = [
+            # Partial, because Django filters booleans as a bare "WHERE available"
+            # which SQLite cannot match against a composite (available, ...) index
+            models.Index(fields=['created_at'], condition=Q(available=True), name='car_available_created_idx'),
+        ]
 
 class CarImage(models.Model):
     car = models.ForeignKey(Car, related_name='images', on_delete=models.CASCADE)
@@ -29,8 +63,23 @@ class CarImage(models.Model):
     class Meta:
         app_label = 'cars'
 
+class BookingGroup(models.Model):
+    """Several bookings reserved together and paid with a single payment."""
+    customer_name = models.CharField(max_length=100)
+    customer_email = models.EmailField()
+    customer_phone = models.CharField(max_length=20)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Group #{self.id} - {self.customer_name}"
+
+    class Meta:
+        app_label = 'cars'
+
 class Booking(models.Model):
     car = models.ForeignKey(Car, on_delete=models.CASCADE)
+    group = models.ForeignKey(BookingGroup, null=True, blank=True, on_delete=models.CASCADE, related_name='bookings')
     customer_name = models.CharField(max_length=100)
     customer_email = models.EmailField()
     customer_phone = models.CharField(max_length=20)
@@ -38,19 +87,43 @@ class Booking(models.Model):
     end_date = models.DateField()
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     is_paid = models.BooleanField(default=False)
+    hold_expires_at = models.DateTimeField(null=True, blank=True, db_index=True, help_text="Unpaid bookings stop blocking the car after this time")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.customer_name} - {self.car.name}"
 
+    @staticmethod
+    def hold_ttl():
+        return timedelta(minutes=getattr(settings, 'BOOKING_HOLD_MINUTES', 15))
+
+    @property
+    def is_hold(self):
+        return not self.is_paid and self.hold_expires_at is not None
+
+    @property
+    def hold_expired(self):
+        return self.is_hold and self.hold_expires_at <= timezone.now()
+
+    @staticmethod
+    def blocking_q(now=None):
+        """Bookings that occupy the car: paid, manual, or holds still in their TTL."""
+        now = now or timezone.now()
+        return Q(is_paid=True) | Q(hold_expires_at__isnull=True) | Q(hold_expires_at__gt=now)
+
     class Meta:
         app_label = 'cars'
+        indexes = [
+            models.Index(fields=['car', 'start_date', 'end_date'], name='booking_car_dates_idx'),
+            models.Index(fields=['customer_email', 'created_at'], name='booking_email_created_idx'),
+        ]
 
 class Payment(models.Model):
     booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name="payment")
     cardholder_name = models.CharField(max_length=100)
     card_last4 = models.CharField(max_length=4)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    gateway_reference = models.CharField(max_length=64, blank=True, help_text="The payment processor's id for the charge")
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -63,9 +136,162 @@ class Review(models.Model):
     name = models.CharField(max_length=100)
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # MinHash of the comment, see cars.minhash
+    signature = models.BinaryField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.name} - {self.comment[:20]}"
 
     class Meta:
-        app_label = 'cars'
\ No newline at end of file
+        app_label = 'cars'
+        indexes = [
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
+
+class ReviewBucket(models.Model):
+    """One LSH band key of a review's signature; near-duplicates share a key."""
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='buckets')
+    key = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        app_label = 'cars'
+
+class ReviewDay(models.Model):
+    """Number of reviews posted on ``day``, kept current by signals."""
+    day = models.DateField(unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} ({self.count})"
+
+    class Meta:
+        app_label = 'cars'
+        ordering = ['-day']
+
+class FacetCount(models.Model):
+    """Number of available cars per catalog facet value, kept current by signals."""
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=200)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.facet}={self.value} ({self.count})"
+
+    class Meta:
+        app_label = 'cars'
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value'),
+        ]
+        ordering = ['facet', 'value']
+
+
+class BookedDays(models.Model):
+    """One bit per day of ``year`` for a car, set while a booking blocks that day."""
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='booked_days')
+    year = models.IntegerField()
+    days = models.BinaryField(default=bytes(46))
+
+    def __str__(self):
+        return f"{self.car} {self.year}"
+
+    class Meta:
+        app_label = 'cars'
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'year'], name='unique_car_year_days'),
+        ]
+
+
+class PricingRule(models.Model):
+    """A price multiplier applied by ``cars.pricing`` to the days it matches."""
+    SEASON = 'season'
+    WEEKEND = 'weekend'
+    LONG_STAY = 'long_stay'
+    DEMAND = 'demand'
+    KIND_CHOICES = [
+        (SEASON, 'Season (between two dates)'),
+        (WEEKEND, 'Weekend (Saturday and Sunday)'),
+        (LONG_STAY, 'Long stay (whole rental)'),
+        (DEMAND, 'Demand (share of the fleet booked)'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    multiplier = models.DecimalField(max_digits=5, decimal_places=3, help_text="e.g. 1.250 for +25%, 0.900 for 10% off")
+    start_date = models.DateField(null=True, blank=True, help_text="Season rules: first day")
+    end_date = models.DateField(null=True, blank=True, help_text="Season rules: day after the last day")
+    min_days = models.PositiveIntegerField(null=True, blank=True, help_text="Long-stay rules: minimum rental length")
+    min_utilisation = models.DecimalField(max_digits=4, decimal_places=3, null=True, blank=True, help_text="Demand rules: share of cars booked that day, 0 to 1")
+    brand = models.CharField(max_length=50, blank=True, help_text="Only apply to this brand; blank for every car")
+    active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} (x{self.multiplier})"
+
+    class Meta:
+        app_label = 'cars'
+        ordering = ['kind', 'name']
+
+
+class IdempotencyKey(models.Model):
+    """Client token for a form POST, stored with the redirect it first produced."""
+    scope = models.CharField(max_length=30)
+    key = models.CharField(max_length=64)
+    request_path = models.CharField(max_length=255, blank=True, help_text="Path the token was first used on")
+    response_url = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+    class Meta:
+        app_label = 'cars'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+
+class Receipt(models.Model):
+    """A paid booking's receipt, rendered once and served without reading Booking or Payment."""
+    booking = models.OneToOneField(Booking, on_delete=models.CASCADE, primary_key=True, related_name='receipt')
+    html = models.TextField()
+    pdf = models.BinaryField(null=True, blank=True, help_text="Filled in the background after the HTML is stored")
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Receipt for booking #{self.booking_id}"
+
+    class Meta:
+        app_label = 'cars'
+
+
+class OutboundEmail(models.Model):
+    """A message waiting in the outbound mail queue, delivered by ``send_queued_mail``."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed (gave up)'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField(help_text="Comma-separated recipients")
+    reply_to = models.CharField(max_length=254, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+    class Meta:
+        app_label = 'cars'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
@@ -0,0 +1,88 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(timestamp, pk):
+    return urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, pk) from a cursor, or None if it is malformed."""
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of a queryset ordered newest first by (timestamp field, id)."""
+
+    def __init__(self, object_list, params, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.params = params
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def _query(self, key, cursor):
+        params = self.params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[key] = cursor
+        return params.urlencode()
+
+    def next_query(self):
+        return self._query('after', self.next_cursor)
+
+    def previous_query(self):
+        return self._query('before', self.prev_cursor)
+
+
+def paginate_keyset(queryset, params, per_page=20, field='created_at'):
+    """Slice ``queryset`` using the ``after``/``before`` cursors in ``params``.
+
+    Each page is a range scan on (field, id) with LIMIT, so deep pages cost
+    the same as the first one.
+    """
+    after = decode_cursor(params.get('after', ''))
+    before = None if after else decode_cursor(params.get('before', ''))
+
+    if before:
+        timestamp, pk = before
+        queryset = queryset.filter(Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': pk}))
+        rows = list(queryset.order_by(field, 'id')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        more_before, more_after = has_more, True
+    else:
+        if after:
+            timestamp, pk = after
+            queryset = queryset.filter(Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'id__lt': pk}))
+        rows = list(queryset.order_by(f'-{field}', '-id')[:per_page + 1])
+        more_after = len(rows) > per_page
+        rows = rows[:per_page]
+        more_before = after is not None
+
+    next_cursor = prev_cursor = None
+    if rows and more_after:
+        next_cursor = encode_cursor(getattr(rows[-1], field), rows[-1].id)
+    if rows and more_before:
+        prev_cursor = encode_cursor(getattr(rows[0], field), rows[0].id)
+    return KeysetPage(rows, params, next_cursor, prev_cursor)
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import random
+import uuid
+from collections import namedtuple
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import calendars, mailqueue, receipts
+from .availability import availability_index
+from .locking import write_transaction
+from .models import Booking, Payment
+from .reservations import overlapping_bookings
+
+logger = logging.getLogger(__name__)
+
+# approved is False for a decline; reference is the processor's id for the charge
+Authorization = namedtuple('Authorization', 'approved reference message')
+
+DEFAULT_GATEWAY = {'BACKEND': 'cars.payments.SimulatedGateway', 'OPTIONS': {}}
+
+
+class GatewayError(Exception):
+    """The processor could not be reached or failed; the card was not charged."""
+
+
+class BaseGateway:
+    """Interface for card processors. Implementations must not block the event loop."""
+
+    async def authorize(self, amount, card_number, cardholder_name, expiry_date, cvv):
+        """Authorize and capture ``amount``; return an Authorization or raise GatewayError."""
+        raise NotImplementedError
+
+    async def void(self, reference):
+        """Cancel (or refund) the approved charge ``reference``; raise GatewayError on failure."""
+        raise NotImplementedError
+
+
+class SimulatedGateway(BaseGateway):
+    """Local stand-in for a processor, for development and offline load tests.
+
+    Each call sleeps ``latency`` seconds (plus up to ``jitter``), fails with
+    GatewayError at ``failure_rate`` and declines at ``decline_rate``. Cards
+    in ``DECLINED_CARDS`` are always declined. Voided references are kept
+    in ``voided``.
+    """
+    DECLINED_CARDS = {'4000000000000002'}
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, decline_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.random = random.Random(seed)
+        self.voided = set()
+
+    async def _wait(self):
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.failure_rate:
+            raise GatewayError("Simulated processor outage.")
+
+    async def authorize(self, amount, card_number, cardholder_name, expiry_date, cvv):
+        await self._wait()
+        if card_number in self.DECLINED_CARDS or self.random.random() < self.decline_rate:
+            return Authorization(False, '', "Your card was declined.")
+        if Decimal(amount) <= 0:
+            return Authorization(False, '', "Invalid amount.")
+        return Authorization(True, f"sim_{uuid.uuid4().hex[:16]}", "Approved")
+
+    async def void(self, reference):
+        await self._wait()
+        self.voided.add(reference)
+
+
+@lru_cache(maxsize=1)
+def get_gateway():
+    """Return the gateway configured by ``settings.PAYMENT_GATEWAY``."""
+    config = getattr(settings, 'PAYMENT_GATEWAY', DEFAULT_GATEWAY)
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    if setting == 'PAYMENT_GATEWAY':
+        get_gateway.cache_clear()
+
+
+async def void_charge(authorization):
+    """Void an approved charge that could not be settled; False if it needs a manual refund."""
+    try:
+        await get_gateway().void(authorization.reference)
+    except GatewayError:
+        logger.error("Could not void charge %s; refund it manually.", authorization.reference)
+        return False
+    return True
+
+
+# ===== SETTLEMENT =====
+# Outcomes of recording an approved charge; anything but SETTLED must be voided
+SETTLED = 'settled'
+ALREADY_PAID = 'already_paid'
+HOLD_LOST = 'hold_lost'
+
+
+def _check_unpaid(booking_ids):
+    """Lock the bookings and return why they cannot be settled, or None.
+
+    The charge is authorized outside any transaction, so by now a hold may
+    have been paid by a concurrent submit, released by the reaper, or have
+    lapsed and been booked over by another customer. A lapsed hold whose
+    dates are still free can be settled.
+    """
+    current = list(Booking.objects.select_for_update().filter(id__in=booking_ids).order_by('id'))
+    if any(b.is_paid for b in current):
+        return ALREADY_PAID
+    if len(current) < len(booking_ids):
+        return HOLD_LOST
+    if any(_taken(b, booking_ids) for b in current):
+        return HOLD_LOST
+    return None
+
+
+def _taken(booking, booking_ids):
+    """Whether a blocking booking outside ``booking_ids`` now overlaps ``booking``'s car and dates."""
+    return overlapping_bookings(booking.car_id, booking.start_date, booking.end_date).exclude(id__in=booking_ids).exists()
+
+
+def record_payment(booking, authorization, cardholder_name, card_last4):
+    """Store an approved charge and mark the booking paid in one transaction.
+
+    Returns SETTLED, or ALREADY_PAID / HOLD_LOST when the booking can no
+    longer take the charge (see ``_check_unpaid``).
+    """
+    try:
+        with write_transaction():
+            problem = _check_unpaid([booking.id])
+            if problem:
+                return problem
+            Payment.objects.create(
+                booking=booking,
+                cardholder_name=cardholder_name,
+                card_last4=card_last4,
+                amount=booking.total_amount,
+                gateway_reference=authorization.reference,
+            )
+            booking.is_paid = True
+            booking.hold_expires_at = None
+            booking.save(update_fields=['is_paid', 'hold_expires_at'])
+    except IntegrityError:
+        return ALREADY_PAID
+    return SETTLED
+
+
+def record_group_payment(bookings, authorization, cardholder_name, card_last4):
+    """Store one approved charge across several unpaid bookings; returns as ``record_payment``."""
+    try:
+        with write_transaction():
+            problem = _check_unpaid([b.id for b in bookings])
+            if problem:
+                return problem
+            Payment.objects.bulk_create([
+                Payment(
+                    booking=b, cardholder_name=cardholder_name, card_last4=card_last4,
+                    amount=b.total_amount, gateway_reference=authorization.reference,
+                )
+                for b in bookings
+            ])
+            Booking.objects.filter(id__in=[b.id for b in bookings]).update(is_paid=True, hold_expires_at=None)
+            mailqueue.queue_booking_confirmations(bookings)
+
+            def confirm():
+                # bulk_create() and update() send no signals, so do what they would
+                for b in bookings:
+                    availability_index.add(b.id, b.car_id, b.start_date, b.end_date)
+                    receipts.issue(b.id)
+
+            transaction.on_commit(confirm)
+    except IntegrityError:
+        return ALREADY_PAID
+    return SETTLED
+
+
+# ===== RECONCILIATION =====
+UNPAID_WITH_PAYMENT = 'unpaid_with_payment'
+PAID_WITHOUT_PAYMENT = 'paid_without_payment'
+AMOUNT_MISMATCH = 'amount_mismatch'
+
+
+def reconcile(chunk_size=2000):
+    """Yield (problem, booking_id, detail) for every Booking/Payment disagreement.
+
+    Both tables are streamed in primary-key order (Payment via its unique
+    booking_id index) and merge-joined, so memory stays flat however many
+    rows there are.
+    """
+    bookings = Booking.objects.order_by('id').values_list('id', 'is_paid', 'total_amount').iterator(chunk_size=chunk_size)
+    payments = Payment.objects.order_by('booking_id').values_list('booking_id', 'amount').iterator(chunk_size=chunk_size)
+    payment = next(payments, None)
+    for booking_id, is_paid, total_amount in bookings:
+        while payment is not None and payment[0] < booking_id:
+            payment = next(payments, None)  # cascade deletes make orphans impossible
+        if payment is not None and payment[0] == booking_id:
+            if not is_paid:
+                yield UNPAID_WITH_PAYMENT, booking_id, f"payment of {payment[1]} recorded"
+            if payment[1] != total_amount:
+                yield AMOUNT_MISMATCH, booking_id, f"paid {payment[1]}, booked {total_amount}"
+        elif is_paid:
+            yield PAID_WITHOUT_PAYMENT, booking_id, "no payment recorded"
+
+
+def settle_paid_bookings(booking_ids, batch_size=500):
+    """Mark bookings paid whose Payment row exists, ``batch_size`` at a time.
+
+    The bookings are locked and re-checked as in ``_check_unpaid``: a lapsed
+    hold whose dates another booking has taken since (or another booking
+    settled earlier in this call) is left unpaid rather than double-booking
+    the car. Returns (number settled, ids of those conflicting bookings).
+    """
+    settled = 0
+    conflicts = []
+    for i in range(0, len(booking_ids), batch_size):
+        batch = booking_ids[i:i + batch_size]
+        with write_transaction():
+            rows = Booking.objects.select_for_update().filter(
+                id__in=batch, is_paid=False, payment__isnull=False,
+            ).only('id', 'car_id', 'start_date', 'end_date').order_by('id')
+            accepted = []
+            for b in rows:
+                # Lapsed holds do not block, so one settled here is not seen by _taken()
+                if _taken(b, [b.id]) or any(
+                    a.car_id == b.car_id and a.start_date < b.end_date and b.start_date < a.end_date
+                    for a in accepted
+                ):
+                    conflicts.append(b.id)
+                else:
+                    accepted.append(b)
+            Booking.objects.filter(id__in=[b.id for b in accepted]).update(is_paid=True, hold_expires_at=None)
+
+            def reindex(accepted=accepted):
+                # update() sends no post_save; a lapsed hold starts blocking again
+                for b in accepted:
+                    availability_index.add(b.id, b.car_id, b.start_date, b.end_date)
+                    calendars.refresh(b.car_id, b.start_date, b.end_date)
+                    receipts.issue(b.id)
+
+            transaction.on_commit(reindex)
+        settled += len(accepted)
+    return settled, conflicts
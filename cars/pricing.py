@@ -0,0 +1,208 @@
+from datetime import timedelta
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+
+from .calendars import YEAR_BYTES, year_spans
+from .models import BookedDays, Car, PricingRule
+
+CENT = Decimal('0.01')
+
+
+def active_rules():
+    return list(PricingRule.objects.filter(active=True))
+
+
+def day_range(start, end):
+    return np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D'))
+
+
+def weekdays(days):
+    # 1970-01-01 was a Thursday; Monday is 0 like date.weekday()
+    return (days.astype(np.int64) + 3) % 7
+
+
+def booked_matrix(car_ids, start, end, queryset=None):
+    """Return a (cars, days) bool array of booked days over [start, end).
+
+    Built from the stored day bitmaps: one query, and one unpackbits call per
+    calendar year rather than a loop per car-day.
+    """
+    booked = np.zeros((len(car_ids), (end - start).days), dtype=bool)
+    if not car_ids:
+        return booked
+    position = {car_id: i for i, car_id in enumerate(car_ids)}
+    if queryset is None:
+        queryset = BookedDays.objects.filter(car_id__in=car_ids)
+    rows = queryset.filter(
+        year__gte=start.year, year__lte=(end - timedelta(days=1)).year,
+    ).values_list('car_id', 'year', 'days')
+
+    by_year = {}
+    for car_id, year, days in rows:
+        by_year.setdefault(year, ([], []))
+        by_year[year][0].append(position[car_id])
+        by_year[year][1].append(bytes(days))
+
+    column = 0
+    for year, first, stop in year_spans(start, end):
+        if year in by_year:
+            rows_idx, bitmaps = by_year[year]
+            bits = np.unpackbits(
+                np.frombuffer(b''.join(bitmaps), dtype=np.uint8).reshape(-1, YEAR_BYTES), axis=1, bitorder='little',
+            )
+            booked[rows_idx, column:column + stop - first] = bits[:, first:stop].astype(bool)
+        column += stop - first
+    return booked
+
+
+def fleet_utilisation(start, end):
+    """Share of the available fleet booked on each day of [start, end)."""
+    car_ids = list(Car.objects.filter(available=True).values_list('id', flat=True))
+    if not car_ids:
+        return np.zeros((end - start).days)
+    booked = booked_matrix(car_ids, start, end, BookedDays.objects.filter(car__available=True))
+    return booked.sum(axis=0) / len(car_ids)
+
+
+def multipliers(cars, start, end, rules, stay_days=None, utilisation=None):
+    """Return a (cars, days) array of price multipliers for [start, end).
+
+    Season, weekend and demand rules multiply the days they match; the
+    long-stay rule with the highest ``min_days`` not above ``stay_days``
+    (the window length by default) applies to every day. Rules with a brand
+    only touch that brand's rows.
+    """
+    days = day_range(start, end)
+    stay_days = len(days) if stay_days is None else stay_days
+    brands = np.array([car.brand for car in cars], dtype=object)
+    result = np.ones((len(cars), len(days)))
+    long_stay = np.ones(len(cars))
+
+    for rule in sorted(rules, key=lambda r: r.min_days or 0):
+        car_mask = brands == rule.brand if rule.brand else np.ones(len(cars), dtype=bool)
+        factor = float(rule.multiplier)
+        if rule.kind == PricingRule.LONG_STAY:
+            if rule.min_days and stay_days >= rule.min_days:
+                long_stay[car_mask] = factor
+            continue
+        if rule.kind == PricingRule.SEASON:
+            day_mask = np.ones(len(days), dtype=bool)
+            if rule.start_date:
+                day_mask &= days >= np.datetime64(rule.start_date, 'D')
+            if rule.end_date:
+                day_mask &= days < np.datetime64(rule.end_date, 'D')
+        elif rule.kind == PricingRule.WEEKEND:
+            day_mask = weekdays(days) >= 5
+        elif rule.kind == PricingRule.DEMAND:
+            if utilisation is None or rule.min_utilisation is None:
+                continue
+            day_mask = utilisation >= float(rule.min_utilisation)
+        else:
+            continue
+        result *= np.where(np.outer(car_mask, day_mask), factor, 1.0)
+
+    return result * long_stay[:, None]
+
+
+def daily_prices(cars, start, end, rules=None, stay_days=None):
+    """Return a (cars, days) int64 array of prices in cents, one pass for every car."""
+    rules = active_rules() if rules is None else rules
+    utilisation = None
+    if any(rule.kind == PricingRule.DEMAND for rule in rules):
+        utilisation = fleet_utilisation(start, end)
+    base = np.array([int(car.price_per_day * 100) for car in cars], dtype=np.float64)
+    factors = multipliers(cars, start, end, rules, stay_days, utilisation)
+    return np.rint(base[:, None] * factors).astype(np.int64)
+
+
+def to_money(cents):
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+def _matches(rule, day, utilisation):
+    """Whether a season, weekend or demand ``rule`` applies on ``day``; brands are checked by the caller."""
+    if rule.kind == PricingRule.SEASON:
+        return (not rule.start_date or day >= rule.start_date) and (not rule.end_date or day < rule.end_date)
+    if rule.kind == PricingRule.WEEKEND:
+        return day.weekday() >= 5
+    if rule.kind == PricingRule.DEMAND:
+        return utilisation is not None and rule.min_utilisation is not None and utilisation >= float(rule.min_utilisation)
+    return False
+
+
+def quote(car, start, end, rules=None, utilisation=None):
+    """Total price of renting ``car`` over [start, end), in Decimal.
+
+    The rules are those of ``multipliers``. Each day's rate is rounded to
+    the cent, half to even, and the total is the sum of the days. Booking
+    totals are charged, so they are computed exactly; ``daily_prices``
+    applies the same rules in float64 for catalog listings, where a rate
+    ending in half a cent can land on the other cent.
+
+    ``utilisation`` is the fleet's daily utilisation from ``start`` (see
+    ``fleet_utilisation``); it is looked up when a demand rule needs it.
+    """
+    rules = active_rules() if rules is None else rules
+    stay_days = (end - start).days
+    if utilisation is None and any(rule.kind == PricingRule.DEMAND for rule in rules):
+        utilisation = fleet_utilisation(start, end)
+    long_stay = Decimal('1')
+    day_rules = []
+    for rule in sorted(rules, key=lambda r: r.min_days or 0):
+        if rule.brand and rule.brand != car.brand:
+            continue
+        if rule.kind == PricingRule.LONG_STAY:
+            if rule.min_days and stay_days >= rule.min_days:
+                long_stay = rule.multiplier
+        else:
+            day_rules.append(rule)
+
+    total = Decimal('0')
+    for n in range(stay_days):
+        day = start + timedelta(days=n)
+        rate = car.price_per_day
+        for rule in day_rules:
+            if _matches(rule, day, None if utilisation is None else utilisation[n]):
+                rate *= rule.multiplier
+        total += (rate * long_stay).quantize(CENT, rounding=ROUND_HALF_EVEN)
+    return total.quantize(CENT)
+
+
+def quote_many(items, rules=None):
+    """Totals of several (car, start, end) items as ``quote`` gives them.
+
+    The rules and, for a demand rule, the fleet utilisation over the span
+    of all items are read once for the whole order.
+    """
+    rules = active_rules() if rules is None else rules
+    if not items:
+        return []
+    first = min(start for _, start, _ in items)
+    utilisation = None
+    if any(rule.kind == PricingRule.DEMAND for rule in rules):
+        utilisation = fleet_utilisation(first, max(end for _, _, end in items))
+    return [
+        quote(car, start, end, rules, None if utilisation is None else utilisation[(start - first).days:])
+        for car, start, end in items
+    ]
+
+
+def fleet_prices(cars, start, end, stay_days=None, rules=None):
+    """Return {car_id: (from_price, total)} for every car over [start, end).
+
+    ``from_price`` is the cheapest daily rate on a day the car is free, or
+    None when it is booked throughout; ``total`` prices the whole window.
+    """
+    cars = list(cars)
+    if not cars or end <= start:
+        return {}
+    prices = daily_prices(cars, start, end, rules, stay_days)
+    booked = booked_matrix([car.id for car in cars], start, end)
+    free_prices = np.where(booked, np.iinfo(np.int64).max, prices)
+    cheapest = free_prices.min(axis=1)
+    totals = prices.sum(axis=1)
+    return {
+        car.id: (None if booked[i].all() else to_money(cheapest[i]), to_money(totals[i]))
+        for i, car in enumerate(cars)
+    }
@@ -0,0 +1,127 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.template.loader import render_to_string
+
+from .models import Booking, Receipt
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_TEMPLATE = 'cars/receipt_details.html'
+
+# One background worker: PDFs are small and this keeps SQLite writers few
+pdf_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='receipt-pdf')
+
+
+def load_booking(booking_id):
+    return Booking.objects.select_related('car', 'payment').filter(id=booking_id).first()
+
+
+def issue(booking_id):
+    """Render and store the HTML receipt of a paid booking, then queue its PDF.
+
+    Returns the stored HTML, or None if the booking is not paid.
+    """
+    booking = load_booking(booking_id)
+    payment = getattr(booking, 'payment', None) if booking else None
+    if booking is None or not booking.is_paid or payment is None:
+        return None
+    html = render_to_string(RECEIPT_TEMPLATE, {'booking': booking, 'payment': payment})
+    Receipt.objects.update_or_create(booking_id=booking_id, defaults={'html': html, 'pdf': None})
+    schedule_pdf(booking_id)
+    return html
+
+
+def schedule_pdf(booking_id):
+    if getattr(settings, 'RECEIPT_PDF_IN_BACKGROUND', True):
+        pdf_executor.submit(_pdf_job, booking_id)
+    else:
+        store_pdf(booking_id)
+
+
+def _pdf_job(booking_id):
+    try:
+        store_pdf(booking_id)
+    except Exception:
+        logger.exception("Could not render the PDF receipt for booking #%s", booking_id)
+    finally:
+        connection.close()
+
+
+def issue_pdf(booking_id):
+    """Render and store the PDF of a paid booking now; returns it, or None if the booking is not paid.
+
+    Serves downloads that arrive before the background job has stored the
+    PDF, and bookings paid before receipts were stored.
+    """
+    booking = load_booking(booking_id)
+    payment = getattr(booking, 'payment', None) if booking else None
+    if booking is None or not booking.is_paid or payment is None:
+        return None
+    pdf = receipt_pdf(booking, payment)
+    html = render_to_string(RECEIPT_TEMPLATE, {'booking': booking, 'payment': payment})
+    Receipt.objects.update_or_create(booking_id=booking_id, defaults={'pdf': pdf}, create_defaults={'html': html, 'pdf': pdf})
+    return pdf
+
+
+def store_pdf(booking_id):
+    booking = load_booking(booking_id)
+    if booking is None or not hasattr(booking, 'payment'):
+        return
+    Receipt.objects.filter(booking_id=booking_id).update(pdf=receipt_pdf(booking, booking.payment))
+
+
+# ===== PDF =====
+def receipt_lines(booking, payment):
+    return [
+        "GoRydz - Booking Receipt",
+        "",
+        f"Booking #{booking.id}",
+        f"Car: {booking.car.brand} {booking.car.name}",
+        f"Customer: {booking.customer_name} <{booking.customer_email}>",
+        f"Dates: {booking.start_date:%B %d, %Y} to {booking.end_date:%B %d, %Y}",
+        f"Total amount: ${booking.total_amount}",
+        "",
+        f"Paid by: {payment.cardholder_name}, card ending {payment.card_last4}",
+        f"Payment date: {payment.timestamp:%B %d, %Y %H:%M}",
+        f"Reference: {payment.gateway_reference or '-'}",
+    ]
+
+
+def _pdf_string(text):
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def text_pdf(lines):
+    """Return a one-page PDF (Helvetica, 12pt) showing ``lines``.
+
+    Receipts are plain text, so a hand-written PDF avoids a rendering
+    dependency.
+    """
+    content = "BT /F1 12 Tf 72 760 Td 18 TL\n" + "".join(f"({_pdf_string(line)}) '\n" for line in lines) + "ET"
+    content = content.encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+def receipt_pdf(booking, payment):
+    return text_pdf(receipt_lines(booking, payment))
@@ -0,0 +1,154 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import calendars, pricing
+from .availability import availability_index
+from .locking import write_transaction
+from .models import Booking, BookingGroup, Car
+
+
+class BookingConflict(Exception):
+    """Raised when the requested dates overlap an existing booking.
+
+    ``conflicts`` lists the (car_id, start, end) requests that clashed.
+    """
+
+    def __init__(self, message, conflicts=None):
+        super().__init__(message)
+        self.conflicts = conflicts or []
+
+
+def booking_total(car, start, end, rules=None):
+    return pricing.quote(car, start, end, rules)
+
+
+def _overlaps(a_start, a_end, b_start, b_end):
+    return a_start < b_end and b_start < a_end
+
+
+def overlapping_bookings(car_id, start, end):
+    return Booking.objects.filter(Booking.blocking_q(), car_id=car_id, start_date__lt=end, end_date__gt=start)
+
+
+def _confirmed_conflict(car_id, start, end):
+    """Whether the database agrees with the availability index that [start, end) is taken.
+
+    The index is only advisory: without a shared cache another worker's
+    deletes never reach this process, so a hit in the index must not
+    reject a booking on its own. A hit the database does not confirm
+    reloads that car's bookings into the index.
+    """
+    if overlapping_bookings(car_id, start, end).exists():
+        return True
+    availability_index.refresh([car_id])
+    return False
+
+
+def reserve(car, start, end, **booking_fields):
+    """Create a booking for ``car`` over [start, end) unless it overlaps another.
+
+    The booking starts out as an unpaid hold that stops blocking the car
+    after ``BOOKING_HOLD_MINUTES`` unless it is paid.
+
+    A conflict seen in the in-memory availability index is confirmed with
+    one overlap query and rejected without opening a transaction. Otherwise the car row is locked with
+    SELECT ... FOR UPDATE, so bookings for different cars proceed in
+    parallel on databases with row locks. On SQLite ``write_transaction``
+    takes the database write lock at BEGIN instead, so all bookings are
+    serialised there.
+    """
+    if not availability_index.is_available(car.id, start, end) and _confirmed_conflict(car.id, start, end):
+        raise BookingConflict(f"{car} is already booked for the selected dates.")
+
+    with write_transaction():
+        Car.objects.select_for_update().only('id').get(id=car.id)
+        if overlapping_bookings(car.id, start, end).exists():
+            raise BookingConflict(f"{car} is already booked for the selected dates.")
+        booking_fields.setdefault('hold_expires_at', timezone.now() + Booking.hold_ttl())
+        return Booking.objects.create(car=car, start_date=start, end_date=end, **booking_fields)
+
+
+def reserve_many(items, **customer_fields):
+    """Reserve several (car, start, end) items as one BookingGroup, all or nothing.
+
+    Every range is checked against the request itself and against existing
+    bookings with a single overlap query; the cars are locked in id order
+    and the bookings are written with one bulk_create in one transaction.
+    The order is priced before the transaction starts, so the write lock is
+    not held while utilisation is read for demand rules.
+    Raises BookingConflict listing every clashing item.
+    """
+    conflicts = []
+    for i, (car, start, end) in enumerate(items):
+        clashes_in_request = any(
+            other.id == car.id and _overlaps(start, end, o_start, o_end)
+            for other, o_start, o_end in items[:i]
+        )
+        if clashes_in_request or (
+            not availability_index.is_available(car.id, start, end) and _confirmed_conflict(car.id, start, end)
+        ):
+            conflicts.append((car.id, start, end))
+    if conflicts:
+        raise BookingConflict("Some cars are already booked for the selected dates.", conflicts)
+
+    totals = pricing.quote_many(items)
+    car_ids = sorted({car.id for car, _, _ in items})
+    with write_transaction():
+        list(Car.objects.select_for_update().filter(id__in=car_ids).order_by('id').values_list('id', flat=True))
+        existing = {}
+        rows = Booking.objects.filter(
+            Booking.blocking_q(),
+            car_id__in=car_ids,
+            start_date__lt=max(end for _, _, end in items),
+            end_date__gt=min(start for _, start, _ in items),
+        ).values_list('car_id', 'start_date', 'end_date')
+        for car_id, start, end in rows:
+            existing.setdefault(car_id, []).append((start, end))
+        conflicts = [
+            (car.id, start, end) for car, start, end in items
+            if any(_overlaps(start, end, b_start, b_end) for b_start, b_end in existing.get(car.id, []))
+        ]
+        if conflicts:
+            raise BookingConflict("Some cars are already booked for the selected dates.", conflicts)
+
+        group = BookingGroup.objects.create(total_amount=sum(totals, Decimal('0')), **customer_fields)
+        expires_at = timezone.now() + Booking.hold_ttl()
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                car=car, group=group, start_date=start, end_date=end, total_amount=total,
+                hold_expires_at=expires_at, **customer_fields,
+            )
+            for (car, start, end), total in zip(items, totals)
+        ])
+
+        def index_bookings():
+            # bulk_create sends no post_save, so index the new holds ourselves
+            for b in bookings:
+                availability_index.add(b.id, b.car_id, b.start_date, b.end_date, b.hold_expires_at)
+                calendars.mark(b.car_id, b.start_date, b.end_date)
+
+        transaction.on_commit(index_bookings)
+    return group
+
+
+def release_expired_holds(batch_size=500, now=None):
+    """Delete unpaid holds whose TTL has passed, ``batch_size`` rows at a time.
+
+    Holds that already have a Payment row are left alone: they were charged
+    but never marked paid, and deleting them would cascade to the payment
+    before ``reconcile_payments`` can settle them.
+
+    Returns the number of bookings released.
+    """
+    now = now or timezone.now()
+    expired = Booking.objects.filter(is_paid=False, payment__isnull=True, hold_expires_at__lte=now)
+    released = 0
+    while True:
+        batch = list(expired.values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return released
+        with transaction.atomic():
+            Booking.objects.filter(id__in=batch, is_paid=False, payment__isnull=True).delete()
+        released += len(batch)
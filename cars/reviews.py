@@ -0,0 +1,165 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q, Sum
+from django.utils import timezone
+
+from . import minhash
+from .models import Review, ReviewBucket, ReviewDay
+from .pagination import KeysetPage, paginate_keyset
+
+REVIEWS_PER_PAGE = 10
+RECENT_DAYS = 30
+FEED_KEY = 'reviews:feed-head'
+FEED_TIMEOUT = 60 * 60
+# Estimated Jaccard similarity of comment shingles above which a review is a near-duplicate
+DUPLICATE_THRESHOLD = 0.7
+MAX_CANDIDATES = 50
+
+
+# ===== ROLLUP =====
+def _day(review):
+    return timezone.localdate(review.created_at)
+
+
+def record(review):
+    """Count ``review`` towards the rollup row of the day it was posted."""
+    day = _day(review)
+    if ReviewDay.objects.filter(day=day).update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            ReviewDay.objects.create(day=day, count=1)
+    except IntegrityError:
+        ReviewDay.objects.filter(day=day).update(count=F('count') + 1)
+
+
+def forget(review):
+    ReviewDay.objects.filter(day=_day(review)).update(count=F('count') - 1)
+
+
+def rebuild():
+    """Recompute every daily count from the Review table."""
+    counts = Counter(
+        timezone.localdate(created_at)
+        for created_at in Review.objects.values_list('created_at', flat=True).iterator(chunk_size=2000)
+    )
+    with transaction.atomic():
+        ReviewDay.objects.all().delete()
+        ReviewDay.objects.bulk_create(ReviewDay(day=day, count=count) for day, count in counts.items())
+
+
+def review_stats():
+    """Return {'total', 'recent', 'last_day'} from the rollup in one query."""
+    since = timezone.localdate() - timedelta(days=RECENT_DAYS - 1)
+    stats = ReviewDay.objects.aggregate(
+        total=Sum('count'),
+        recent=Sum('count', filter=Q(day__gte=since)),
+        last_day=Max('day', filter=Q(count__gt=0)),
+    )
+    stats['total'] = stats['total'] or 0
+    stats['recent'] = stats['recent'] or 0
+    stats['recent_days'] = RECENT_DAYS
+    return stats
+
+
+# ===== FEED =====
+def feed_head():
+    """Return the cached {'reviews', 'next_cursor', 'stats'} of the first page.
+
+    On a warm cache this costs no database queries; a new or deleted review
+    drops the entry (see ``invalidate``).
+    """
+    head = cache.get(FEED_KEY)
+    if head is None:
+        page = paginate_keyset(Review.objects.all(), {}, REVIEWS_PER_PAGE)
+        head = {'reviews': page.object_list, 'next_cursor': page.next_cursor, 'stats': review_stats()}
+        cache.set(FEED_KEY, head, FEED_TIMEOUT)
+    return head
+
+
+def invalidate():
+    cache.delete(FEED_KEY)
+
+
+def review_page(params):
+    """Return (page, stats) for the ``after``/``before`` cursors in ``params``."""
+    head = feed_head()
+    if params.get('after') or params.get('before'):
+        page = paginate_keyset(Review.objects.all(), params, REVIEWS_PER_PAGE)
+    else:
+        page = KeysetPage(head['reviews'], params, head['next_cursor'])
+    return page, head['stats']
+
+
+# ===== NEAR-DUPLICATES =====
+def sign(review):
+    review.signature = minhash.to_bytes(minhash.signature(review.comment))
+
+
+def index_buckets(review, created=False):
+    """Store the LSH band keys of ``review``'s signature, replacing old ones."""
+    if not created:
+        ReviewBucket.objects.filter(review=review).delete()
+    keys = minhash.band_keys(minhash.from_bytes(review.signature))
+    ReviewBucket.objects.bulk_create(ReviewBucket(review_id=review.id, key=key) for key in keys)
+
+
+def find_duplicate(review):
+    """Return the id of another review whose comment nearly matches ``review``'s, or None.
+
+    Signs ``review`` if needed. One indexed query fetches the reviews sharing
+    an LSH bucket with it; only those few signatures are compared, so the
+    cost does not grow with the number of reviews.
+    """
+    if review.signature is None:
+        sign(review)
+    sig = minhash.from_bytes(review.signature)
+    candidates = (
+        Review.objects.filter(buckets__key__in=minhash.band_keys(sig)).exclude(id=review.id)
+        .values_list('id', 'signature').distinct()[:MAX_CANDIDATES]
+    )
+    for review_id, stored in candidates:
+        if stored is not None and minhash.similarity(sig, minhash.from_bytes(stored)) >= DUPLICATE_THRESHOLD:
+            return review_id
+    return None
+
+
+def sign_missing():
+    """Sign and index reviews saved without signals (e.g. loaddata); returns how many."""
+    count = 0
+    for review in Review.objects.filter(signature__isnull=True).only('id', 'comment').iterator(chunk_size=2000):
+        review.save(update_fields=['signature'])
+        count += 1
+    return count
+
+
+# ===== RATE LIMITING =====
+def client_key(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def allow_review(request):
+    """Count a review POST against its client's window; False once over the limit.
+
+    A fixed window of ``REVIEW_RATE_WINDOW`` seconds allows
+    ``REVIEW_RATE_LIMIT`` posts per client. Counters live in the cache, so
+    they are shared by every process using a shared cache backend.
+    """
+    limit = getattr(settings, 'REVIEW_RATE_LIMIT', 5)
+    window = getattr(settings, 'REVIEW_RATE_WINDOW', 600)
+    key = f'reviews:rate:{client_key(request)}:{int(time.time() // window)}'
+    cache.add(key, 0, timeout=window)
+    try:
+        posts = cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout=window)
+        posts = 1
+    return posts <= limit
@@ -0,0 +1,127 @@
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'cars_car_fts'
+FTS_COLUMNS = ['name', 'brand', 'location', 'description']
+
+# External-content FTS5 index over cars_car, kept in sync by triggers so that
+# bulk updates and raw SQL are mirrored too, not just Model.save().
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, brand, location, description,
+        content='cars_car', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON cars_car BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, brand, location, description)
+        VALUES (new.id, new.name, new.brand, new.location, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON cars_car BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand, location, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.location, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON cars_car BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand, location, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.location, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, brand, location, description)
+        VALUES (new.id, new.name, new.brand, new.location, new.description);
+    END""",
+]
+
+FTS_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+SEARCH_LIMIT = 200
+
+_fts_available = {}
+
+
+def install(conn, rebuild=False):
+    """Create the FTS table and triggers on SQLite; a no-op elsewhere.
+
+    Safe to run repeatedly. SQLite drops triggers when a migration rebuilds
+    cars_car, so missing triggers are recreated and the index is rebuilt.
+    Returns True if full-text search is available.
+    """
+    if conn.vendor != 'sqlite' or 'cars_car' not in conn.introspection.table_names():
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                FTS_TRIGGERS,
+            )
+            rebuild = rebuild or cursor.fetchone()[0] < len(FTS_TRIGGERS)
+            for statement in FTS_SCHEMA:
+                cursor.execute(statement)
+            if rebuild:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    except OperationalError:
+        # SQLite built without FTS5
+        return False
+    _fts_available.pop(conn.alias, None)
+    return True
+
+
+def fts_enabled(conn=connection):
+    if conn.alias not in _fts_available:
+        _fts_available[conn.alias] = (
+            conn.vendor == 'sqlite' and FTS_TABLE in conn.introspection.table_names()
+        )
+    return _fts_available[conn.alias]
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def match_expression(tokens):
+    # Quote every token so user input can never be parsed as FTS5 syntax,
+    # and allow prefix matches on each one ("toy" finds "Toyota").
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def match_subquery(query):
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match_expression(tokenize(query))])
+
+
+def icontains_filter(query):
+    """Fallback for databases without FTS5: every token must match some field."""
+    condition = Q()
+    for token in tokenize(query):
+        token_q = Q()
+        for field in FTS_COLUMNS:
+            token_q |= Q(**{f'{field}__icontains': token})
+        condition &= token_q
+    return condition
+
+
+def search_filter(query):
+    """Return a Q matching every car for ``query``, e.g. for the admin search box."""
+    if not tokenize(query):
+        return Q()
+    if fts_enabled():
+        return Q(id__in=match_subquery(query))
+    return icontains_filter(query)
+
+
+def search_cars(queryset, query, limit=SEARCH_LIMIT):
+    """Return up to ``limit`` cars in ``queryset`` matching ``query``, best first."""
+    if not tokenize(query):
+        return list(queryset.order_by('-created_at', '-id')[:limit])
+    if not fts_enabled():
+        return list(queryset.filter(icontains_filter(query)).order_by('-created_at', '-id')[:limit])
+
+    # One query: FTS5 finds and ranks the hits, joined on rowid to the
+    # filtered catalog, so only the best ``limit`` rows leave SQLite. The
+    # ORM cannot join a virtual table, hence extra().
+    table = queryset.model._meta.db_table
+    ranked = queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match_expression(tokenize(query))],
+        select={'rank': f'bm25({FTS_TABLE})'},
+        order_by=['rank', '-id'],
+    )
+    return list(ranked[:limit])
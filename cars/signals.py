@@ -0,0 +1,162 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import calendars, facets, fragments, mailqueue, receipts, reviews, search
+from .availability import availability_index
+from .fleet import fleet_index
+from .models import Booking, Car, CarImage, Payment, Review
+
+
+# ===== AVAILABILITY INDEX =====
+@receiver(post_save, sender=Booking)
+def index_booking(sender, instance, **kwargs):
+    expires_at = instance.hold_expires_at if instance.is_hold else None
+    transaction.on_commit(lambda: availability_index.add(
+        instance.id, instance.car_id, instance.start_date, instance.end_date, expires_at,
+    ))
+
+
+@receiver(post_delete, sender=Booking)
+def unindex_booking(sender, instance, **kwargs):
+    booking_id, car_id = instance.id, instance.car_id
+    transaction.on_commit(lambda: availability_index.remove(booking_id, car_id))
+
+
+# ===== BOOKED-DAY CALENDARS =====
+@receiver(pre_save, sender=Booking)
+def remember_booked_days(sender, instance, raw=False, **kwargs):
+    instance._days_before = None
+    if not raw and instance.pk:
+        instance._days_before = Booking.objects.filter(pk=instance.pk).values_list(
+            'car_id', 'start_date', 'end_date',
+        ).first()
+
+
+@receiver(post_save, sender=Booking)
+def update_booked_days(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    car_id, start, end = instance.car_id, instance.start_date, instance.end_date
+    before = getattr(instance, '_days_before', None)
+
+    def update():
+        if created:
+            calendars.mark(car_id, start, end)
+            return
+        if before and before != (car_id, start, end):
+            calendars.refresh(*before)
+        calendars.refresh(car_id, start, end)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender=Booking)
+def clear_booked_days(sender, instance, **kwargs):
+    car_id, start, end = instance.car_id, instance.start_date, instance.end_date
+    transaction.on_commit(lambda: calendars.refresh(car_id, start, end))
+
+
+# ===== RECEIPTS =====
+@receiver(post_save, sender=Payment)
+def issue_receipt(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        booking_id = instance.booking_id
+        transaction.on_commit(lambda: receipts.issue(booking_id))
+
+
+# ===== BOOKING CONFIRMATION EMAIL =====
+@receiver(post_save, sender=Payment)
+def queue_booking_confirmation(sender, instance, created, raw=False, **kwargs):
+    # Queued inside the payment's transaction, so it is sent exactly when the payment commits
+    if created and not raw:
+        mailqueue.queue_booking_confirmations([instance.booking])
+
+
+# ===== REVIEW FEED AND ROLLUP =====
+@receiver(post_save, sender=Review)
+def update_review_feed(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        reviews.record(instance)
+    transaction.on_commit(reviews.invalidate)
+
+
+@receiver(post_delete, sender=Review)
+def remove_from_review_feed(sender, instance, **kwargs):
+    reviews.forget(instance)
+    transaction.on_commit(reviews.invalidate)
+
+
+# ===== NEAR-DUPLICATE REVIEWS =====
+@receiver(pre_save, sender=Review)
+def sign_review(sender, instance, raw=False, **kwargs):
+    # The view may have signed a new review already while checking for duplicates
+    if not raw and (instance.pk or instance.signature is None):
+        reviews.sign(instance)
+
+
+@receiver(post_save, sender=Review)
+def index_review_buckets(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        reviews.index_buckets(instance, created)
+
+
+# ===== GEOCODING =====
+@receiver(pre_save, sender=Car)
+def geocode_car(sender, instance, raw=False, **kwargs):
+    if not raw:
+        before = None
+        if instance.pk:
+            before = Car.objects.filter(pk=instance.pk).values_list('location', 'latitude', 'longitude').first()
+        instance.geocode(before)
+
+
+# ===== FACET COUNTS =====
+@receiver(pre_save, sender=Car)
+def remember_facets(sender, instance, raw=False, **kwargs):
+    instance._facets_before = set() if raw or not instance.pk else facets.contribution(facets.stored_values(instance.pk))
+
+
+@receiver(post_save, sender=Car)
+def update_facets(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    facets.apply_delta(getattr(instance, '_facets_before', set()), facets.contribution(facets.car_values(instance)))
+
+
+@receiver(post_delete, sender=Car)
+def remove_facets(sender, instance, **kwargs):
+    facets.apply_delta(facets.contribution(facets.car_values(instance)), set())
+
+
+# ===== FULL-TEXT SEARCH =====
+def install_search_index(using, **kwargs):
+    # Connected to post_migrate in CarsConfig.ready(): restores the FTS
+    # triggers if a migration rebuilt the cars_car table on SQLite.
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and search.FTS_TABLE in connection.introspection.table_names():
+        search.install(connection)
+
+
+# ===== CACHED CAR CARDS AND DETAIL PAGES =====
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def bump_car_version(sender, instance, **kwargs):
+    car_id = instance.id
+    transaction.on_commit(lambda: fragments.bump_version(car_id))
+
+
+@receiver(post_save, sender=CarImage)
+@receiver(post_delete, sender=CarImage)
+def bump_car_version_for_image(sender, instance, **kwargs):
+    car_id = instance.car_id
+    transaction.on_commit(lambda: fragments.bump_version(car_id))
+
+
+# ===== CHATBOT FLEET INDEX =====
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def refresh_fleet_index(sender, instance, **kwargs):
+    transaction.on_commit(fleet_index.invalidate)
@@ -0,0 +1,12 @@
+from django import template
+from django.utils.html import format_html
+
+from cars.idempotency import FIELD_NAME, form_key
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def idempotency_field(context):
+    """Hidden input carrying the form's idempotency token."""
+    return format_html('<input type="hidden" name="{}" value="{}">', FIELD_NAME, form_key(context['request']))
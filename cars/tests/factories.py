@@ -0,0 +1,58 @@
+# factory_boy factories shared by the cars and chatbot test suites
+from datetime import timedelta
+from decimal import Decimal
+
+import factory
+from django.utils import timezone
+from factory.django import DjangoModelFactory
+
+from cars.models import Booking, Car
+
+
+class CarFactory(DjangoModelFactory):
+    class Meta:
+        model = Car
+
+    name = factory.Sequence(lambda n: f'Car {n}')
+    brand = 'Toyota'
+    year = 2020
+    seats = 5
+    location = 'Colombo'
+    price_per_day = Decimal('4000.00')
+    description = 'Test car'
+    main_image = 'cars/test.jpg'
+    available = True
+
+
+class BookingFactory(DjangoModelFactory):
+    """A two-day booking starting today (plus ``days_ahead``), unpaid and without a hold."""
+
+    class Meta:
+        model = Booking
+
+    class Params:
+        days_ahead = 0
+
+    car = factory.SubFactory(CarFactory)
+    customer_name = 'Jane Doe'
+    customer_email = 'jane@example.com'
+    customer_phone = '0771234567'
+    start_date = factory.LazyAttribute(lambda b: timezone.localdate() + timedelta(days=b.days_ahead))
+    end_date = factory.LazyAttribute(lambda b: b.start_date + timedelta(days=2))
+    total_amount = Decimal('8000.00')
+
+
+def make_car(name, **kwargs):
+    return CarFactory(name=name, **kwargs)
+
+
+def make_booking(car, days_ahead=0, **kwargs):
+    return BookingFactory(car=car, days_ahead=days_ahead, **kwargs)
+
+
+def customer(n=0):
+    """Customer fields (and a total) for reserve() / reserve_many()."""
+    return dict(
+        customer_name=f'Customer {n}', customer_email=f'customer{n}@example.com',
+        customer_phone='0771234567', total_amount=Decimal('8000.00'),
+    )
@@ -0,0 +1,120 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cars.availability import CHANGE_KEY, SEQUENCE_KEY, AvailabilityIndex, CarIntervals, availability_index
+from cars.checks import check_shared_cache
+from cars.models import Booking
+from cars.reservations import reserve
+from cars.tests.factories import customer, make_booking, make_car
+
+
+class CarIntervalsTest(TestCase):
+    """Overlap checks on the per-car interval list"""
+
+    def test_half_open_overlap(self):
+        intervals = CarIntervals()
+        intervals.add(date(2025, 9, 10), date(2025, 9, 15), 1)
+
+        self.assertTrue(intervals.overlaps(date(2025, 9, 12), date(2025, 9, 20)))
+        self.assertTrue(intervals.overlaps(date(2025, 9, 1), date(2025, 9, 11)))
+        # Returning the car on the 10th or picking it up on the 15th is fine
+        self.assertFalse(intervals.overlaps(date(2025, 9, 1), date(2025, 9, 10)))
+        self.assertFalse(intervals.overlaps(date(2025, 9, 15), date(2025, 9, 18)))
+
+    def test_long_interval_hidden_behind_later_start(self):
+        intervals = CarIntervals()
+        intervals.add(date(2025, 9, 1), date(2025, 9, 30), 1)
+        intervals.add(date(2025, 9, 5), date(2025, 9, 6), 2)
+
+        self.assertTrue(intervals.overlaps(date(2025, 9, 20), date(2025, 9, 22)))
+
+    def test_remove(self):
+        intervals = CarIntervals()
+        intervals.add(date(2025, 9, 1), date(2025, 9, 5), 1)
+        intervals.remove(1)
+
+        self.assertFalse(intervals.overlaps(date(2025, 9, 1), date(2025, 9, 5)))
+        self.assertEqual(len(intervals), 0)
+
+
+class AvailabilitySearchTest(TestCase):
+    """Date-range search on the car list"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.civic = make_car('Civic', brand='Honda', year=2022, price_per_day=Decimal('5000.00'))
+        self.axio = make_car('Axio', year=2018, location='Negombo')
+        make_booking(self.civic, start_date=date(2025, 9, 10), end_date=date(2025, 9, 15), total_amount=Decimal('25000.00'))
+
+    def test_booked_car_is_hidden(self):
+        response = self.client.get(reverse('cars:car_list'), {'start': '2025-09-12', 'end': '2025-09-14'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cars']), [self.axio])
+
+    def test_free_range_shows_all_cars(self):
+        response = self.client.get(reverse('cars:car_list'), {'start': '2025-09-15', 'end': '2025-09-20'})
+        self.assertEqual(set(response.context['cars']), {self.civic, self.axio})
+
+    def test_invalid_range_is_ignored(self):
+        response = self.client.get(reverse('cars:car_list'), {'start': '2025-09-14', 'end': '2025-09-12'})
+        self.assertEqual(set(response.context['cars']), {self.civic, self.axio})
+        self.assertIsNone(response.context['date_range'])
+
+    def test_index_follows_booking_changes(self):
+        availability_index.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = make_booking(self.axio, start_date=date(2025, 10, 1), end_date=date(2025, 10, 3))
+        self.assertFalse(availability_index.is_available(self.axio.id, date(2025, 10, 2), date(2025, 10, 5)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        self.assertTrue(availability_index.is_available(self.axio.id, date(2025, 10, 2), date(2025, 10, 5)))
+
+    def test_other_workers_reload_only_the_changed_car(self):
+        index = AvailabilityIndex()
+        index.load()
+        civic = index._cars[self.civic.id]
+        self.assertTrue(index.is_available(self.axio.id, date(2025, 11, 1), date(2025, 11, 2)))
+
+        booking = make_booking(self.axio, start_date=date(2025, 11, 1), end_date=date(2025, 11, 2), total_amount=Decimal('4000.00'))
+        # Another process applying the change publishes it under the car's id
+        availability_index.add(booking.id, self.axio.id, booking.start_date, booking.end_date)
+        with self.assertNumQueries(1) as queries:
+            self.assertFalse(index.is_available(self.axio.id, date(2025, 11, 1), date(2025, 11, 2)))
+        self.assertIn(f'"car_id" IN ({self.axio.id})', queries.captured_queries[0]['sql'])
+        self.assertIs(index._cars[self.civic.id], civic)
+
+        # Moved to the other car: the booking leaves the car it was on
+        Booking.objects.filter(id=booking.id).update(car=self.civic)
+        availability_index.add(booking.id, self.civic.id, booking.start_date, booking.end_date)
+        self.assertTrue(index.is_available(self.axio.id, date(2025, 11, 1), date(2025, 11, 2)))
+        self.assertFalse(index.is_available(self.civic.id, date(2025, 11, 1), date(2025, 11, 2)))
+
+    def test_evicted_change_log_reloads_everything(self):
+        index = AvailabilityIndex()
+        index.load()
+        booking = make_booking(self.axio, start_date=date(2025, 11, 1), end_date=date(2025, 11, 2), total_amount=Decimal('4000.00'))
+        availability_index.add(booking.id, self.axio.id, booking.start_date, booking.end_date)
+        cache.delete(CHANGE_KEY.format(cache.get(SEQUENCE_KEY)))
+        with self.assertNumQueries(1) as queries:
+            self.assertFalse(index.is_available(self.axio.id, date(2025, 11, 1), date(2025, 11, 2)))
+        self.assertNotIn('"car_id" IN', queries.captured_queries[0]['sql'])
+
+    def test_stale_index_never_refuses_a_booking_on_its_own(self):
+        availability_index.load()
+        # Deleted elsewhere: the on_commit handler never runs in this process
+        Booking.objects.filter(car=self.civic).delete()
+        self.assertFalse(availability_index.is_available(self.civic.id, date(2025, 9, 12), date(2025, 9, 14)))
+
+        booking = reserve(self.civic, date(2025, 9, 12), date(2025, 9, 14), **customer())
+        self.assertEqual(Booking.objects.get().id, booking.id)
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        self.assertEqual([w.id for w in check_shared_cache(None)], ['cars.W001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from cars import calendars
+from cars.availability import availability_index
+from cars.models import BookedDays, Booking
+from cars.reservations import reserve, reserve_many
+from cars.tests.factories import make_car
+
+
+CUSTOMER = dict(customer_name='Jane', customer_email='jane@example.com', customer_phone='0771234567')
+
+
+def days(start, end):
+    return [start + timedelta(days=n) for n in range((end - start).days)]
+
+
+class BitmapTest(TestCase):
+    """Day-index arithmetic"""
+
+    def test_year_spans_split_at_new_year(self):
+        self.assertEqual(list(calendars.year_spans(date(2024, 12, 30), date(2025, 1, 2))), [
+            (2024, 364, 366), (2025, 0, 1),
+        ])
+
+    def test_leap_day_fits(self):
+        bitmap = bytearray(calendars.YEAR_BYTES)
+        calendars.set_range(bitmap, 365, 366)
+        self.assertTrue(calendars.is_set(bitmap, 365))
+        self.assertFalse(calendars.is_set(bitmap, 364))
+
+
+class BookedDaysTest(TestCase):
+    """Bitmaps follow booking changes without rescanning the car's bookings"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+
+    def book(self, start, end, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return reserve(self.car, start, end, total_amount=Decimal('8000.00'), **CUSTOMER, **kwargs)
+
+    def booked(self, start=date(2025, 1, 1), end=date(2026, 12, 31)):
+        return calendars.booked_dates(self.car.id, start, end)
+
+    def test_new_booking_sets_its_days_end_exclusive(self):
+        self.book(date(2025, 9, 10), date(2025, 9, 13))
+        self.assertEqual(self.booked(), days(date(2025, 9, 10), date(2025, 9, 13)))
+
+    def test_booking_across_new_year(self):
+        self.book(date(2025, 12, 30), date(2026, 1, 2))
+        self.assertEqual(self.booked(), days(date(2025, 12, 30), date(2026, 1, 2)))
+        self.assertEqual(BookedDays.objects.filter(car=self.car).count(), 2)
+
+    def test_moving_a_booking_clears_the_old_days(self):
+        booking = self.book(date(2025, 9, 10), date(2025, 9, 13))
+        booking.start_date, booking.end_date = date(2025, 9, 20), date(2025, 9, 22)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        self.assertEqual(self.booked(), days(date(2025, 9, 20), date(2025, 9, 22)))
+
+    def test_deleting_keeps_days_of_an_overlapping_booking(self):
+        lapsed = self.book(date(2025, 9, 10), date(2025, 9, 13))
+        Booking.objects.filter(id=lapsed.id).update(hold_expires_at=timezone.now() - timedelta(minutes=1))
+        availability_index.reset()
+        self.book(date(2025, 9, 12), date(2025, 9, 14))
+        with self.captureOnCommitCallbacks(execute=True):
+            lapsed.delete()
+        self.assertEqual(self.booked(), days(date(2025, 9, 12), date(2025, 9, 14)))
+
+    def test_fleet_bookings_are_marked(self):
+        other = make_car('Vezel')
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_many([(self.car, date(2025, 9, 1), date(2025, 9, 3)), (other, date(2025, 9, 2), date(2025, 9, 3))], **CUSTOMER)
+        self.assertEqual(self.booked(), days(date(2025, 9, 1), date(2025, 9, 3)))
+        self.assertEqual(calendars.booked_dates(other.id, date(2025, 9, 1), date(2025, 10, 1)), [date(2025, 9, 2)])
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.book(date(2025, 9, 10), date(2025, 9, 13))
+        self.book(date(2025, 12, 31), date(2026, 1, 3))
+        before = self.booked()
+        call_command('rebuild_calendars', stdout=StringIO())
+        self.assertEqual(self.booked(), before)
+
+
+class CalendarApiTest(TestCase):
+    """JSON calendar endpoint"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve(self.car, date(2025, 9, 29), date(2025, 10, 2), total_amount=Decimal('12000.00'), **CUSTOMER)
+        self.url = reverse('cars:car_calendar', args=[self.car.id])
+
+    def test_month(self):
+        response = self.client.get(self.url, {'year': 2025, 'month': 10})
+        self.assertEqual(response.json()['booked'], ['2025-10-01'])
+
+    def test_year_reads_only_the_bitmaps(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'year': 2025})
+        self.assertEqual(response.json()['booked'], ['2025-09-29', '2025-09-30', '2025-10-01'])
+
+    def test_december_and_bad_input(self):
+        self.assertEqual(self.client.get(self.url, {'year': 2025, 'month': 12}).json()['end'], '2026-01-01')
+        self.assertEqual(self.client.get(self.url, {'month': 13}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('cars:car_calendar', args=[999])).status_code, 404)
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from cars.availability import availability_index
+from cars.models import CarImage
+from cars.tests.factories import make_car
+
+
+class CarDetailCacheTest(TestCase):
+    """car_detail runs a fixed number of queries and none on a warm cache"""
+
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        self.car = make_car(
+            'Vezel', brand='Honda', location='Negombo', price_per_day=Decimal('6000.00'), main_image='cars/vezel.jpg',
+        )
+        for n in range(3):
+            CarImage.objects.create(car=self.car, image=f'cars/vezel_{n}.jpg')
+        self.url = reverse('cars:car_detail', args=[self.car.id])
+
+    def test_cold_then_warm(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'cars/vezel_2.jpg')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Honda Vezel')
+
+    def test_image_change_invalidates_payload(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            CarImage.objects.create(car=self.car, image='cars/vezel_new.jpg')
+        self.assertContains(self.client.get(self.url), 'cars/vezel_new.jpg')
+
+    def test_car_change_invalidates_payload(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.description = 'Now with sunroof'
+            self.car.save()
+        self.assertContains(self.client.get(self.url), 'Now with sunroof')
+
+    def test_missing_car(self):
+        self.assertEqual(self.client.get(reverse('cars:car_detail', args=[9999])).status_code, 404)
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import exports
+from cars.availability import availability_index
+from cars.models import Booking, Payment
+from cars.tests.factories import make_booking, make_car
+
+
+class ExportTest(TestCase):
+    """Booking + Payment exports"""
+
+    def setUp(self):
+        availability_index.reset()
+        car = make_car('Axio')
+        self.paid, self.unpaid = [
+            make_booking(
+                car, customer_name=f'Customer {n}', customer_email=f'c{n}@example.com',
+                start_date=date(2025, 3 + n * 6, 1), end_date=date(2025, 3 + n * 6, 3), is_paid=n == 0,
+            )
+            for n in range(2)
+        ]
+        Payment.objects.create(
+            booking=self.paid, cardholder_name='Customer 0', card_last4='4242',
+            amount=Decimal('8000.00'), gateway_reference='sim_abc',
+        )
+
+    def test_csv_joins_payments(self):
+        rows = list(csv.DictReader(io.StringIO(''.join(exports.csv_lines(Booking.objects.all(), chunk_size=1)))))
+        self.assertEqual([row['booking_id'] for row in rows], [str(self.paid.id), str(self.unpaid.id)])
+        self.assertEqual(rows[0]['gateway_reference'], 'sim_abc')
+        self.assertEqual(rows[0]['car'], 'Axio')
+        self.assertEqual(rows[1]['payment_amount'], '')
+
+    def test_jsonl_keeps_types(self):
+        records = [json.loads(line) for line in exports.jsonl_lines(Booking.objects.all())]
+        self.assertEqual(records[0]['payment_amount'], '8000.00')
+        self.assertIs(records[0]['is_paid'], True)
+        self.assertIsNone(records[1]['paid_at'])
+
+    def test_admin_action_streams(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.login(username='admin', password='pass12345')
+        response = self.client.post(reverse('admin:cars_booking_changelist'), {
+            'action': 'export_jsonl', '_selected_action': [self.unpaid.id],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['booking_id'] for line in lines], [self.unpaid.id])
+
+    def test_command_filters_by_start_date(self):
+        out = StringIO()
+        call_command('export_bookings', '--since', '2025-06-01', '--until', '2026-01-01', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row['booking_id'] for row in rows], [str(self.unpaid.id)])
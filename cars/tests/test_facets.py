@@ -0,0 +1,60 @@
+
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import facets
+from cars.availability import availability_index
+from cars.models import FacetCount
+from cars.tests.factories import make_car
+
+
+def count(facet, value):
+    row = FacetCount.objects.filter(facet=facet, value=value).first()
+    return row.count if row else 0
+
+
+class FacetCountTest(TestCase):
+    """Facet counts follow Car saves and deletes"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.civic = make_car('Civic', brand='Honda')
+        self.vezel = make_car('Vezel', brand='Honda', seats=7, location='Negombo')
+        self.axio = make_car('Axio', brand='Toyota')
+
+    def test_counts_on_create(self):
+        self.assertEqual(count('brand', 'Honda'), 2)
+        self.assertEqual(count('brand', 'Toyota'), 1)
+        self.assertEqual(count('seats', '7'), 1)
+        self.assertEqual(count('location', 'Colombo'), 2)
+
+    def test_counts_on_update(self):
+        self.vezel.location = 'Kandy'
+        self.vezel.save()
+        self.assertEqual(count('location', 'Negombo'), 0)
+        self.assertEqual(count('location', 'Kandy'), 1)
+
+    def test_unavailable_car_is_not_counted(self):
+        self.civic.available = False
+        self.civic.save()
+        self.assertEqual(count('brand', 'Honda'), 1)
+
+    def test_counts_on_delete(self):
+        self.axio.delete()
+        self.assertEqual(count('brand', 'Toyota'), 0)
+
+    def test_rebuild_matches_incremental_counts(self):
+        incremental = set(FacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count'))
+        facets.rebuild()
+        self.assertEqual(set(FacetCount.objects.values_list('facet', 'value', 'count')), incremental)
+
+    def test_filtered_car_list(self):
+        response = self.client.get(reverse('cars:car_list'), {'brand': 'Honda', 'seats': '7'})
+        self.assertEqual(list(response.context['cars']), [self.vezel])
+        brand = next(f for f in response.context['facets'] if f['field'] == 'brand')
+        self.assertIn(('Honda', 2, True), brand['options'])
+        self.assertIn(('Toyota', 1, False), brand['options'])
+
+    def test_facet_counts_cost_one_query(self):
+        with self.assertNumQueries(1):
+            facets.facet_counts()
@@ -0,0 +1,139 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cars.availability import availability_index
+from cars.models import Booking, BookingGroup, Payment, PricingRule
+from cars.reservations import BookingConflict, reserve, reserve_many
+from cars.tests.factories import make_car
+
+
+CUSTOMER = dict(customer_name='Fleet Co', customer_email='fleet@example.com', customer_phone='0771234567')
+
+
+class ReserveManyTest(TestCase):
+    """All-or-nothing reservation of several cars"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.axio = make_car('Axio')
+        self.vezel = make_car('Vezel', brand='Honda', price_per_day=Decimal('6000.00'))
+        reserve(self.axio, date(2025, 9, 10), date(2025, 9, 12), total_amount=Decimal('8000.00'), **CUSTOMER)
+
+    def test_creates_one_group_with_a_booking_per_item(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            group = reserve_many([
+                (self.axio, date(2025, 9, 1), date(2025, 9, 3)),
+                (self.vezel, date(2025, 9, 1), date(2025, 9, 4)),
+            ], **CUSTOMER)
+        self.assertEqual(group.bookings.count(), 2)
+        self.assertEqual(group.total_amount, Decimal('26000.00'))
+        self.assertTrue(all(b.is_hold for b in group.bookings.all()))
+        self.assertFalse(availability_index.is_available(self.vezel.id, date(2025, 9, 2), date(2025, 9, 3)))
+
+    def test_conflict_with_existing_booking_books_nothing(self):
+        with self.assertRaises(BookingConflict) as ctx:
+            reserve_many([
+                (self.vezel, date(2025, 9, 10), date(2025, 9, 12)),
+                (self.axio, date(2025, 9, 11), date(2025, 9, 13)),
+            ], **CUSTOMER)
+        self.assertEqual(ctx.exception.conflicts, [(self.axio.id, date(2025, 9, 11), date(2025, 9, 13))])
+        self.assertFalse(BookingGroup.objects.exists())
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_conflict_within_the_request(self):
+        with self.assertRaises(BookingConflict):
+            reserve_many([
+                (self.vezel, date(2025, 9, 1), date(2025, 9, 5)),
+                (self.vezel, date(2025, 9, 4), date(2025, 9, 6)),
+            ], **CUSTOMER)
+        self.assertFalse(BookingGroup.objects.exists())
+
+    def test_overlap_check_runs_one_query(self):
+        # Skip the in-memory fast path so the database check is the one that rejects
+        with mock.patch.object(availability_index, 'is_available', return_value=True):
+            with CaptureQueriesContext(connection) as queries, self.assertRaises(BookingConflict):
+                reserve_many([
+                    (self.vezel, date(2025, 9, 1), date(2025, 9, 3)),
+                    (self.axio, date(2025, 9, 11), date(2025, 9, 13)),
+                ], **CUSTOMER)
+        booking_reads = [q for q in queries.captured_queries if 'FROM "cars_booking"' in q['sql']]
+        self.assertEqual(len(booking_reads), 1)
+
+    def test_order_is_priced_with_one_utilisation_read(self):
+        PricingRule.objects.create(name='Busy', kind=PricingRule.DEMAND, multiplier=Decimal('1.500'), min_utilisation=Decimal('0.5'))
+        items = [(self.vezel, date(2025, 10, 1) + timedelta(days=2 * n), date(2025, 10, 2) + timedelta(days=2 * n)) for n in range(20)]
+        with CaptureQueriesContext(connection) as queries:
+            group = reserve_many(items, **CUSTOMER)
+        bitmap_reads = [q for q in queries.captured_queries if 'FROM "cars_bookeddays"' in q['sql']]
+        self.assertEqual(len(bitmap_reads), 1)
+        self.assertEqual(group.total_amount, Decimal('120000.00'))
+
+
+class FleetBookingApiTest(TestCase):
+    """JSON endpoint and the group payment page"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.axio = make_car('Axio')
+        self.vezel = make_car('Vezel', brand='Honda')
+        self.url = reverse('cars:fleet_booking')
+
+    def post(self, items, **extra):
+        body = dict(CUSTOMER, items=items, **extra)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, json.dumps(body), content_type='application/json')
+
+    def items(self, start='2025-10-01', end='2025-10-03'):
+        return [
+            {'car_id': self.axio.id, 'start_date': start, 'end_date': end},
+            {'car_id': self.vezel.id, 'start_date': start, 'end_date': end},
+        ]
+
+    def test_books_every_car_and_returns_payment_handle(self):
+        response = self.post(self.items())
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        group = BookingGroup.objects.get(id=data['group_id'])
+        self.assertEqual(data['total_amount'], '16000.00')
+        self.assertEqual(len(data['bookings']), 2)
+        self.assertTrue(data['payment_url'].endswith(reverse('cars:group_payment', args=[group.id])))
+
+    def test_conflict_returns_409(self):
+        self.post(self.items())
+        response = self.post(self.items('2025-10-02', '2025-10-04'))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(response.json()['conflicts']), 2)
+        self.assertEqual(BookingGroup.objects.count(), 1)
+
+    def test_bad_input_returns_400(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([{'car_id': 999, 'start_date': '2025-10-01', 'end_date': '2025-10-02'}]).status_code, 400)
+        self.assertEqual(self.post(self.items('2025-10-03', '2025-10-01')).status_code, 400)
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_group_payment_pays_every_booking(self):
+        group_id = self.post(self.items()).json()['group_id']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('cars:group_payment', args=[group_id]), {
+                'card_number': '4242 4242 4242 4242', 'cardholder_name': 'Fleet Co',
+                'expiry_date': '12/30', 'cvv': '123',
+            })
+        self.assertRedirects(response, reverse('cars:receipt_list'), fetch_redirect_response=False)
+        self.assertEqual(Payment.objects.filter(booking__group_id=group_id).count(), 2)
+        self.assertFalse(Booking.objects.filter(group_id=group_id, is_paid=False).exists())
+        self.assertFalse(Booking.objects.filter(group_id=group_id, hold_expires_at__isnull=False).exists())
+
+    def test_expired_group_hold_cannot_be_paid(self):
+        group_id = self.post(self.items()).json()['group_id']
+        Booking.objects.filter(group_id=group_id).update(hold_expires_at=timezone.now() - timedelta(minutes=1))
+        response = self.client.get(reverse('cars:group_payment', args=[group_id]))
+        self.assertRedirects(response, reverse('cars:car_list'), fetch_redirect_response=False)
@@ -0,0 +1,59 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import fragments
+from cars.availability import availability_index
+from cars.models import Car
+from cars.tests.factories import make_car
+
+
+class CarCardCacheTest(TestCase):
+    """Car cards are cached per car and version stamp"""
+
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        self.cars = [make_car(f'Car {n}') for n in range(3)]
+
+    def render(self):
+        with mock.patch('cars.fragments.render_to_string', wraps=render_to_string) as renderer:
+            cards = fragments.render_cards(Car.objects.order_by('id'))
+        return cards, renderer.call_count
+
+    def test_second_render_is_all_hits(self):
+        cards, renders = self.render()
+        self.assertEqual(renders, 3)
+        self.assertIn('Car 0', cards[0][1])
+
+        cards_again, renders = self.render()
+        self.assertEqual(renders, 0)
+        self.assertEqual([html for _, html in cards_again], [html for _, html in cards])
+
+    def test_save_invalidates_only_that_card(self):
+        self.render()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cars[1].price_per_day = Decimal('4500.00')
+            self.cars[1].save()
+
+        cards, renders = self.render()
+        self.assertEqual(renders, 1)
+        self.assertIn('$4500.00/day', cards[1][1])
+
+    def test_evicted_version_does_not_revive_stale_card(self):
+        self.render()
+        Car.objects.filter(id=self.cars[0].id).update(name='Renamed')
+        cache.delete(fragments.version_key(self.cars[0].id))
+
+        cards, renders = self.render()
+        self.assertEqual(renders, 1)
+        self.assertIn('Renamed', cards[0][1])
+
+    def test_car_list_renders_cached_cards(self):
+        response = self.client.get(reverse('cars:car_list'))
+        self.assertContains(response, 'class="car-card"', count=3)
+        self.assertContains(response, 'Toyota Car 2')
@@ -0,0 +1,91 @@
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cars import geo
+from cars.availability import availability_index
+from cars.models import Car
+from cars.tests.factories import make_car
+
+
+class GazetteerTest(TestCase):
+    """Free-text locations resolve against the bundled gazetteer"""
+
+    def test_resolve(self):
+        self.assertEqual(geo.resolve('Negombo')[0], 'Negombo')
+        self.assertEqual(geo.resolve('123 Main Street, Negombo, Sri Lanka')[0], 'Negombo')
+        self.assertEqual(geo.resolve('Pickup at BIA')[0], 'Katunayake')
+        self.assertEqual(geo.resolve('Nuwara Eliya town')[0], 'Nuwara Eliya')
+        self.assertIsNone(geo.resolve('Main Office'))
+
+    def test_geohash(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+    def test_covering_cells_contain_nearby_points(self):
+        lat, lon = 7.2083, 79.8358
+        cells = geo.covering_cells(lat, lon, 25)
+        for dlat, dlon in [(0.2, 0), (-0.2, 0), (0, 0.2), (0, -0.2), (0.15, 0.15)]:
+            point = geo.encode(lat + dlat, lon + dlon)
+            self.assertTrue(any(point.startswith(cell) for cell in cells))
+
+
+class ProximitySearchTest(TestCase):
+    """Radius and nearest-N queries on the car list"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.negombo = make_car('Axio', location='Negombo')
+        self.airport = make_car('Premio', location='Katunayake Airport')
+        self.colombo = make_car('Vitz', location='Colombo')
+        self.kandy = make_car('Vezel', location='Kandy')
+        self.unknown = make_car('Alto', location='Main Office')
+
+    def test_car_is_geocoded_on_save(self):
+        self.assertAlmostEqual(self.negombo.latitude, 7.2083)
+        self.assertTrue(self.negombo.geohash)
+        self.assertIsNone(self.unknown.geohash)
+
+        self.kandy.location = 'Galle'
+        self.kandy.save()
+        self.assertEqual(self.kandy.geohash, geo.encode(6.0535, 80.2210))
+
+    def test_move_to_unknown_place_clears_coordinates(self):
+        self.negombo.location = 'Somewhere Unmapped'
+        self.negombo.save()
+        self.assertIsNone(self.negombo.latitude)
+        self.assertIsNone(self.negombo.geohash)
+        response = self.client.get(reverse('cars:car_list'), {'near': 'Negombo', 'radius': '5'})
+        self.assertNotIn(self.negombo, response.context['cars'])
+
+    def test_coordinates_edited_with_the_location_are_kept(self):
+        self.kandy.location = 'Riverside Depot'
+        self.kandy.latitude, self.kandy.longitude = 7.1, 80.5
+        self.kandy.save()
+        self.assertEqual(self.kandy.geohash, geo.encode(7.1, 80.5))
+
+    def test_within_radius(self):
+        cars = geo.within(Car.objects.all(), 7.2083, 79.8358, 10)
+        self.assertEqual(cars, [self.negombo, self.airport])
+        self.assertEqual(cars[0].distance_km, 0)
+
+    def test_wide_radius_loads_only_the_cars_returned(self):
+        with CaptureQueriesContext(connection) as queries:
+            cars = geo.within(Car.objects.all(), 7.2083, 79.8358, 200, limit=2)
+        self.assertEqual(cars, [self.negombo, self.airport])
+        candidates, page = [q['sql'] for q in queries.captured_queries]
+        self.assertNotIn('"name"', candidates)
+        self.assertTrue(page.endswith(f'IN ({self.negombo.id}, {self.airport.id})'))
+
+    def test_nearest(self):
+        self.assertEqual(geo.nearest(Car.objects.all(), 6.9271, 79.8612, 3), [self.colombo, self.airport, self.negombo])
+
+    def test_car_list_near(self):
+        response = self.client.get(reverse('cars:car_list'), {'near': 'Negombo', 'radius': '50'})
+        self.assertEqual(list(response.context['cars']), [self.negombo, self.airport, self.colombo])
+        self.assertContains(response, 'km away')
+
+    def test_car_list_unknown_place(self):
+        response = self.client.get(reverse('cars:car_list'), {'near': 'Atlantis'})
+        self.assertTrue(response.context['near_error'])
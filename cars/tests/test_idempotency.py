@@ -0,0 +1,101 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from cars import idempotency
+from cars.availability import availability_index
+from cars.models import Booking, IdempotencyKey, Payment
+from cars.tests.factories import make_booking, make_car
+
+
+BOOKING_FORM = {
+    'customer_name': 'Jane Doe',
+    'customer_email': 'jane@example.com',
+    'customer_phone': '0771234567',
+    'start_date': '2025-09-10',
+    'end_date': '2025-09-12',
+}
+CARD_FORM = {'card_number': '4242 4242 4242 4242', 'cardholder_name': 'Jane Doe', 'expiry_date': '12/30', 'cvv': '123'}
+
+
+class BookCarIdempotencyTest(TestCase):
+    """Retried booking submits"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        self.url = reverse('cars:book_car', args=[self.car.id])
+
+    def post(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, data)
+
+    def test_form_carries_a_token(self):
+        self.assertContains(self.client.get(self.url), 'name="idempotency_key"')
+
+    def test_replay_returns_the_original_redirect(self):
+        first = self.post(dict(BOOKING_FORM, idempotency_key='abc123'))
+        with self.assertNumQueries(1):
+            second = self.client.post(self.url, dict(BOOKING_FORM, idempotency_key='abc123'))
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_header_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(self.url, BOOKING_FORM, HTTP_IDEMPOTENCY_KEY='hdr-1')
+        second = self.client.post(self.url, BOOKING_FORM, HTTP_IDEMPOTENCY_KEY='hdr-1')
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_token_is_bound_to_the_car(self):
+        self.post(dict(BOOKING_FORM, idempotency_key='abc123'))
+        other = reverse('cars:book_car', args=[make_car('Vitz').id])
+        response = self.client.post(other, dict(BOOKING_FORM, idempotency_key='abc123'))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_error_response_releases_the_token(self):
+        response = self.post(dict(BOOKING_FORM, end_date='2025-09-09', idempotency_key='fix-me'))
+        self.assertContains(response, 'value="fix-me"')
+        fixed = self.post(dict(BOOKING_FORM, idempotency_key='fix-me'))
+        self.assertEqual(fixed.status_code, 302)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class PaymentIdempotencyTest(TestCase):
+    """Retried payment submits"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        self.booking = make_booking(self.car)
+        self.url = reverse('cars:payment', args=[self.booking.id])
+
+    def test_replayed_payment_does_not_write_again(self):
+        first = self.client.post(self.url, dict(CARD_FORM, idempotency_key='pay-1'))
+        second = self.client.post(self.url, dict(CARD_FORM, idempotency_key='pay-1'))
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(Payment.objects.filter(booking=self.booking).count(), 1)
+
+    def test_token_is_bound_to_the_booking(self):
+        self.client.post(self.url, dict(CARD_FORM, idempotency_key='pay-1'))
+        other = make_booking(self.car, days_ahead=5, customer_name='John Roe')
+        response = self.client.post(reverse('cars:payment', args=[other.id]), dict(CARD_FORM, idempotency_key='pay-1'))
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Payment.objects.filter(booking=other).exists())
+
+    def test_untokened_duplicate_payment_is_not_a_500(self):
+        Payment.objects.create(booking=self.booking, cardholder_name='Jane', card_last4='4242', amount=Decimal('8000.00'))
+        # The view still sees the stale unpaid booking, as a racing request would
+        response = self.client.post(self.url, CARD_FORM)
+        self.assertRedirects(response, reverse('cars:receipt', args=[self.booking.id]), fetch_redirect_response=False)
+
+    def test_purge_drops_old_keys(self):
+        IdempotencyKey.objects.create(scope='payment', key='old', response_url='/x/')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(days=2))
+        IdempotencyKey.objects.create(scope='payment', key='new', response_url='/y/')
+        self.assertEqual(idempotency.purge(), 1)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
@@ -0,0 +1,99 @@
+import socket
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from cars import mailqueue
+from cars.availability import availability_index
+from cars.localsmtp import LocalSMTPServer
+from cars.models import OutboundEmail
+from cars.payments import Authorization, record_group_payment, record_payment
+from cars.tests.factories import make_booking, make_car
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+CONTACT_FORM = {'name': 'Jane', 'email': 'jane@example.com', 'subject': 'Airport pickup', 'message': 'Is it free?'}
+
+
+class MailQueueingTest(TestCase):
+    """Requests store email instead of talking to the mail server"""
+
+    def setUp(self):
+        availability_index.reset()
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1')
+    def test_contact_succeeds_while_the_mail_server_is_down(self):
+        with override_settings(EMAIL_PORT=closed_port()):
+            response = self.client.post(reverse('cars:contact'), CONTACT_FORM)
+        self.assertRedirects(response, reverse('cars:contact'), fetch_redirect_response=False)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual((queued.to, queued.reply_to), ('admin@carrentaldemo.com', 'jane@example.com'))
+
+    def test_payments_queue_booking_confirmations(self):
+        car = make_car('Axio')
+        single = make_booking(car)
+        group = [make_booking(car, days_ahead=5), make_booking(car, days_ahead=10)]
+        record_payment(single, Authorization(True, 'sim_1', 'Approved'), 'Jane Doe', '4242')
+        record_group_payment(group, Authorization(True, 'sim_2', 'Approved'), 'Jane Doe', '4242')
+
+        subjects = sorted(OutboundEmail.objects.values_list('subject', flat=True))
+        self.assertEqual(subjects, sorted(f'Booking #{b.id} confirmed' for b in [single] + group))
+        self.assertIn('Toyota Axio', OutboundEmail.objects.first().body)
+        self.assertEqual(mail.outbox, [])
+
+
+class MailDeliveryTest(TestCase):
+    """The worker drains the queue over one SMTP connection per batch"""
+
+    def setUp(self):
+        self.smtp = LocalSMTPServer().start()
+        self.addCleanup(self.smtp.stop)
+        overrides = override_settings(**self.smtp.email_settings())
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.emails = [mailqueue.enqueue(f'Message {n}', 'Hello', [f'user{n}@example.com']) for n in range(3)]
+
+    def test_batch_reuses_one_connection(self):
+        self.assertEqual(mailqueue.drain(), (3, 0))
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual([e.message['Subject'] for e in self.smtp.messages], ['Message 0', 'Message 1', 'Message 2'])
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.SENT).count(), 3)
+
+    def test_temporary_failure_is_retried_with_backoff(self):
+        self.smtp.fail_next = 1
+        self.assertEqual(mailqueue.deliver(), (2, 1))
+        retry = OutboundEmail.objects.get(id=self.emails[0].id)
+        self.assertEqual((retry.status, retry.attempts), (OutboundEmail.PENDING, 1))
+        self.assertGreater(retry.next_attempt_at, timezone.now() + timedelta(seconds=25))
+        self.assertIn('451', retry.last_error)
+
+        OutboundEmail.objects.filter(id=retry.id).update(next_attempt_at=timezone.now())
+        self.assertEqual(mailqueue.deliver(), (1, 0))
+        self.assertEqual(mailqueue.backoff(3), timedelta(seconds=120))
+
+    @override_settings(MAIL_QUEUE_MAX_ATTEMPTS=1)
+    def test_refused_recipient_gives_up_alone(self):
+        self.smtp.refused.add('user1@example.com')
+        self.assertEqual(mailqueue.drain(), (2, 1))
+        self.assertEqual(OutboundEmail.objects.get(id=self.emails[1].id).status, OutboundEmail.FAILED)
+
+    def test_unreachable_server_reschedules_the_batch(self):
+        with override_settings(EMAIL_PORT=closed_port()):
+            self.assertEqual(mailqueue.deliver(), (0, 3))
+        self.assertFalse(OutboundEmail.objects.filter(next_attempt_at__lte=timezone.now()).exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command('send_queued_mail', '--batch-size', '2', stdout=out)
+        self.assertIn('Sent 3 email(s); 0 will be retried or gave up.', out.getvalue())
+        self.assertEqual(self.smtp.connections, 2)
@@ -0,0 +1,66 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cars.availability import availability_index
+from cars.models import Car
+from cars.pagination import decode_cursor, encode_cursor, paginate_keyset
+from cars.tests.factories import CarFactory, make_booking
+
+
+class KeysetPaginationTest(TestCase):
+    """Cursor pagination over (created_at, id)"""
+
+    def setUp(self):
+        availability_index.reset()
+        CarFactory.create_batch(7)
+        # Identical timestamps must still paginate deterministically by id
+        Car.objects.update(created_at=timezone.now())
+        self.expected = list(Car.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, params):
+        return paginate_keyset(Car.objects.all(), QueryDict(params, mutable=True), per_page=3)
+
+    def test_forward_and_back(self):
+        seen = []
+        page = self.walk('')
+        pages = [page]
+        seen += [car.id for car in page]
+        while page.has_next:
+            page = self.walk(page.next_query())
+            pages.append(page)
+            seen += [car.id for car in page]
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+        back = self.walk(pages[-1].previous_query())
+        self.assertEqual([car.id for car in back], [car.id for car in pages[-2]])
+
+    def test_cursor_round_trip(self):
+        now = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(now, 42)), (now, 42))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+
+    def test_deep_page_uses_no_offset(self):
+        cursor = encode_cursor(timezone.now(), self.expected[4])
+        with CaptureQueriesContext(connection) as queries:
+            self.walk(f'after={cursor}')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'].upper())
+
+    def test_receipt_list_is_paginated(self):
+        user = User.objects.create_user('jane', 'jane@example.com', 'testpass123')
+        car = Car.objects.first()
+        for n in range(25):
+            make_booking(car, start_date=date(2025, 1, 1 + n), end_date=date(2025, 1, 2 + n), total_amount=Decimal('4000.00'))
+        self.client.force_login(user)
+        response = self.client.get(reverse('cars:receipt_list'))
+        self.assertEqual(len(response.context['bookings']), 20)
+        self.assertTrue(response.context['page'].has_next)
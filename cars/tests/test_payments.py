@@ -0,0 +1,247 @@
+import asyncio
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cars import payments
+from cars.availability import availability_index
+from cars.models import Booking, BookingGroup, IdempotencyKey, Payment
+from cars.payments import (
+    ALREADY_PAID, HOLD_LOST, SETTLED, Authorization, GatewayError, SimulatedGateway, get_gateway,
+    record_group_payment, record_payment,
+)
+from cars.reservations import reserve
+from cars.tests.factories import make_booking, make_car
+
+
+CARD_FORM = {'card_number': '4242 4242 4242 4242', 'cardholder_name': 'Jane Doe', 'expiry_date': '12/30', 'cvv': '123'}
+
+
+def simulator(**options):
+    return override_settings(PAYMENT_GATEWAY={'BACKEND': 'cars.payments.SimulatedGateway', 'OPTIONS': options})
+
+
+class SimulatedGatewayTest(SimpleTestCase):
+    """The offline processor"""
+
+    def authorize(self, gateway, card='4242424242424242'):
+        return asyncio.run(gateway.authorize(Decimal('100.00'), card, 'Jane', '12/30', '123'))
+
+    def test_approves_with_a_reference(self):
+        authorization = self.authorize(SimulatedGateway())
+        self.assertTrue(authorization.approved)
+        self.assertTrue(authorization.reference.startswith('sim_'))
+
+    def test_declines_test_card_and_fails_at_failure_rate(self):
+        self.assertFalse(self.authorize(SimulatedGateway(), '4000000000000002').approved)
+        with self.assertRaises(GatewayError):
+            self.authorize(SimulatedGateway(failure_rate=1.0))
+
+    def test_slow_authorizations_overlap(self):
+        gateway = SimulatedGateway(latency=0.2)
+
+        async def checkout_burst():
+            await asyncio.gather(*[
+                gateway.authorize(Decimal('100.00'), '4242424242424242', 'Jane', '12/30', '123') for _ in range(20)
+            ])
+
+        started = time.perf_counter()
+        asyncio.run(checkout_burst())
+        # 20 sequential round trips would take 4s
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_gateway_follows_settings(self):
+        with simulator(latency=0.5):
+            self.assertEqual(get_gateway().latency, 0.5)
+        self.assertEqual(get_gateway().latency, 0)
+
+
+class PaymentViewGatewayTest(TestCase):
+    """payment view outcomes for each gateway answer"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.booking = make_booking(make_car('Axio'))
+        self.url = reverse('cars:payment', args=[self.booking.id])
+
+    def test_approved_payment_stores_the_reference(self):
+        response = self.client.post(self.url, CARD_FORM)
+        self.assertRedirects(response, reverse('cars:receipt', args=[self.booking.id]), fetch_redirect_response=False)
+        self.assertTrue(Payment.objects.get(booking=self.booking).gateway_reference.startswith('sim_'))
+
+    def test_decline_shows_error_and_writes_nothing(self):
+        response = self.client.post(self.url, dict(CARD_FORM, card_number='4000 0000 0000 0002', idempotency_key='k1'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    @simulator(failure_rate=1.0)
+    def test_outage_is_not_a_500(self):
+        response = self.client.post(self.url, CARD_FORM)
+        self.assertEqual(response.status_code, 200)
+        self.booking.refresh_from_db()
+        self.assertFalse(self.booking.is_paid)
+
+    async def test_async_client(self):
+        response = await self.async_client.post(self.url, dict(CARD_FORM, idempotency_key='async-1'))
+        self.assertEqual(response.status_code, 302)
+        replay = await self.async_client.post(self.url, dict(CARD_FORM, idempotency_key='async-1'))
+        self.assertEqual(replay['Location'], response['Location'])
+        self.assertEqual(await Payment.objects.filter(booking_id=self.booking.id).acount(), 1)
+
+
+class SettlementTest(TestCase):
+    """Capture is one transaction; reconciliation finds what slipped through"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        self.bookings = [make_booking(self.car, days_ahead=3 * n) for n in range(4)]
+        self.authorization = Authorization(True, 'sim_test', 'Approved')
+
+    def test_paid_flag_write_touches_only_its_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            record_payment(self.bookings[0], self.authorization, 'Jane Doe', '4242')
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "cars_booking"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"customer_name"', updates[0])
+
+    def test_failed_flag_write_rolls_back_the_payment(self):
+        with mock.patch.object(Booking, 'save', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            record_payment(self.bookings[0], self.authorization, 'Jane Doe', '4242')
+        self.assertFalse(Payment.objects.exists())
+
+    def test_reconcile_reports_and_fixes(self):
+        unpaid, paid_only, wrong_amount, fine = self.bookings
+        Payment.objects.create(booking=unpaid, cardholder_name='Jane', card_last4='4242', amount=Decimal('8000.00'))
+        Booking.objects.filter(id=paid_only.id).update(is_paid=True)
+        Booking.objects.filter(id__in=[wrong_amount.id, fine.id]).update(is_paid=True)
+        Payment.objects.create(booking=wrong_amount, cardholder_name='Jane', card_last4='4242', amount=Decimal('7000.00'))
+        Payment.objects.create(booking=fine, cardholder_name='Jane', card_last4='4242', amount=Decimal('8000.00'))
+
+        problems = sorted(
+            (problem, booking_id) for problem, booking_id, _ in payments.reconcile(chunk_size=2)
+        )
+        self.assertEqual(problems, sorted([
+            (payments.UNPAID_WITH_PAYMENT, unpaid.id),
+            (payments.PAID_WITHOUT_PAYMENT, paid_only.id),
+            (payments.AMOUNT_MISMATCH, wrong_amount.id),
+        ]))
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_payments', '--fix', '--chunk-size', '2', stdout=out)
+        self.assertIn('Settled 1 booking(s).', out.getvalue())
+        unpaid.refresh_from_db()
+        self.assertTrue(unpaid.is_paid)
+        self.assertIsNone(unpaid.hold_expires_at)
+
+
+class SettlementRaceTest(TestCase):
+    """The booking is re-checked under a lock after the gateway round trip"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        self.start = timezone.localdate() + timedelta(days=3)
+        self.authorization = Authorization(True, 'sim_race', 'Approved')
+
+    def hold(self, name='Jane Doe', days=2):
+        return reserve(
+            self.car, self.start, self.start + timedelta(days=days), customer_name=name,
+            customer_email='jane@example.com', customer_phone='0771234567', total_amount=Decimal('8000.00'),
+        )
+
+    def lapse(self, booking):
+        Booking.objects.filter(id=booking.id).update(hold_expires_at=timezone.now() - timedelta(minutes=1))
+        availability_index.reset()
+
+    def group(self, booking):
+        group = BookingGroup.objects.create(
+            customer_name='Jane Doe', customer_email='jane@example.com', customer_phone='0771234567',
+            total_amount=booking.total_amount,
+        )
+        Booking.objects.filter(id=booking.id).update(group=group)
+        return group
+
+    def test_lapsed_hold_booked_over_is_not_settled(self):
+        first = self.hold()
+        self.lapse(first)
+        self.hold('John Roe', days=1)
+        self.assertEqual(record_payment(first, self.authorization, 'Jane Doe', '4242'), HOLD_LOST)
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(Booking.objects.filter(is_paid=True).count(), 0)
+
+    def test_lapsed_hold_with_free_dates_is_settled(self):
+        first = self.hold()
+        self.lapse(first)
+        self.assertEqual(record_payment(first, self.authorization, 'Jane Doe', '4242'), SETTLED)
+
+    def test_reconcile_does_not_settle_a_lapsed_hold_booked_over(self):
+        first = self.hold()
+        Payment.objects.create(booking=first, cardholder_name='Jane', card_last4='4242', amount=Decimal('8000.00'))
+        self.lapse(first)
+        self.hold('John Roe', days=1)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_payments', '--fix', stdout=out)
+        self.assertIn('Settled 0 booking(s).', out.getvalue())
+        self.assertIn(f'booking #{first.id}: not settled', out.getvalue())
+        first.refresh_from_db()
+        self.assertFalse(first.is_paid)
+
+    def test_settling_two_lapsed_holds_on_the_same_dates_keeps_one(self):
+        first = self.hold()
+        self.lapse(first)
+        second = self.hold('John Roe')
+        self.lapse(second)
+        for b in (first, second):
+            Payment.objects.create(booking=b, cardholder_name='Jane', card_last4='4242', amount=Decimal('8000.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(payments.settle_paid_bookings([first.id, second.id]), (1, [second.id]))
+        self.assertEqual(list(Booking.objects.filter(is_paid=True).values_list('id', flat=True)), [first.id])
+
+    def test_reaped_hold_is_not_a_500(self):
+        first = self.hold()
+        Booking.objects.filter(id=first.id).delete()
+        self.assertEqual(record_payment(first, self.authorization, 'Jane Doe', '4242'), HOLD_LOST)
+
+    def test_second_payment_is_refused(self):
+        first = self.hold()
+        self.assertEqual(record_payment(first, self.authorization, 'Jane Doe', '4242'), SETTLED)
+        self.assertEqual(record_payment(first, self.authorization, 'Jane Doe', '4242'), ALREADY_PAID)
+
+    def test_second_group_payment_is_refused(self):
+        bookings = [self.hold()]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(record_group_payment(bookings, self.authorization, 'Jane Doe', '4242'), SETTLED)
+            self.assertEqual(record_group_payment(bookings, self.authorization, 'Jane Doe', '4242'), ALREADY_PAID)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    @simulator()
+    def test_view_voids_the_charge_when_the_hold_is_lost(self):
+        first = self.hold()
+        with mock.patch('cars.views.record_payment', return_value=HOLD_LOST):
+            response = self.client.post(reverse('cars:payment', args=[first.id]), CARD_FORM, follow=True)
+        self.assertRedirects(response, reverse('cars:book_car', args=[self.car.id]))
+        self.assertContains(response, 'The charge on your card has been cancelled.')
+        self.assertEqual(len(get_gateway().voided), 1)
+
+    @simulator()
+    def test_group_view_voids_a_duplicate_charge(self):
+        first = self.hold()
+        with mock.patch('cars.views.record_group_payment', return_value=ALREADY_PAID):
+            response = self.client.post(reverse('cars:group_payment', args=[self.group(first).id]), CARD_FORM)
+        self.assertRedirects(response, reverse('cars:receipt_list'), fetch_redirect_response=False)
+        self.assertEqual(len(get_gateway().voided), 1)
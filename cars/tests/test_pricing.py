@@ -0,0 +1,102 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import pricing
+from cars.availability import availability_index
+from cars.tests.factories import make_car
+from cars.models import PricingRule
+from cars.reservations import reserve
+
+
+CUSTOMER = dict(customer_name='Jane', customer_email='jane@example.com', customer_phone='0771234567')
+
+# 2025-09-05 is a Friday
+FRI, SAT, MON = date(2025, 9, 5), date(2025, 9, 6), date(2025, 9, 8)
+
+
+class QuoteTest(TestCase):
+    """Rules applied day by day"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+
+    def test_no_rules_is_days_times_rate(self):
+        self.assertEqual(pricing.quote(self.car, FRI, MON), Decimal('12000.00'))
+
+    def test_weekend_rule_only_touches_weekend_days(self):
+        PricingRule.objects.create(name='Weekend', kind=PricingRule.WEEKEND, multiplier=Decimal('1.250'))
+        self.assertEqual(pricing.quote(self.car, FRI, MON), Decimal('14000.00'))
+
+    def test_season_is_end_exclusive(self):
+        PricingRule.objects.create(
+            name='Peak', kind=PricingRule.SEASON, multiplier=Decimal('2.000'), start_date=SAT, end_date=date(2025, 9, 7),
+        )
+        self.assertEqual(pricing.quote(self.car, FRI, MON), Decimal('16000.00'))
+
+    def test_only_the_longest_qualifying_stay_discount_applies(self):
+        PricingRule.objects.create(name='Week', kind=PricingRule.LONG_STAY, multiplier=Decimal('0.900'), min_days=7)
+        PricingRule.objects.create(name='Month', kind=PricingRule.LONG_STAY, multiplier=Decimal('0.800'), min_days=30)
+        self.assertEqual(pricing.quote(self.car, date(2025, 9, 1), date(2025, 9, 3)), Decimal('8000.00'))
+        self.assertEqual(pricing.quote(self.car, date(2025, 9, 1), date(2025, 9, 8)), Decimal('25200.00'))
+        self.assertEqual(pricing.quote(self.car, date(2025, 9, 1), date(2025, 10, 1)), Decimal('96000.00'))
+
+    def test_brand_rules_and_inactive_rules(self):
+        PricingRule.objects.create(name='Honda', kind=PricingRule.WEEKEND, multiplier=Decimal('2.000'), brand='Honda')
+        PricingRule.objects.create(name='Off', kind=PricingRule.WEEKEND, multiplier=Decimal('3.000'), active=False)
+        honda = make_car('Fit', brand='Honda')
+        self.assertEqual(pricing.quote(self.car, SAT, MON), Decimal('8000.00'))
+        self.assertEqual(pricing.quote(honda, SAT, MON), Decimal('16000.00'))
+
+    def test_demand_rule_uses_fleet_utilisation(self):
+        PricingRule.objects.create(name='Busy', kind=PricingRule.DEMAND, multiplier=Decimal('1.500'), min_utilisation=Decimal('0.5'))
+        other = make_car('Vezel')
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve(other, FRI, SAT, total_amount=Decimal('4000.00'), **CUSTOMER)
+        # Half the fleet is booked on Friday only
+        self.assertEqual(pricing.quote(self.car, FRI, date(2025, 9, 7)), Decimal('10000.00'))
+
+    def test_each_day_is_rounded_half_to_even_in_decimal(self):
+        PricingRule.objects.create(name='Weekend', kind=PricingRule.WEEKEND, multiplier=Decimal('1.150'))
+        car = make_car('Vitz', price_per_day=Decimal('1000.10'))
+        # 1150.115 a day: float64 rounds it to 1150.11
+        self.assertEqual(pricing.quote(car, SAT, MON), Decimal('2300.24'))
+        self.assertEqual(pricing.daily_prices([car], SAT, MON).tolist(), [[115011, 115011]])
+
+    def test_booking_uses_the_engine(self):
+        PricingRule.objects.create(name='Weekend', kind=PricingRule.WEEKEND, multiplier=Decimal('1.500'))
+        response = self.client.post(reverse('cars:book_car', args=[self.car.id]), dict(
+            CUSTOMER, start_date='2025-09-05', end_date='2025-09-07',
+        ))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.car.booking_set.get().total_amount, Decimal('10000.00'))
+
+
+class FleetPricesTest(TestCase):
+    """One pass over many cars"""
+
+    def setUp(self):
+        availability_index.reset()
+        PricingRule.objects.create(name='Weekend', kind=PricingRule.WEEKEND, multiplier=Decimal('1.500'))
+        self.cheap = make_car('Alto', price_per_day=Decimal('3000.00'))
+        self.busy = make_car('Axio')
+
+    def test_from_price_skips_booked_days(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve(self.busy, FRI, SAT, total_amount=Decimal('4000.00'), **CUSTOMER)
+        prices = pricing.fleet_prices([self.cheap, self.busy], FRI, date(2025, 9, 7))
+        self.assertEqual(prices[self.cheap.id], (Decimal('3000.00'), Decimal('7500.00')))
+        self.assertEqual(prices[self.busy.id], (Decimal('6000.00'), Decimal('10000.00')))
+
+    def test_fully_booked_car_has_no_from_price(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve(self.busy, FRI, MON, total_amount=Decimal('12000.00'), **CUSTOMER)
+        self.assertIsNone(pricing.fleet_prices([self.busy], FRI, MON)[self.busy.id][0])
+
+    def test_catalog_shows_trip_total_for_a_date_search(self):
+        response = self.client.get(reverse('cars:car_list'), {'start': '2025-09-05', 'end': '2025-09-07'})
+        self.assertContains(response, 'From $3000.00/day')
+        self.assertContains(response, '$7500.00 total')
@@ -0,0 +1,142 @@
+import re
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cars.availability import availability_index
+from cars.models import Car, Booking, Payment, Review
+from cars.reservations import reserve
+from cars.tests.factories import customer, make_booking, make_car
+
+# Tables that grow with the business and must never be read by a full scan
+WATCHED_TABLES = {'cars_car', 'cars_booking', 'cars_payment', 'cars_review', 'cars_reviewbucket'}
+# A plan line reading a table: "SCAN cars_car", "SCAN U0 USING INDEX ...", or on
+# SQLite before 3.36 "SCAN TABLE cars_booking AS U0"
+SCAN = re.compile(r'SCAN (?:TABLE )?(?P<name>\S+)(?: AS (?P<alias>\S+))?(?P<using> USING .*)?$')
+# Django's table aliases, e.g. FROM "cars_booking" U0 inside an id__in subquery
+TABLE_ALIAS = re.compile(r'(?:FROM|JOIN) "(\w+)" (?:AS )?"?([A-Z]\d+)\b')
+
+
+def full_scan(line, aliases):
+    """The table a plan line reads without an index, or None."""
+    match = SCAN.fullmatch(line)
+    if match is None or match.group('using'):
+        return None
+    if match.group('alias'):
+        return match.group('name')
+    return aliases.get(match.group('name'), match.group('name'))
+
+
+class QueryPlanTest(TestCase):
+    """EXPLAIN QUERY PLAN for each hot view; fails on a full table scan"""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are checked on SQLite')
+        cache.clear()
+        availability_index.reset()
+        self.user = User.objects.create_user('jane', 'jane@example.com', 'testpass123')
+        for n in range(30):
+            car = make_car(
+                f'Car {n}', brand=['Toyota', 'Honda'][n % 2], year=2015 + n % 8,
+                location=['Colombo', 'Negombo', 'Kandy'][n % 3], available=n % 5 != 0,
+            )
+            booking = make_booking(
+                car, customer_email=['jane@example.com', 'joe@example.com'][n % 2],
+                start_date=date(2025, 9, 1 + n % 20), end_date=date(2025, 9, 3 + n % 20), is_paid=n % 3 == 0,
+            )
+            if booking.is_paid:
+                Payment.objects.create(booking=booking, cardholder_name='Jane', card_last4='4242', amount=booking.total_amount)
+            Review.objects.create(name=f'Reviewer {n}', comment='Great service')
+        self.car = Car.objects.filter(available=True).first()
+        # Loading the availability index is a one-off bulk read per process
+        availability_index.load()
+        # No ANALYZE: with a handful of rows the statistics would make a scan
+        # look cheapest, while the default heuristics model a large table.
+
+    def full_scans(self, queries):
+        scans = []
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+            aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+            for line in plan:
+                if full_scan(line, aliases) in WATCHED_TABLES:
+                    scans.append(f'{line}\n    in: {sql}')
+        return scans
+
+    def assertNoFullScans(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        self.assertEqual(self.full_scans(queries.captured_queries), [])
+
+    def test_car_list(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:car_list')))
+
+    def test_car_list_filtered(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:car_list'), {'brand': 'Honda', 'seats': '5'}))
+
+    def test_car_list_search(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:car_list'), {'q': 'toyota'}))
+
+    def test_car_list_near_search(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:car_list'), {'near': 'Negombo', 'radius': '25', 'q': 'toyota'}))
+
+    def test_car_list_dates(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:car_list'), {'start': '2025-09-05', 'end': '2025-09-08'}))
+
+    def test_car_list_near(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:car_list'), {'near': 'Negombo', 'radius': '25'}))
+
+    def test_car_detail(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:car_detail', args=[self.car.id])))
+
+    def test_booking_overlap_check(self):
+        self.assertNoFullScans(lambda: reserve(self.car, date(2026, 1, 1), date(2026, 1, 3), **customer()))
+
+    def test_receipt_list(self):
+        self.client.force_login(self.user)
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:receipt_list')))
+
+    def test_payment_list(self):
+        self.client.force_login(self.user)
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:payment_list')))
+
+    def test_about(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('cars:about')))
+
+    def test_review_duplicate_check(self):
+        self.assertNoFullScans(lambda: self.client.post(reverse('cars:about'), {'name': 'Bot', 'comment': 'Great service'}))
+
+    def test_hold_reaper(self):
+        self.assertNoFullScans(lambda: call_command('release_expired_holds', stdout=StringIO()))
+
+    def test_detector_flags_full_scans(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(Booking.objects.filter(customer_phone='0771234567'))
+        self.assertEqual(len(self.full_scans(queries.captured_queries)), 1)
+
+    def test_detector_parses_scan_lines(self):
+        aliases = {'U0': 'cars_booking'}
+        self.assertEqual(full_scan('SCAN cars_car', aliases), 'cars_car')
+        self.assertIsNone(full_scan('SCAN cars_car USING INDEX cars_car_availab_idx', aliases))
+        self.assertIsNone(full_scan('SCAN cars_car USING COVERING INDEX cars_car_brand_idx', aliases))
+        self.assertEqual(full_scan('SCAN U0', aliases), 'cars_booking')
+        self.assertEqual(full_scan('SCAN TABLE cars_booking AS U0', aliases), 'cars_booking')
+        self.assertIsNone(full_scan('SEARCH U0 USING INDEX cars_bookin_car_id_idx (car_id=?)', aliases))
+
+    def test_detector_sees_into_subqueries(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(Car.objects.exclude(id__in=Booking.objects.filter(customer_phone='0771234567').values('car_id')))
+        self.assertTrue(any(scan.startswith('SCAN U0') for scan in self.full_scans(queries.captured_queries)))
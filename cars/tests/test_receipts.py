@@ -0,0 +1,86 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from cars import receipts
+from cars.availability import availability_index
+from cars.models import Booking, Payment, Receipt
+from cars.payments import Authorization, record_payment
+from cars.tests.factories import make_booking, make_car
+
+
+@override_settings(RECEIPT_PDF_IN_BACKGROUND=False)
+class ReceiptTest(TestCase):
+    """Receipts are rendered at payment time and served from storage"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        self.booking = make_booking(self.car)
+
+    def pay(self, booking):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_payment(booking, Authorization(True, 'sim_ref', 'Approved'), 'Jane Doe', '4242')
+
+    def test_payment_stores_html_and_pdf(self):
+        self.pay(self.booking)
+        receipt = Receipt.objects.get(booking=self.booking)
+        self.assertIn('Toyota Axio', receipt.html)
+        self.assertIn('**** 4242', receipt.html)
+        self.assertTrue(bytes(receipt.pdf).startswith(b'%PDF-1.4'))
+
+    def test_stored_receipt_costs_one_query(self):
+        self.pay(self.booking)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('cars:receipt', args=[self.booking.id]))
+        self.assertContains(response, 'Toyota Axio')
+        self.assertContains(response, reverse('cars:receipt_pdf', args=[self.booking.id]))
+
+    def test_unpaid_booking_is_rendered_live(self):
+        response = self.client.get(reverse('cars:receipt', args=[self.booking.id]))
+        self.assertContains(response, 'Not Paid')
+        self.assertFalse(Receipt.objects.exists())
+
+    def test_paid_booking_without_receipt_is_backfilled(self):
+        Payment.objects.create(booking=self.booking, cardholder_name='Jane', card_last4='4242', amount=Decimal('8000.00'))
+        Booking.objects.filter(id=self.booking.id).update(is_paid=True)
+        response = self.client.get(reverse('cars:receipt', args=[self.booking.id]))
+        self.assertContains(response, '**** 4242')
+        self.assertTrue(Receipt.objects.filter(booking=self.booking).exists())
+
+    def test_pdf_download(self):
+        url = reverse('cars:receipt_pdf', args=[self.booking.id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.pay(self.booking)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn(b'Toyota Axio', response.content)
+
+    @override_settings(RECEIPT_PDF_IN_BACKGROUND=True)
+    def test_pdf_is_rendered_on_demand_before_the_job_runs(self):
+        with mock.patch.object(receipts.pdf_executor, 'submit'):
+            self.pay(self.booking)
+        response = self.client.get(reverse('cars:receipt_pdf', args=[self.booking.id]))
+        self.assertIn(b'Toyota Axio', response.content)
+        self.assertTrue(bytes(Receipt.objects.get(booking=self.booking).pdf).startswith(b'%PDF-1.4'))
+
+    def test_legacy_paid_booking_gets_a_pdf(self):
+        Payment.objects.create(booking=self.booking, cardholder_name='Jane', card_last4='4242', amount=Decimal('8000.00'))
+        Booking.objects.filter(id=self.booking.id).update(is_paid=True)
+        response = self.client.get(reverse('cars:receipt_pdf', args=[self.booking.id]))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('**** 4242', Receipt.objects.get(booking=self.booking).html)
+
+    @override_settings(RECEIPT_PDF_IN_BACKGROUND=True)
+    def test_pdf_is_rendered_off_the_request_path(self):
+        with mock.patch.object(receipts.pdf_executor, 'submit') as submit:
+            self.pay(self.booking)
+        submit.assert_called_once_with(receipts._pdf_job, self.booking.id)
+        self.assertIsNone(Receipt.objects.get(booking=self.booking).pdf)
+
+    def test_pdf_escapes_text(self):
+        pdf = receipts.text_pdf(['(total) \\ 100%'])
+        self.assertIn(b'(\\(total\\) \\\\ 100%)', pdf)
+        self.assertTrue(pdf.endswith(b'%%EOF\n'))
@@ -0,0 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cars.availability import availability_index
+from cars.locking import write_transaction
+from cars.models import Car, Booking, Payment
+from cars.reservations import BookingConflict, release_expired_holds, reserve
+from cars.tests.factories import customer, make_car
+
+
+class ReserveTest(TestCase):
+    """Overlap detection in the reservation service"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        reserve(self.car, date(2025, 9, 10), date(2025, 9, 12), **customer())
+
+    def test_overlap_is_rejected(self):
+        with self.assertRaises(BookingConflict):
+            reserve(self.car, date(2025, 9, 11), date(2025, 9, 14), **customer(1))
+        self.assertEqual(Booking.objects.filter(car=self.car).count(), 1)
+
+    def test_back_to_back_booking_is_allowed(self):
+        reserve(self.car, date(2025, 9, 12), date(2025, 9, 14), **customer(1))
+        self.assertEqual(Booking.objects.filter(car=self.car).count(), 2)
+
+    def test_book_car_view_reports_conflict(self):
+        response = self.client.post(reverse('cars:book_car', args=[self.car.id]), {
+            'customer_name': 'Jane Doe',
+            'customer_email': 'jane@example.com',
+            'customer_phone': '0771234567',
+            'start_date': '2025-09-09',
+            'end_date': '2025-09-11',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already booked')
+        self.assertEqual(Booking.objects.filter(car=self.car).count(), 1)
+
+
+class HoldTest(TestCase):
+    """Unpaid bookings hold the car only until their TTL expires"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.car = make_car('Axio')
+        self.hold = reserve(self.car, date(2025, 9, 10), date(2025, 9, 12), **customer())
+
+    def expire(self, booking):
+        Booking.objects.filter(id=booking.id).update(hold_expires_at=timezone.now() - timedelta(minutes=1))
+        availability_index.reset()
+
+    def test_reserve_creates_hold(self):
+        self.assertTrue(self.hold.is_hold)
+        self.assertFalse(self.hold.hold_expired)
+
+    def test_active_hold_blocks_car(self):
+        with self.assertRaises(BookingConflict):
+            reserve(self.car, date(2025, 9, 10), date(2025, 9, 12), **customer(1))
+
+    def test_expired_hold_is_ignored(self):
+        self.expire(self.hold)
+        reserve(self.car, date(2025, 9, 10), date(2025, 9, 12), **customer(1))
+        self.assertEqual(Booking.objects.filter(car=self.car).count(), 2)
+
+    def test_reaper_releases_expired_holds_in_batches(self):
+        for n in range(5):
+            self.expire(reserve(self.car, date(2025, 10, 1 + 2 * n), date(2025, 10, 2 + 2 * n), **customer(n)))
+        paid = reserve(self.car, date(2025, 11, 1), date(2025, 11, 2), **customer(9))
+        Booking.objects.filter(id=paid.id).update(is_paid=True, hold_expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(release_expired_holds(batch_size=2), 5)
+        self.assertEqual(set(Booking.objects.values_list('id', flat=True)), {self.hold.id, paid.id})
+
+    def test_reaper_keeps_expired_hold_with_payment(self):
+        # A charge recorded without settling the booking, left for reconcile_payments
+        Payment.objects.create(booking=self.hold, cardholder_name='Jane Doe', card_last4='4242', amount=Decimal('8000.00'))
+        self.expire(self.hold)
+
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertTrue(Payment.objects.filter(booking=self.hold).exists())
+
+    def test_reaper_command(self):
+        self.expire(self.hold)
+        call_command('release_expired_holds', stdout=StringIO())
+        self.assertFalse(Booking.objects.exists())
+
+    def test_payment_on_expired_hold_redirects_to_booking(self):
+        self.expire(self.hold)
+        response = self.client.get(reverse('cars:payment', args=[self.hold.id]))
+        self.assertRedirects(response, reverse('cars:book_car', args=[self.car.id]), fetch_redirect_response=False)
+
+
+class ConcurrentReserveTest(TransactionTestCase):
+    """Hundreds of parallel booking attempts must never double-book a car"""
+
+    attempts = 200
+
+    def setUp(self):
+        availability_index.reset()
+        self.cars = [make_car(f'Car {n}') for n in range(4)]
+
+    def tearDown(self):
+        availability_index.reset()
+
+    def attempt(self, n):
+        car = self.cars[n % len(self.cars)]
+        try:
+            reserve(car, date(2025, 12, 20), date(2025, 12, 27), **customer(n))
+            return True
+        except BookingConflict:
+            return False
+        finally:
+            connection.close()
+
+    def test_parallel_attempts_book_each_car_once(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(self.attempt, range(self.attempts)))
+
+        self.assertEqual(sum(results), len(self.cars))
+        for car in self.cars:
+            self.assertEqual(Booking.objects.filter(car=car).count(), 1)
+
+    def post_booking(self, n):
+        car = self.cars[n % len(self.cars)]
+        try:
+            return self.client_class().post(reverse('cars:book_car', args=[car.id]), {
+                'customer_name': f'Customer {n}', 'customer_email': f'customer{n}@example.com',
+                'customer_phone': '0771234567', 'start_date': '2025-12-20', 'end_date': '2025-12-27',
+                'idempotency_key': f'key-{n}',
+            }).status_code
+        finally:
+            connection.close()
+
+    def test_parallel_view_posts_book_each_car_once(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            statuses = list(pool.map(self.post_booking, range(40)))
+
+        self.assertEqual(statuses.count(302), len(self.cars))
+        for car in self.cars:
+            self.assertEqual(Booking.objects.filter(car=car).count(), 1)
+
+    def test_idempotent_view_begins_immediate(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.post_booking(0), 302)
+        # The view's transaction, then the bitmap update run on commit
+        begins = [q['sql'] for q in queries if q['sql'].startswith('BEGIN')]
+        self.assertEqual(begins, ['BEGIN IMMEDIATE', 'BEGIN IMMEDIATE'])
+
+    def test_only_write_transactions_begin_immediate(self):
+        with CaptureQueriesContext(connection) as queries:
+            with write_transaction():
+                Car.objects.count()
+            with transaction.atomic():
+                Car.objects.count()
+        begins = [q['sql'] for q in queries if q['sql'].startswith('BEGIN')]
+        self.assertEqual(begins, ['BEGIN IMMEDIATE', 'BEGIN'])
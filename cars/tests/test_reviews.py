@@ -0,0 +1,129 @@
+import zlib
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from cars import minhash, reviews
+from cars.models import Review, ReviewBucket, ReviewDay
+
+
+class ReviewFeedTest(TestCase):
+    """The about page serves a cached, paginated feed plus rollup stats"""
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('cars:about')
+
+    def post_reviews(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(count):
+                Review.objects.create(name=f'Reviewer {n}', comment='Great service')
+
+    def test_warm_first_page_costs_no_queries(self):
+        self.post_reviews(3)
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Reviewer 2')
+        self.assertContains(response, '3 reviews')
+
+    def test_new_review_invalidates_the_first_page(self):
+        self.post_reviews(1)
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'name': 'Newest', 'comment': 'Lovely car'})
+        self.assertContains(self.client.get(self.url), 'Newest')
+
+    def test_pages_follow_the_cursor(self):
+        self.post_reviews(reviews.REVIEWS_PER_PAGE + 2)
+        first = self.client.get(self.url).context['page']
+        self.assertEqual(len(first), reviews.REVIEWS_PER_PAGE)
+        older = self.client.get(self.url, {'after': first.next_cursor}).context['page']
+        self.assertEqual([review.name for review in older], ['Reviewer 1', 'Reviewer 0'])
+        self.assertFalse(older.has_next)
+
+    def test_rollup_tracks_creates_and_deletes(self):
+        self.post_reviews(3)
+        old = Review.objects.create(name='Old', comment='Back then')
+        Review.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=90))
+        reviews.rebuild()
+        Review.objects.filter(name='Reviewer 0').delete()
+
+        stats = reviews.review_stats()
+        self.assertEqual((stats['total'], stats['recent']), (3, 2))
+        self.assertEqual(stats['last_day'], timezone.localdate())
+
+    def test_rebuild_command(self):
+        self.post_reviews(2)
+        ReviewDay.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_review_stats', stdout=out)
+        self.assertIn('Rebuilt 1 review day(s); signed 0 review(s).', out.getvalue())
+        self.assertEqual(reviews.review_stats()['total'], 2)
+
+    @override_settings(REVIEW_RATE_LIMIT=2)
+    def test_posts_are_rate_limited_per_client(self):
+        for n in range(2):
+            self.assertEqual(self.client.post(self.url, {'name': 'Spam', 'comment': str(n)}).status_code, 302)
+        response = self.client.post(self.url, {'name': 'Spam', 'comment': 'again'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Review.objects.count(), 2)
+
+        other = self.client_class(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.post(self.url, {'name': 'Other', 'comment': 'Fine'}).status_code, 302)
+
+
+class NearDuplicateTest(TestCase):
+    """MinHash signatures and LSH buckets catch reworded spam"""
+
+    SPAM = 'Best car rental in Colombo!!! Cheap prices, visit my site for amazing discounts on every ride'
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('cars:about')
+        self.spam = Review.objects.create(name='Bot', comment=self.SPAM)
+
+    def test_signature_and_buckets_are_stored(self):
+        self.assertEqual(len(bytes(self.spam.signature)), minhash.NUM_PERM * 4)
+        self.assertEqual(ReviewBucket.objects.filter(review=self.spam).count(), minhash.BANDS)
+
+    def test_signature_is_the_universal_hash_in_exact_arithmetic(self):
+        hashes = [zlib.crc32(s.encode()) for s in minhash.shingles(self.SPAM)]
+        expected = [
+            min((int(a) * x + int(b)) % int(minhash.PRIME) & int(minhash.MAX_HASH) for x in hashes)
+            for a, b in zip(minhash._A, minhash._B)
+        ]
+        self.assertEqual(minhash.signature(self.SPAM).tolist(), expected)
+
+    def test_similarity_separates_variants_from_other_text(self):
+        sig = minhash.signature(self.SPAM)
+        variant = minhash.signature('best car rental in colombo! cheap prices - visit my site for amazing discounts on every trip')
+        other = minhash.signature('The Axio was spotless and pickup at the airport took five minutes.')
+        self.assertGreater(minhash.similarity(sig, variant), reviews.DUPLICATE_THRESHOLD)
+        self.assertLess(minhash.similarity(sig, other), 0.2)
+
+    def test_near_duplicate_post_is_rejected(self):
+        response = self.client.post(self.url, {'name': 'Bot 2', 'comment': self.SPAM.replace('ride', 'trip')})
+        self.assertContains(response, 'A very similar review has already been posted.')
+        self.assertEqual(Review.objects.count(), 1)
+        response = self.client.post(self.url, {'name': 'Jane', 'comment': 'Friendly staff and a clean car.'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_lookup_is_one_query_whatever_the_table_size(self):
+        Review.objects.bulk_create(
+            Review(name='Guest', comment=f'Trip number {n} went well', signature=None) for n in range(200)
+        )
+        reviews.sign_missing()
+        with self.assertNumQueries(1):
+            self.assertEqual(reviews.find_duplicate(Review(name='Bot', comment=self.SPAM + '!')), self.spam.id)
+
+    def test_edited_review_is_reindexed(self):
+        self.spam.comment = 'Lovely service, would rent again.'
+        self.spam.save()
+        self.assertIsNone(reviews.find_duplicate(Review(name='Bot', comment=self.SPAM)))
+        self.assertEqual(ReviewBucket.objects.filter(review=self.spam).count(), minhash.BANDS)
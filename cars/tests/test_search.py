@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from cars import search
+from cars.availability import availability_index
+from cars.models import Car
+from cars.tests.factories import make_car
+
+
+class FullTextSearchTest(TestCase):
+    """Ranked ?q= search backed by the FTS5 index"""
+
+    def setUp(self):
+        availability_index.reset()
+        self.vezel = make_car('Vezel', brand='Honda', location='Negombo', description='Hybrid SUV with sunroof')
+        self.axio = make_car('Axio', brand='Toyota', location='Negombo', description='Economical sedan')
+        self.premio = make_car('Premio', brand='Toyota', location='Kandy', description='Hybrid family sedan')
+
+    def test_fts_index_is_installed(self):
+        self.assertTrue(search.fts_enabled())
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(search.search_cars(Car.objects.all(), 'toyota hybrid'), [self.premio])
+
+    def test_prefix_match(self):
+        self.assertEqual(set(search.search_cars(Car.objects.all(), 'toy')), {self.axio, self.premio})
+
+    def test_ranking_prefers_name_match(self):
+        make_car('Fit', brand='Honda', description='Not a Vezel but close')
+        self.assertEqual(search.search_cars(Car.objects.all(), 'vezel')[0], self.vezel)
+
+    def test_filter_rank_and_limit_in_one_query(self):
+        make_car('Vitz', brand='Toyota', description='Toyota city car')
+        with self.assertNumQueries(1):
+            cars = search.search_cars(Car.objects.filter(available=True), 'toyota', limit=2)
+        self.assertEqual(len(cars), 2)
+        self.assertEqual(cars[0].name, 'Vitz')
+
+    def test_index_follows_updates_and_deletes(self):
+        Car.objects.filter(id=self.axio.id).update(location='Galle')
+        self.assertEqual(search.search_cars(Car.objects.all(), 'galle'), [self.axio])
+        self.premio.delete()
+        self.assertEqual(search.search_cars(Car.objects.all(), 'kandy'), [])
+
+    def test_fts_syntax_in_query_is_harmless(self):
+        self.assertEqual(search.search_cars(Car.objects.all(), 'NEAR("sedan" AND -'), [])
+
+    def test_search_respects_other_filters(self):
+        queryset = Car.objects.filter(location='Kandy')
+        self.assertEqual(search.search_cars(queryset, 'toyota'), [self.premio])
+
+    def test_icontains_fallback(self):
+        with mock.patch('cars.search.fts_enabled', return_value=False):
+            self.assertEqual(search.search_cars(Car.objects.all(), 'toyota hybrid'), [self.premio])
+
+    def test_car_list_query(self):
+        response = self.client.get(reverse('cars:car_list'), {'q': 'negombo'})
+        self.assertEqual(set(response.context['cars']), {self.vezel, self.axio})
+        self.assertIsNone(response.context['page'])
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'testpass123')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:cars_car_changelist'), {'q': 'sunroof'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.vezel])
@@ -9,8 +9,12 @@ urlpatterns = [
     path('cars/', views.CarListView.as_view(), name='car_list'),
     path('car/<int:car_id>/', views.car_detail, name='car_detail'),
     path('car/<int:car_id>/book/', views.book_car, name='book_car'),
+    path('api/cars/<int:car_id>/calendar/', views.car_calendar, name='car_calendar'),
     path('payment/<int:booking_id>/', views.payment, name='payment'),
+    path('group-payment/<int:group_id>/', views.group_payment, name='group_payment'),
+    path('api/fleet-bookings/', views.fleet_booking, name='fleet_booking'),
     path('receipt/<int:booking_id>/', views.receipt, name='receipt'),
+    path('receipt/<int:booking_id>/pdf/', views.receipt_pdf, name='receipt_pdf'),
     path('about/', views.about_view, name='about'),
     path('contact/', views.contact, name='contact'),
     path('services/', views.services, name='services'),
@@ -1,15 +1,29 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.safestring import mark_safe
+from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.views.generic import ListView, TemplateView
-from .models import Car, Booking, Payment, Review
-from datetime import datetime
-from decimal import Decimal
+from .models import Car, Booking, BookingGroup, Payment, Receipt, Review
+from . import calendars, facets, fragments, geo, mailqueue, pricing, receipts, reviews
+from .availability import availability_index
+from .detail import car_detail_payload
+from .idempotency import idempotent
+from .payments import (
+    ALREADY_PAID, HOLD_LOST, GatewayError, get_gateway, record_group_payment, record_payment, void_charge,
+)
+from .pagination import paginate_keyset
+from .search import search_cars, search_filter
+from .reservations import BookingConflict, booking_total, reserve, reserve_many
+import json
+from datetime import date, datetime, timedelta
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView, PasswordChangeView
 from django.contrib.auth.models import User
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from .forms import EmailAuthenticationForm, ProfileForm, CustomPasswordChangeForm
 from django.contrib.auth.decorators import login_required
 
@@ -22,15 +36,140 @@ class CarListView(ListView):
     model = Car
     template_name = 'cars/car_list.html'
     context_object_name = 'cars'
+    per_page = 24
+    radius_options = [5, 10, 25, 50, 100]
+    price_window_days = 30
+
+    def get_date_range(self):
+        start = self.request.GET.get('start', '').strip()
+        end = self.request.GET.get('end', '').strip()
+        if not (start and end):
+            return None
+        try:
+            start = datetime.strptime(start, "%Y-%m-%d").date()
+            end = datetime.strptime(end, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+        if end <= start:
+            return None
+        return start, end
+
+    def get_origin(self):
+        """Resolve ?near= against the gazetteer; returns (name, lat, lon) or None."""
+        return geo.resolve(self.request.GET.get('near', ''))
+
+    def get_radius(self):
+        try:
+            radius = float(self.request.GET.get('radius', ''))
+        except ValueError:
+            return None
+        return radius if 0 < radius <= 1000 else None
 
     def get_queryset(self):
-        return Car.objects.filter(available=True)
+        queryset = Car.objects.filter(available=True)
+        self.selected_facets = facets.selected_filters(self.request.GET)
+        queryset = facets.filter_cars(queryset, self.selected_facets)
+        self.date_range = self.get_date_range()
+        if self.date_range:
+            booked = availability_index.booked_car_ids(*self.date_range)
+            if booked:
+                queryset = queryset.exclude(id__in=booked)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        query = self.request.GET.get('q', '').strip()
+        near = self.request.GET.get('near', '').strip()
+        origin = self.get_origin() if near else None
+        radius = self.get_radius()
+        if origin:
+            # Proximity and search results are ordered and capped, not paged
+            page = None
+            queryset = self.object_list.filter(search_filter(query)) if query else self.object_list
+            _, lat, lon = origin
+            if radius:
+                object_list = geo.within(queryset, lat, lon, radius, limit=self.per_page)
+            else:
+                object_list = geo.nearest(queryset, lat, lon, self.per_page)
+        elif query:
+            page = None
+            object_list = search_cars(self.object_list, query)
+        else:
+            page = paginate_keyset(self.object_list, self.request.GET, self.per_page)
+            object_list = page.object_list
+        self.attach_prices(object_list)
+        context = super().get_context_data(object_list=object_list, **kwargs)
+        context['page'] = page
+        context['cards'] = fragments.render_cards(context['cars'])
+        context['query'] = query
+        context['near'] = near
+        context['radius'] = self.request.GET.get('radius', '')
+        context['radius_options'] = self.radius_options
+        context['origin'] = origin
+        context['near_error'] = bool(near and not origin)
+        context['search_start'] = self.request.GET.get('start', '')
+        context['search_end'] = self.request.GET.get('end', '')
+        context['date_range'] = self.date_range
+        counts = facets.facet_counts()
+        context['facets'] = [
+            {
+                'field': field,
+                'label': label,
+                'options': [(value, count, value in self.selected_facets.get(field, [])) for value, count in counts[field]],
+            }
+            for field, label in facets.FACETS
+        ]
+        context['has_filters'] = bool(query or near or self.selected_facets or self.date_range)
+        return context
+
+    def attach_prices(self, cars):
+        """Set ``from_price`` (and ``trip_total`` for a date search) on each car.
+
+        Without a date search the window is the next ``price_window_days``
+        and rentals are priced as single days, so long-stay discounts only
+        show once the customer picks dates.
+        """
+        if self.date_range:
+            start, end = self.date_range
+            prices = pricing.fleet_prices(cars, start, end)
+        else:
+            start = timezone.localdate()
+            prices = pricing.fleet_prices(cars, start, start + timedelta(days=self.price_window_days), stay_days=1)
+        for car in cars:
+            car.from_price, total = prices.get(car.id, (None, None))
+            car.trip_total = total if self.date_range else None
 
 def car_detail(request, car_id):
-    car = get_object_or_404(Car, id=car_id)
-    return render(request, 'cars/car_detail.html', {'car': car})
+    payload = car_detail_payload(car_id)
+    if payload is None:
+        raise Http404("No Car matches the given query.")
+    return render(request, 'cars/car_detail.html', payload)
+
+# ===== AVAILABILITY CALENDAR =====
+def car_calendar(request, car_id):
+    """Booked days for one car as JSON, for a ``year`` or one ``month`` of it.
+
+    Served from the per-car day bitmaps, so no Booking rows are read.
+    """
+    try:
+        year = int(request.GET.get("year") or timezone.localdate().year)
+        month = int(request.GET["month"]) if request.GET.get("month") else None
+        start = date(year, month or 1, 1)
+        end = date(year + month // 12, month % 12 + 1, 1) if month else date(year + 1, 1, 1)
+    except ValueError:
+        return JsonResponse({"error": "Invalid year or month."}, status=400)
+
+    if not Car.objects.filter(id=car_id).exists():
+        return JsonResponse({"error": "Car not found."}, status=404)
+
+    return JsonResponse({
+        "car_id": car_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "booked": [day.isoformat() for day in calendars.booked_dates(car_id, start, end)],
+    })
 
 # ===== BOOKING =====
+@idempotent('book_car')
 def book_car(request, car_id):
     car = get_object_or_404(Car, id=car_id)
 
@@ -54,88 +193,273 @@ def book_car(request, car_id):
         if days <= 0:
             return render(request, "cars/book_car.html", {"car": car, "error": "End date must be after start date."})
 
-        total_amount = Decimal(days) * car.price_per_day
+        total_amount = booking_total(car, start, end)
 
-        booking = Booking.objects.create(
-            car=car,
-            customer_name=customer_name,
-            customer_email=customer_email,
-            customer_phone=customer_phone,
-            start_date=start,
-            end_date=end,
-            total_amount=total_amount,
-        )
+        try:
+            booking = reserve(
+                car,
+                start,
+                end,
+                customer_name=customer_name,
+                customer_email=customer_email,
+                customer_phone=customer_phone,
+                total_amount=total_amount,
+            )
+        except BookingConflict:
+            return render(request, "cars/book_car.html", {"car": car, "error": "This car is already booked for the selected dates."})
 
         return redirect("cars:payment", booking_id=booking.id)
 
     return render(request, "cars/book_car.html", {"car": car})
 
+# ===== FLEET BOOKING API =====
+FLEET_BOOKING_MAX_ITEMS = 50
+
+
+def parse_fleet_items(raw_items):
+    """Return [(car, start, end)] for the request items, or raise ValueError."""
+    if not isinstance(raw_items, list) or not raw_items:
+        raise ValueError("items must be a non-empty list.")
+    if len(raw_items) > FLEET_BOOKING_MAX_ITEMS:
+        raise ValueError(f"At most {FLEET_BOOKING_MAX_ITEMS} cars can be booked at once.")
+
+    parsed = []
+    for item in raw_items:
+        try:
+            car_id = int(item["car_id"])
+            start = datetime.strptime(item["start_date"], "%Y-%m-%d").date()
+            end = datetime.strptime(item["end_date"], "%Y-%m-%d").date()
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Each item needs car_id, start_date and end_date (YYYY-MM-DD).")
+        if end <= start:
+            raise ValueError("End date must be after start date.")
+        parsed.append((car_id, start, end))
+
+    cars = Car.objects.in_bulk({car_id for car_id, _, _ in parsed})
+    missing = sorted({car_id for car_id, _, _ in parsed if car_id not in cars})
+    if missing:
+        raise ValueError(f"Unknown car ids: {missing}")
+    return [(cars[car_id], start, end) for car_id, start, end in parsed]
+
+
+@csrf_exempt
+def fleet_booking(request):
+    """Book several cars in one request and return one group payment handle.
+
+    Expects a JSON body with customer_name, customer_email, customer_phone and
+    items: [{car_id, start_date, end_date}, ...]. Either every car is held or
+    none is.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required."}, status=405)
+    try:
+        data = json.loads(request.body)
+        customer = {
+            field: str(data.get(field) or "").strip()
+            for field in ("customer_name", "customer_email", "customer_phone")
+        }
+        if not (customer["customer_name"] and customer["customer_email"]):
+            raise ValueError("customer_name and customer_email are required.")
+        items = parse_fleet_items(data.get("items"))
+    except (ValueError, AttributeError) as e:
+        message = "Invalid JSON body." if isinstance(e, json.JSONDecodeError) else str(e)
+        return JsonResponse({"error": message}, status=400)
+
+    try:
+        group = reserve_many(items, **customer)
+    except BookingConflict as e:
+        return JsonResponse({
+            "error": str(e),
+            "conflicts": [
+                {"car_id": car_id, "start_date": start.isoformat(), "end_date": end.isoformat()}
+                for car_id, start, end in e.conflicts
+            ],
+        }, status=409)
+
+    bookings = list(group.bookings.order_by("id"))
+    return JsonResponse({
+        "group_id": group.id,
+        "total_amount": str(group.total_amount),
+        "hold_expires_at": bookings[0].hold_expires_at.isoformat(),
+        "payment_url": request.build_absolute_uri(reverse("cars:group_payment", args=[group.id])),
+        "bookings": [
+            {
+                "id": b.id, "car_id": b.car_id, "start_date": b.start_date.isoformat(),
+                "end_date": b.end_date.isoformat(), "total_amount": str(b.total_amount),
+            }
+            for b in bookings
+        ],
+    }, status=201)
+
 # ===== PAYMENT =====
-def payment(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
+def card_details(data):
+    """Return (card, errors) from a payment form; ``card`` holds the gateway arguments."""
+    card = {
+        "card_number": (data.get("card_number") or "").replace(" ", ""),
+        "cardholder_name": (data.get("cardholder_name") or "").strip(),
+        "expiry_date": (data.get("expiry_date") or "").strip(),
+        "cvv": (data.get("cvv") or "").strip(),
+    }
+
+    errors = []
+    if len(card["card_number"]) < 13 or len(card["card_number"]) > 19:
+        errors.append("Invalid card number.")
+    if not card["cardholder_name"]:
+        errors.append("Cardholder name is required.")
+    if not card["expiry_date"] or len(card["expiry_date"]) != 5:
+        errors.append("Invalid expiry date format (MM/YY).")
+    if not card["cvv"] or len(card["cvv"]) < 3:
+        errors.append("Invalid CVV.")
+    return card, errors
+
+
+async def charge(card, amount):
+    """Authorize ``amount`` with the configured gateway; return (authorization, error)."""
+    try:
+        authorization = await get_gateway().authorize(amount, **card)
+    except GatewayError:
+        return None, "The payment service is unavailable. You have not been charged; please try again."
+    if not authorization.approved:
+        return None, authorization.message
+    return authorization, None
+
+
+async def unsettled(request, authorization, problem):
+    """Void a charge that ``record_payment`` refused and tell the customer what happened."""
+    refund = (
+        "The charge on your card has been cancelled." if await void_charge(authorization)
+        else "We could not cancel the charge automatically; our team will refund it."
+    )
+    if problem == ALREADY_PAID:
+        messages.info(request, f'This booking has already been paid. {refund}')
+    else:
+        messages.error(request, f'Your reservation hold expired and the car is no longer free for those dates. {refund}')
+
+# Async so that, served through car_rental.asgi, the gateway round trip does
+# not hold a worker thread; database work runs via sync_to_async.
+@idempotent('payment')
+async def payment(request, booking_id):
+    booking = await sync_to_async(get_object_or_404)(Booking.objects.select_related("car"), id=booking_id)
     
     if booking.is_paid:
         messages.info(request, 'This booking has already been paid.')
         return redirect("cars:receipt", booking_id=booking.id)
 
+    if booking.hold_expired:
+        messages.error(request, 'Your reservation hold has expired. Please book again.')
+        return redirect("cars:book_car", car_id=booking.car_id)
+
     if request.method == "POST":
-        card_number = (request.POST.get("card_number") or "").replace(" ", "")
-        cardholder_name = (request.POST.get("cardholder_name") or "").strip()
-        expiry_date = (request.POST.get("expiry_date") or "").strip()
-        cvv = (request.POST.get("cvv") or "").strip()
-
-        errors = []
-        if len(card_number) < 13 or len(card_number) > 19:
-            errors.append("Invalid card number.")
-        if not cardholder_name:
-            errors.append("Cardholder name is required.")
-        if not expiry_date or len(expiry_date) != 5:
-            errors.append("Invalid expiry date format (MM/YY).")
-        if not cvv or len(cvv) < 3:
-            errors.append("Invalid CVV.")
+        card, errors = card_details(request.POST)
+        if not errors:
+            authorization, error = await charge(card, booking.total_amount)
+            errors = [error] if error else []
 
         if errors:
-            return render(request, "cars/payment.html", {
+            return await sync_to_async(render)(request, "cars/payment.html", {
                 "booking": booking, 
                 "errors": errors
             })
 
-        Payment.objects.create(
-            booking=booking,
-            cardholder_name=cardholder_name,
-            card_last4=card_number[-4:],
-            amount=booking.total_amount,
+        result = await sync_to_async(record_payment)(
+            booking, authorization, card["cardholder_name"], card["card_number"][-4:],
         )
-
-        booking.is_paid = True
-        booking.save()
+        if result in (ALREADY_PAID, HOLD_LOST):
+            # Paid by a concurrent submit, or the hold went during the authorization
+            await unsettled(request, authorization, result)
+            if result == ALREADY_PAID:
+                return redirect("cars:receipt", booking_id=booking.id)
+            return redirect("cars:book_car", car_id=booking.car_id)
 
         messages.success(request, 'Payment processed successfully!')
         return redirect("cars:receipt", booking_id=booking.id)
 
-    return render(request, "cars/payment.html", {"booking": booking})
+    return await sync_to_async(render)(request, "cars/payment.html", {"booking": booking})
+
+@idempotent('group_payment')
+async def group_payment(request, group_id):
+    group = await sync_to_async(get_object_or_404)(BookingGroup, id=group_id)
+    bookings = [b async for b in group.bookings.select_related("car").order_by("id")]
+    unpaid = [b for b in bookings if not b.is_paid]
+
+    if not unpaid:
+        messages.info(request, 'This booking has already been paid.')
+        return redirect("cars:receipt_list")
+
+    if any(b.hold_expired for b in unpaid):
+        messages.error(request, 'Your reservation hold has expired. Please book again.')
+        return redirect("cars:car_list")
+
+    if request.method == "POST":
+        card, errors = card_details(request.POST)
+        if not errors:
+            authorization, error = await charge(card, sum(b.total_amount for b in unpaid))
+            errors = [error] if error else []
+        if errors:
+            return await sync_to_async(render)(request, "cars/group_payment.html", {
+                "group": group, "bookings": bookings, "errors": errors,
+            })
+
+        result = await sync_to_async(record_group_payment)(
+            unpaid, authorization, card["cardholder_name"], card["card_number"][-4:],
+        )
+        if result in (ALREADY_PAID, HOLD_LOST):
+            await unsettled(request, authorization, result)
+            return redirect("cars:receipt_list" if result == ALREADY_PAID else "cars:car_list")
+        messages.success(request, 'Payment processed successfully!')
+        return redirect("cars:receipt_list")
+
+    return await sync_to_async(render)(request, "cars/group_payment.html", {"group": group, "bookings": bookings})
 
 # ===== RECEIPT =====
 def receipt(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
-    payment = Payment.objects.filter(booking=booking).first()
+    # Paid bookings are served from the stored receipt in a single lookup
+    html = Receipt.objects.filter(booking_id=booking_id).values_list('html', flat=True).first()
+    if html is None:
+        booking = get_object_or_404(Booking.objects.select_related('car', 'payment'), id=booking_id)
+        html = receipts.issue(booking.id) if booking.is_paid else None
+        if html is None:
+            return render(request, 'cars/receipt.html', {
+                'booking': booking,
+                'payment': getattr(booking, 'payment', None),
+                'booking_id': booking.id,
+            })
     return render(request, 'cars/receipt.html', {
-        'booking': booking,
-        'payment': payment,
+        'receipt_html': mark_safe(html),
+        'booking_id': booking_id,
     })
 
+def receipt_pdf(request, booking_id):
+    pdf = Receipt.objects.filter(booking_id=booking_id).values_list('pdf', flat=True).first()
+    if not pdf:
+        # Not rendered by the background job yet, or paid before receipts were stored
+        pdf = receipts.issue_pdf(booking_id)
+        if pdf is None:
+            raise Http404("This booking has not been paid.")
+    response = HttpResponse(bytes(pdf), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="receipt-{booking_id}.pdf"'
+    return response
+
 # ===== ABOUT =====
 def about_view(request):
+    status = 200
     if request.method == "POST":
-        name = request.POST.get('name', '').strip()
-        comment = request.POST.get('comment', '').strip()
-        if name and comment:
-            Review.objects.create(name=name, comment=comment)
-            messages.success(request, 'Thank you for your review!')
-            return redirect('cars:about')
-
-    reviews = Review.objects.all().order_by('-created_at')
-    return render(request, 'cars/about.html', {'reviews': reviews})
+        if not reviews.allow_review(request):
+            messages.error(request, 'You have posted several reviews recently. Please try again later.')
+            status = 429
+        else:
+            name = request.POST.get('name', '').strip()
+            comment = request.POST.get('comment', '').strip()
+            if name and comment:
+                review = Review(name=name, comment=comment)
+                if reviews.find_duplicate(review) is None:
+                    review.save()
+                    messages.success(request, 'Thank you for your review!')
+                    return redirect('cars:about')
+                messages.error(request, 'A very similar review has already been posted.')
+
+    page, stats = reviews.review_page(request.GET)
+    return render(request, 'cars/about.html', {'reviews': page, 'page': page, 'stats': stats}, status=status)
 
 # ===== CONTACT =====
 def contact(request):
@@ -146,19 +470,11 @@ def contact(request):
         message = request.POST.get('message')
 
         if name and email and subject and message:
-            try:
-                full_message = f"Name: {name}\nEmail: {email}\nSubject: {subject}\n\nMessage:\n{message}"
-                send_mail(
-                    subject=f'Contact Form: {subject}',
-                    message=full_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[settings.CONTACT_EMAIL],
-                    fail_silently=False,
-                )
-                messages.success(request, 'Thank you! We will contact you soon.')
-                return redirect('cars:contact')
-            except Exception:
-                messages.error(request, 'Error sending message.')
+            # Queued, not sent: the send_queued_mail worker talks to the mail server
+            full_message = f"Name: {name}\nEmail: {email}\nSubject: {subject}\n\nMessage:\n{message}"
+            mailqueue.enqueue(f'Contact Form: {subject}', full_message, [settings.CONTACT_EMAIL], reply_to=email)
+            messages.success(request, 'Thank you! We will contact you soon.')
+            return redirect('cars:contact')
         else:
             messages.error(request, 'Please fill all fields.')
 
@@ -226,11 +542,13 @@ def login_view(request):
     
 @login_required
 def payment_list(request):
-    payments = Payment.objects.filter(booking__customer_email=request.user.email)
-    return render(request, 'cars/payment_list.html', {'payments': payments})
+    payments = Payment.objects.filter(booking__customer_email=request.user.email).select_related('booking__car')
+    page = paginate_keyset(payments, request.GET, field='timestamp')
+    return render(request, 'cars/payment_list.html', {'payments': page, 'page': page})
 
 @login_required
 def receipt_list(request):
-    bookings = Booking.objects.filter(customer_email=request.user.email)
-    return render(request, 'cars/receipt_list.html', {'bookings': bookings})
+    bookings = Booking.objects.filter(customer_email=request.user.email).select_related('car')
+    page = paginate_keyset(bookings, request.GET)
+    return render(request, 'cars/receipt_list.html', {'bookings': page, 'page': page})
 
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
+
+    def ready(self):
+        # Compile the intent table and map the trained model once per process
+        # rather than on the first chat message
+        from . import classifier, intents
+        intents.matcher()
+        classifier.get_classifier()
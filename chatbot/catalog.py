@@ -0,0 +1,137 @@
+import re
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from cars import geo
+from cars.fleet import fleet_index
+
+MAX_LISTED = 5
+SEATS = re.compile(r'\b(\d{1,2})\s*-?\s*seat(?:er)?s?\b')
+PRICE = re.compile(r'\b(?:under|below|less than|cheaper than|max(?:imum)?|up to|within|budget(?: of)?)\s*\$?\s*(\d+(?:\.\d+)?)')
+DATE = re.compile(r'\b(\d{4}-\d{2}-\d{2})\b')
+# Nouns only: "hire" and "rent" alone are as likely to be about drivers or flats
+CATALOG_WORDS = re.compile(r'\b(?:cars?|vehicles?|seaters?|suvs?|vans?|fleet|available|availability|rentals?)\b')
+# Follow-ups refine the previous search of the conversation instead of starting a new one
+CHEAPER = re.compile(r'\b(?:cheaper|less expensive|lower price)\b')
+BIGGER = re.compile(r'\b(?:bigger|larger|more seats|more room)\b')
+FOLLOW_UP = re.compile(r'^(?:and|what about|how about)\b|\b(?:instead|ones|those|them)\b|' + CHEAPER.pattern + '|' + BIGGER.pattern)
+
+
+def _dates(message):
+    """Return (start, end) for "today", "tomorrow", "this weekend" or two ISO dates, else (None, None)."""
+    today = timezone.localdate()
+    found = DATE.findall(message)
+    if len(found) >= 2:
+        try:
+            start, end = date.fromisoformat(found[0]), date.fromisoformat(found[1])
+        except ValueError:
+            return None, None
+        return (start, end) if start < end else (None, None)
+    if 'tomorrow' in message:
+        return today + timedelta(days=1), today + timedelta(days=2)
+    if 'weekend' in message:
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        return saturday, saturday + timedelta(days=2)
+    if 'today' in message:
+        return today, today + timedelta(days=1)
+    return None, None
+
+
+def _named(message, names):
+    """The longest of ``names`` that occurs in ``message`` as whole words, ignoring case."""
+    padded = f' {geo.normalize(message)} '
+    for name in sorted(names, key=len, reverse=True):
+        if name and f' {geo.normalize(name)} ' in padded:
+            return name
+    return None
+
+
+def parse(message, context=None):
+    """Turn a lower-cased chat message into fleet search filters.
+
+    Returns None when the message is not about the catalog, i.e. besides
+    any dates it names no filter and no catalog word such as "car" or
+    "available": "what's the date today" is not a search. With the
+    conversation ``context`` kept by ``answer``, a follow-up ("what about
+    cheaper ones?", "and in kandy?") is merged into the previous search.
+    """
+    query = {}
+    seats = SEATS.search(message)
+    if seats:
+        query['min_seats'] = int(seats.group(1))
+    price = PRICE.search(message)
+    if price:
+        query['max_price'] = float(price.group(1))
+    brand = _named(message, fleet_index.brand_names())
+    if brand:
+        query['brand'] = brand
+    place = geo.resolve(message)
+    place = place[0] if place else _named(message, fleet_index.place_names())
+    if place:
+        query['place'] = place
+    start, end = _dates(message)
+    if start:
+        query['start'], query['end'] = start, end
+    previous = (context or {}).get('query')
+    if previous is not None and FOLLOW_UP.search(message):
+        refined = _refine(message, previous, query, context)
+        # "thanks for those" changes nothing and is left to the intent table
+        if refined != previous:
+            return refined
+    if not query.keys() - {'start', 'end'} and not CATALOG_WORDS.search(message):
+        return None
+    return query
+
+
+def _refine(message, previous, query, context):
+    """``previous`` with the filters named in ``message``, made cheaper or bigger than the cars last listed."""
+    refined = {**previous, **query}
+    if CHEAPER.search(message) and 'max_price' not in query:
+        limit = context.get('top_price') or previous.get('max_price')
+        if limit:
+            refined['max_price'] = round(limit - 0.01, 2)
+    if BIGGER.search(message) and 'min_seats' not in query:
+        seats = context.get('top_seats') or previous.get('min_seats')
+        if seats:
+            refined['min_seats'] = seats + 1
+    return refined
+
+
+def describe(query):
+    parts = []
+    if query.get('brand'):
+        parts.append(query['brand'])
+    parts.append('cars')
+    if query.get('min_seats'):
+        parts.append(f"with {query['min_seats']}+ seats")
+    if query.get('place'):
+        parts.append(f"in {query['place']}")
+    if query.get('max_price') is not None:
+        parts.append(f"up to ${query['max_price']:g}/day")
+    if query.get('start'):
+        parts.append(f"free {query['start']:%b %d} to {query['end']:%b %d}")
+    return ' '.join(parts)
+
+
+def answer(query, context=None):
+    """Reply listing the cheapest cars that match ``query``, from the in-memory fleet index.
+
+    The search and the dearest price and largest seat count listed are
+    recorded in ``context`` for follow-up questions.
+    """
+    cars = fleet_index.search(**query)
+    wanted = describe(query)
+    if context is not None:
+        listed = cars[:MAX_LISTED]
+        context['query'] = query
+        context['top_price'] = max((float(car['price']) for car in listed), default=None)
+        context['top_seats'] = max((car['seats'] for car in listed), default=None)
+    if not cars:
+        return f"Sorry, I couldn't find any {wanted} right now. Try fewer seats, a higher budget or another location."
+    lines = [
+        f"{car['brand']} {car['name']} ({car['year']}, {car['seats']} seats, {car['place']}) - ${car['price']}/day"
+        for car in cars[:MAX_LISTED]
+    ]
+    more = f"\n...and {len(cars) - MAX_LISTED} more." if len(cars) > MAX_LISTED else ''
+    return f"I found {len(cars)} match(es) for {wanted}:\n" + '\n'.join(lines) + more
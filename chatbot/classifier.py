@@ -0,0 +1,154 @@
+import re
+import struct
+import zipfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+WORD = re.compile(r'\w+')
+PHRASES_PATH = Path(__file__).resolve().parent / 'data' / 'intent_phrases.txt'
+# Below this cosine similarity to every centroid a message has no intent
+MIN_SIMILARITY = 0.3
+# Label of small talk that matches no intent
+OTHER = 'other'
+# Label of questions about the fleet, answered by chatbot.catalog rather than an intent
+CATALOG = 'catalog'
+
+
+def features(text):
+    """Hashed word unigrams and bigrams of ``text`` as a uint32 array (with repeats)."""
+    words = WORD.findall(text.lower())
+    grams = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+    return np.array([zlib.crc32(gram.encode()) for gram in grams], dtype=np.uint32)
+
+
+def read_phrases(path=PHRASES_PATH):
+    """Return [(label, phrase)] from a file of ``label<TAB>phrase`` lines; ``#`` starts a comment."""
+    phrases = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            label, sep, phrase = line.partition('\t')
+            if not sep or not phrase.strip():
+                raise ValueError(f"{path}:{number}: expected 'label<TAB>phrase'")
+            phrases.append((label.strip(), phrase.strip()))
+    return phrases
+
+
+# ===== TRAINING =====
+def train(phrases):
+    """Build a TF-IDF nearest-centroid model; returns the arrays saved in the .npz.
+
+    ``vocab`` holds the sorted feature hashes, ``idf`` their weights and
+    ``centroids`` one L2-normalised mean TF-IDF vector per label.
+    """
+    labels = sorted({label for label, _ in phrases})
+    grams = [features(phrase) for _, phrase in phrases]
+    vocab = np.unique(np.concatenate(grams))
+    counts = np.zeros((len(phrases), len(vocab)), dtype=np.float32)
+    for row, hashed in enumerate(grams):
+        np.add.at(counts[row], np.searchsorted(vocab, hashed), 1)
+    df = np.count_nonzero(counts, axis=0)
+    idf = (np.log((1 + len(phrases)) / (1 + df)) + 1).astype(np.float32)
+    vectors = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0) * idf
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    label_of = np.array([labels.index(label) for label, _ in phrases])
+    centroids = np.stack([vectors[label_of == n].mean(axis=0) for n in range(len(labels))])
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    return {
+        'labels': np.array(labels),
+        'vocab': vocab,
+        'idf': idf,
+        'centroids': centroids.astype(np.float32),
+    }
+
+
+def save(arrays, path):
+    # Uncompressed, so load() can memory-map each member in place
+    np.savez(path, **arrays)
+
+
+# ===== LOADING =====
+def load(path):
+    """Memory-map every array of an uncompressed .npz file.
+
+    ``np.load`` ignores ``mmap_mode`` for .npz archives, so each member's
+    .npy header is read at its offset inside the zip and the data is
+    mapped with ``np.memmap``: pages are shared between worker processes
+    and only read from disk when a message touches them.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: {info.filename} is compressed and cannot be memory-mapped")
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            arrays[info.filename[:-len('.npy')]] = np.memmap(
+                path, dtype=dtype, mode='r', shape=shape, offset=f.tell(), order='F' if fortran_order else 'C',
+            )
+    return IntentClassifier(**arrays)
+
+
+class IntentClassifier:
+    """Nearest-centroid intent classifier over hashed TF-IDF features."""
+
+    def __init__(self, labels, vocab, idf, centroids):
+        self.labels = labels
+        self.vocab = vocab
+        self.idf = idf
+        self.centroids = centroids
+
+    def classify(self, message):
+        """Return (label, similarity) of the closest centroid; the label is None below MIN_SIMILARITY.
+
+        The message becomes a sparse vector (indices of known features and
+        their TF-IDF weights), scored against all centroids with one dot
+        product over just those columns.
+        """
+        hashed = features(message)
+        positions = np.minimum(np.searchsorted(self.vocab, hashed), len(self.vocab) - 1)
+        known = positions[self.vocab[positions] == hashed]
+        if not len(known):
+            return None, 0.0
+        index, counts = np.unique(known, return_counts=True)
+        weights = (1 + np.log(counts)) * self.idf[index]
+        scores = self.centroids[:, index] @ (weights / np.linalg.norm(weights))
+        best = int(np.argmax(scores))
+        if scores[best] < MIN_SIMILARITY:
+            return None, float(scores[best])
+        return str(self.labels[best]), float(scores[best])
+
+
+@lru_cache(maxsize=1)
+def get_classifier():
+    """The model at ``CHATBOT_INTENT_MODEL``, loaded once per process; None if it has not been trained."""
+    path = getattr(settings, 'CHATBOT_INTENT_MODEL', None)
+    if not path or not Path(path).exists():
+        return None
+    return load(path)
+
+
+def predict(message):
+    """Label of ``message`` from the configured model; None without one or when it is not confident."""
+    model = get_classifier()
+    return model.classify(message)[0] if model else None
+
+
+@receiver(setting_changed)
+def reset_classifier(setting, **kwargs):
+    if setting == 'CHATBOT_INTENT_MODEL':
+        get_classifier.cache_clear()
@@ -0,0 +1,124 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_STORE = {'BACKEND': 'chatbot.conversations.LocalConversationStore'}
+# Cookie (and POST field) carrying the chat session id
+CHAT_ID = 'chat_id'
+CHAT_ID_FORMAT = re.compile(r'[0-9a-f]{32}')
+
+
+def new_chat_id():
+    return uuid.uuid4().hex
+
+
+def valid_chat_id(value):
+    return bool(value) and CHAT_ID_FORMAT.fullmatch(value) is not None
+
+
+class LocalConversationStore:
+    """Conversation context of each chat, kept in this process.
+
+    An ``OrderedDict`` in least-recently-used order: reading or writing a
+    chat moves it to the end, entries idle for longer than ``ttl`` seconds
+    are dropped from the front, and past ``max_conversations`` the least
+    recently used chat is evicted, so memory stays bounded however many
+    chats are open. Contexts are small dicts of the last search filters.
+    """
+
+    def __init__(self, max_conversations=10000, ttl=1800):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _expire(self, now):
+        while self._entries:
+            chat_id, (expires, _) = next(iter(self._entries.items()))
+            if expires > now:
+                break
+            del self._entries[chat_id]
+
+    def get(self, chat_id):
+        """The context stored for ``chat_id``, or an empty dict."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(chat_id)
+            if entry is None:
+                return {}
+            self._entries[chat_id] = (now + self.ttl, entry[1])
+            self._entries.move_to_end(chat_id)
+            return dict(entry[1])
+
+    def set(self, chat_id, context):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._entries[chat_id] = (now + self.ttl, dict(context))
+            self._entries.move_to_end(chat_id)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+
+    def delete(self, chat_id):
+        with self._lock:
+            self._entries.pop(chat_id, None)
+
+    def __len__(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._entries)
+
+
+class CacheConversationStore:
+    """Conversation context in a Django cache, shared by every worker.
+
+    Point ``alias`` at a Redis or Memcached cache for multi-process
+    deployments; the cache's own eviction and the ``ttl`` timeout bound
+    its memory.
+    """
+
+    def __init__(self, alias='default', ttl=1800, key_prefix='chatbot:conversation:'):
+        self.alias = alias
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+
+    def _key(self, chat_id):
+        return f'{self.key_prefix}{chat_id}'
+
+    def get(self, chat_id):
+        cache = caches[self.alias]
+        context = cache.get(self._key(chat_id))
+        if context is None:
+            return {}
+        # Sliding expiry, as in the local store
+        cache.touch(self._key(chat_id), self.ttl)
+        return context
+
+    def set(self, chat_id, context):
+        caches[self.alias].set(self._key(chat_id), dict(context), timeout=self.ttl)
+
+    def delete(self, chat_id):
+        caches[self.alias].delete(self._key(chat_id))
+
+
+@lru_cache(maxsize=1)
+def get_store():
+    """Return the store configured by ``settings.CHATBOT_CONVERSATIONS``."""
+    config = getattr(settings, 'CHATBOT_CONVERSATIONS', DEFAULT_STORE)
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    if setting == 'CHATBOT_CONVERSATIONS':
+        get_store.cache_clear()
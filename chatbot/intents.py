@@ -0,0 +1,129 @@
+import json
+import random
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from . import classifier
+
+INTENTS_PATH = Path(__file__).resolve().parent / 'data' / 'intents.json'
+
+
+WORD = re.compile(r'\w+')
+# Trie keys that are not characters of a pattern
+END = 'end'
+STEM = 'stem'
+
+
+def trie_regex(node):
+    """Regex for a character trie; longer continuations are tried before a pattern ends."""
+    branches = []
+    for key in sorted(k for k in node if len(k) == 1):
+        branches.append((r'\s+' if key == ' ' else re.escape(key)) + trie_regex(node[key]))
+    if STEM in node:
+        branches.append(r'\w*\b')
+    elif END in node:
+        branches.append(r'\b')
+    return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+
+class IntentMatcher:
+    """An ordered intent table compiled into one regex.
+
+    Patterns are whole words or phrases; a trailing ``*`` matches any word
+    starting with the stem ("thank*" matches "thanks"). All patterns are
+    merged into a character trie and emitted as a single regex tried at
+    every word start, so one scan of the message finds every pattern it
+    contains and the cost hardly depends on the size of the table. The
+    earliest intent in the table wins, as it did in the old if-chain.
+    """
+
+    def __init__(self, intents):
+        self.intents = intents
+        self.phrases = {}
+        self.stems = {}
+        trie = {}
+        for n, intent in enumerate(intents):
+            for pattern in intent['patterns']:
+                words = WORD.findall(pattern.lower())
+                text = ' '.join(words)
+                node = trie
+                for char in text:
+                    node = node.setdefault(char, {})
+                if pattern.endswith('*'):
+                    node[STEM] = True
+                    stems = self.stems.setdefault(' '.join(words[:-1]), {})
+                    stems[words[-1]] = min(stems.get(words[-1], n), n)
+                else:
+                    node[END] = True
+                    self.phrases[text] = min(self.phrases.get(text, n), n)
+        self.regex = re.compile(rf'\b(?=({trie_regex(trie)}))') if trie else None
+        self.cases = [IntentMatcher(intent['cases']) if intent.get('cases') else None for intent in intents]
+
+    def lookup(self, text):
+        """Lowest intent index among the patterns that match a leading run of words of ``text``."""
+        words = text.split()
+        best = len(self.intents)
+        for k in range(1, len(words) + 1):
+            head = ' '.join(words[:k - 1])
+            best = min(best, self.phrases.get(' '.join(words[:k]), best))
+            for stem, n in self.stems.get(head, {}).items():
+                if n < best and words[k - 1].startswith(stem):
+                    best = n
+        return best
+
+    def match(self, message):
+        """Return the index of the first intent whose patterns occur in ``message``, or None."""
+        if self.regex is None:
+            return None
+        none = best = len(self.intents)
+        for found in self.regex.finditer(message):
+            best = min(best, self.lookup(found.group(1)))
+            if best == 0:
+                break
+        return best if best < none else None
+
+    def intent(self, message, name=None):
+        """Return the matching intent (or the matching case within it), or None.
+
+        With ``name``, the intent is the one of that name rather than the
+        first match, and only its cases are matched against ``message``.
+        """
+        if name is None:
+            n = self.match(message)
+        else:
+            n = next((i for i, intent in enumerate(self.intents) if intent['name'] == name), None)
+        if n is None:
+            return None
+        if self.cases[n] is not None:
+            return self.cases[n].intent(message) or self.intents[n]
+        return self.intents[n]
+
+
+@lru_cache(maxsize=1)
+def intent_table():
+    with open(INTENTS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def matcher():
+    return IntentMatcher(intent_table()['intents'])
+
+
+def reply(message, label=None):
+    """Return a response for a lower-cased message, or a default one if no intent matches.
+
+    The trained classifier decides when it is confident (its "other" label
+    means small talk); otherwise the keyword table does. ``label`` is the
+    classifier's answer when the caller has already run it.
+    """
+    if label is None:
+        label = classifier.predict(message)
+    if label == classifier.OTHER:
+        intent = None
+    else:
+        # A "catalog" message that named no search has no intent of its own
+        intent = matcher().intent(message, name=None if label == classifier.CATALOG else label)
+    responses = intent['responses'] if intent else intent_table()['default']
+    return random.choice(responses)
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot.intents import IntentMatcher, intent_table
+
+WORDS = ['car', 'rent', 'colombo', 'price', 'book', 'seats', 'week', 'airport', 'driver', 'cheap', 'family',
+         'trip', 'the', 'a', 'for', 'please', 'need', 'tomorrow', 'negombo', 'van', 'cost', 'is', 'there', 'any']
+SYLLABLES = ['ka', 'ro', 'mi', 'ten', 'vo', 'lu', 'sa', 'dra', 'pe', 'no', 'ki', 'zu', 'bel', 'ta', 'fi', 'gor']
+
+
+def chain_intent(message, chain):
+    """The old get_response if-chain: substring tests, intent by intent."""
+    for name, patterns in chain:
+        if any(pattern in message for pattern in patterns):
+            return name
+    return None
+
+
+class Command(BaseCommand):
+    help = "Compare the compiled intent regex against the old substring if-chain"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=20_000)
+        parser.add_argument('--extra-intents', type=int, default=200,
+                            help="Synthetic intents appended to the table to show how each approach scales")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        intents = list(intent_table()['intents'])
+        for n in range(options['extra_intents']):
+            patterns = [''.join(rng.choices(SYLLABLES, k=3)) for _ in range(4)]
+            intents.append({'name': f'extra_{n}', 'patterns': patterns, 'responses': ['-']})
+        chain = [(i['name'], [p.rstrip('*') for p in i['patterns']]) for i in intents]
+
+        keywords = [p.rstrip('*') for i in intents[:12] for p in i['patterns']]
+        messages = []
+        for n in range(options['messages']):
+            words = rng.choices(WORDS, k=rng.randint(4, 14))
+            if n % 4 == 0:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+            messages.append(' '.join(words))
+
+        compiled_started = time.perf_counter()
+        matcher = IntentMatcher(intents)
+        compile_time = time.perf_counter() - compiled_started
+
+        started = time.perf_counter()
+        for message in messages:
+            chain_intent(message, chain)
+        chain_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for message in messages:
+            matcher.match(message)
+        compiled_time = time.perf_counter() - started
+
+        differ = sum(
+            1 for message in messages
+            if chain_intent(message, chain) != (intents[matcher.match(message)]['name'] if matcher.match(message) is not None else None)
+        )
+        count = len(messages)
+        self.stdout.write(f"{len(intents)} intents, {count} messages (one in four mentions an intent)")
+        self.stdout.write(f"  if-chain:        {chain_time / count * 1e6:8.2f} us/message")
+        self.stdout.write(f"  compiled regex:  {compiled_time / count * 1e6:8.2f} us/message "
+                          f"(compiled once in {compile_time * 1000:.1f} ms)")
+        self.stdout.write(f"  speed-up:        {chain_time / compiled_time:8.1f}x")
+        self.stdout.write(f"  {differ} message(s) classified differently: the chain matches inside words "
+                          f"(\"hi\" in \"this\"), the compiled table only whole words")
@@ -1,3 +1,276 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from cars.availability import availability_index
+from cars.fleet import fleet_index
+from cars.tests.factories import make_booking, make_car
+from chatbot import catalog, classifier, conversations, intents
+from chatbot.conversations import CacheConversationStore, LocalConversationStore
+from chatbot.intents import IntentMatcher, intent_table, matcher
+
+
+def intent_name(message):
+    intent = matcher().intent(message)
+    return intent['name'] if intent else None
+
+
+class IntentMatcherTest(SimpleTestCase):
+    """The compiled intent table"""
+
+    def test_table_intents(self):
+        self.assertEqual(intent_name('hey there'), 'greeting')
+        self.assertEqual(intent_name('so how   are things'), 'how_are_you')
+        self.assertEqual(intent_name('thanks a lot'), 'thanks')
+        self.assertEqual(intent_name('what is your favourite colour'), 'favorite_color')
+        self.assertEqual(intent_name('my favorite car'), 'favorite')
+        self.assertIsNone(intent_name('i need a car in colombo'))
+
+    def test_whole_words_only(self):
+        # The old substring chain answered these with a greeting and the time
+        self.assertIsNone(intent_name('is this thing on'))
+        self.assertIsNone(intent_name('today'))
+
+    def test_earliest_intent_wins_wherever_it_appears(self):
+        self.assertEqual(intent_name('thanks for the help, bye'), 'help')
+        self.assertEqual(intent_name('can you help'), 'help')
+
+    def test_overlapping_patterns(self):
+        table = IntentMatcher([
+            {'name': 'a', 'patterns': ['rent a car']},
+            {'name': 'b', 'patterns': ['rent*', 'car hire']},
+            {'name': 'c', 'patterns': ['rent']},
+        ])
+        self.assertEqual(table.match('i want to rent a car'), 0)
+        self.assertEqual(table.match('rental a car'), 1)
+        self.assertEqual(table.match('rent a van'), 1)
+        self.assertEqual(table.match('any car hire'), 1)
+        self.assertIsNone(table.match('car'))
+
+    def test_every_intent_has_responses(self):
+        table = intent_table()
+        self.assertTrue(table['default'])
+        for intent in table['intents']:
+            self.assertTrue(intent['patterns'] and intent['responses'], intent['name'])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_intents', '--messages', '200', '--extra-intents', '10', stdout=out)
+        self.assertIn('21 intents, 200 messages', out.getvalue())
+
+
+class CatalogChatTest(TestCase):
+    """Catalog questions are answered from the in-memory fleet index"""
+
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        fleet_index.reset()
+        self.noah = make_car('Noah', seats=7, location='12 Sea Street, Negombo', price_per_day=Decimal('55.00'))
+        self.hiace = make_car('HiAce', seats=12, location='Negombo', price_per_day=Decimal('90.00'))
+        self.fit = make_car('Fit', brand='Honda', seats=5, location='Kandy', price_per_day=Decimal('35.00'))
+
+    def chat(self, message):
+        return self.client.post(reverse('chat'), {'message': message}).json()['message']
+
+    def test_parse(self):
+        self.assertEqual(
+            catalog.parse('any 7-seaters in negombo under $60?'),
+            {'min_seats': 7, 'max_price': 60.0, 'place': 'Negombo'},
+        )
+        self.assertEqual(catalog.parse('got a honda?'), {'brand': 'Honda'})
+        self.assertIsNone(catalog.parse('how are you'))
+        # Dates alone do not make a search
+        self.assertIsNone(catalog.parse("what's the date today"))
+        self.assertIsNone(catalog.parse('how is the weather this weekend'))
+        self.assertIsNone(catalog.parse('i want to hire a driver'))
+        self.assertEqual(catalog.parse('any cars tomorrow?').keys(), {'start', 'end'})
+
+    def test_answer_lists_matching_cars_without_queries(self):
+        fleet_index.load()
+        with self.assertNumQueries(0):
+            reply = self.chat('Any 7-seaters in Negombo under $60?')
+        self.assertIn('Toyota Noah (2020, 7 seats, Negombo) - $55.00/day', reply)
+        self.assertNotIn('HiAce', reply)
+        self.assertIn('Honda Fit', self.chat('cheapest honda'))
+
+    def test_no_match_and_small_talk(self):
+        self.assertIn("couldn't find any cars with 20+ seats", self.chat('a 20 seater please'))
+        self.assertIn(self.chat('Goodbye!'), intent_table()['intents'][7]['responses'])
+
+    def test_classifier_overrules_catalog_keywords(self):
+        # "kandy" and "today" would make a catalog search; the shipped model says this is the time
+        self.assertIsNotNone(catalog.parse("what's the date today in kandy"))
+        self.assertIn(self.chat("What's the date today in Kandy?"), intent_table()['intents'][4]['responses'])
+        self.assertIn(self.chat("What's the date today?"), intent_table()['intents'][4]['responses'])
+        self.assertIn('Honda Fit', self.chat('i need a car in kandy this weekend'))
+
+    def test_booked_cars_are_left_out_for_dates(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        make_booking(self.fit, start_date=tomorrow, end_date=tomorrow + timedelta(days=1), total_amount=Decimal('35.00'), is_paid=True)
+        availability_index.reset()
+        self.assertIn("couldn't find any Honda cars", self.chat('is a honda available tomorrow?'))
+        self.assertIn('Honda Fit', self.chat('is a honda available today?'))
+
+    def test_car_changes_refresh_the_index(self):
+        fleet_index.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fit.available = False
+            self.fit.save()
+            make_car('Premio', location='Kandy', price_per_day=Decimal('40.00'))
+        reply = self.chat('cars in kandy')
+        self.assertIn('Toyota Premio', reply)
+        self.assertNotIn('Honda Fit', reply)
+
+
+class IntentClassifierTest(SimpleTestCase):
+    """The TF-IDF nearest-centroid model and its memory-mapped .npz"""
+
+    PHRASES = [
+        ('greeting', 'hello there'), ('greeting', 'good morning'),
+        ('time', 'what time is it'), ('time', 'what is the date today'),
+        ('other', 'i had a great day'), ('other', 'we went to the beach'),
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'model.npz')
+
+    def test_saved_model_is_memory_mapped(self):
+        classifier.save(classifier.train(self.PHRASES), self.path)
+        model = classifier.load(self.path)
+        self.assertIsInstance(model.centroids, np.memmap)
+        self.assertEqual(model.classify('hello, good morning')[0], 'greeting')
+        self.assertEqual(model.classify('what is the time')[0], 'time')
+        self.assertEqual(model.classify('zebra xylophone'), (None, 0.0))
+
+    def test_compressed_archive_is_refused(self):
+        np.savez_compressed(self.path, **classifier.train(self.PHRASES))
+        with self.assertRaises(ValueError):
+            classifier.load(self.path)
+
+    def test_shipped_model_fixes_keyword_misfires(self):
+        model = classifier.get_classifier()
+        self.assertEqual(model.classify("what's the date")[0], 'time')
+        self.assertEqual(model.classify('i had a great day')[0], 'other')
+        # The keyword table alone answers this with the time reply
+        self.assertIn(intents.reply('i had a great day'), intent_table()['default'])
+
+    def test_classification_takes_under_a_millisecond(self):
+        model = classifier.get_classifier()
+        started = time.perf_counter()
+        for _ in range(200):
+            model.classify('hey, can you help me find the weather for tomorrow please')
+        self.assertLess((time.perf_counter() - started) / 200, 0.001)
+
+    def test_keywords_are_used_without_a_model(self):
+        with override_settings(CHATBOT_INTENT_MODEL=self.path):
+            self.assertIsNone(classifier.get_classifier())
+            self.assertIn(intents.reply('i had a great day'), intent_table()['intents'][4]['responses'])
+
+    def test_train_command(self):
+        out = StringIO()
+        call_command('train_intents', '--output', self.path, stdout=out)
+        self.assertIn('Trained 13 labels', out.getvalue())
+        self.assertEqual(classifier.load(self.path).classify('thank you so much')[0], 'thanks')
+
+
+class ConversationTest(TestCase):
+    """Follow-up questions use the context stored for the chat session"""
+
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        fleet_index.reset()
+        conversations.get_store.cache_clear()
+        self.addCleanup(conversations.get_store.cache_clear)
+        make_car('Noah', seats=7, location='Negombo', price_per_day=Decimal('55.00'))
+        make_car('HiAce', seats=12, location='Negombo', price_per_day=Decimal('90.00'))
+        make_car('Premio', seats=5, location='Negombo', price_per_day=Decimal('45.00'))
+        make_car('Fit', brand='Honda', seats=5, location='Kandy', price_per_day=Decimal('35.00'))
+
+    def chat(self, message):
+        return self.client.post(reverse('chat'), {'message': message}).json()['message']
+
+    def test_follow_ups_refine_the_previous_search(self):
+        self.assertIn('3 match(es) for cars in Negombo', self.chat('cars in negombo'))
+        reply = self.chat('what about cheaper ones?')
+        self.assertIn('up to $89.99/day', reply)
+        self.assertNotIn('HiAce', reply)
+        self.assertIn('Toyota Noah', reply)
+        self.chat('hello')
+        reply = self.chat('and in kandy?')
+        self.assertIn('Honda Fit', reply)
+        self.assertIn('cars in Kandy up to $89.99/day', reply)
+
+    def test_bigger_ones(self):
+        self.chat('cars under $60')
+        reply = self.chat('any bigger ones?')
+        self.assertIn('with 8+ seats', reply)
+        self.assertIn("couldn't find", reply)
+
+    def test_chats_are_kept_apart(self):
+        self.chat('cars in kandy')
+        other = self.client_class()
+        response = other.post(reverse('chat'), {'message': 'what about cheaper ones?'}).json()
+        self.assertIn(response['message'], intent_table()['default'])
+        self.assertTrue(conversations.valid_chat_id(response['chat_id']))
+        # The id can also travel in the request body instead of the cookie
+        reply = self.client_class().post(
+            reverse('chat'), {'message': 'and in negombo?', 'chat_id': self.client.cookies['chat_id'].value},
+        ).json()['message']
+        self.assertIn('3 match(es) for cars in Negombo', reply)
+
+    @override_settings(CHATBOT_CONVERSATIONS={'BACKEND': 'chatbot.conversations.CacheConversationStore'})
+    def test_cache_store_shares_context_between_workers(self):
+        self.chat('cars in kandy')
+        chat_id = self.client.cookies['chat_id'].value
+        self.assertEqual(CacheConversationStore().get(chat_id)['query'], {'place': 'Kandy'})
+        CacheConversationStore().delete(chat_id)
+        self.assertEqual(CacheConversationStore().get(chat_id), {})
+
+
+class LocalConversationStoreTest(SimpleTestCase):
+    """The bounded in-process LRU"""
+
+    def test_least_recently_used_chat_is_evicted(self):
+        store = LocalConversationStore(max_conversations=2)
+        store.set('a', {'query': {}})
+        store.set('b', {'query': {}})
+        store.get('a')
+        store.set('c', {'query': {}})
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get('b'), {})
+        self.assertEqual(store.get('a'), {'query': {}})
+
+    def test_idle_chats_expire(self):
+        store = LocalConversationStore(ttl=60)
+        now = time.monotonic()
+        with mock.patch('chatbot.conversations.time.monotonic', return_value=now):
+            store.set('a', {'query': {}})
+        with mock.patch('chatbot.conversations.time.monotonic', return_value=now + 59):
+            self.assertTrue(store.get('a'))
+        with mock.patch('chatbot.conversations.time.monotonic', return_value=now + 118):
+            self.assertTrue(store.get('a'))
+        with mock.patch('chatbot.conversations.time.monotonic', return_value=now + 180):
+            self.assertEqual(store.get('a'), {})
+            self.assertEqual(len(store), 0)
+
+    def test_memory_stays_bounded(self):
+        store = LocalConversationStore(max_conversations=100)
+        for n in range(10000):
+            store.set(conversations.new_chat_id(), {'query': {'min_seats': n}})
+        self.assertEqual(len(store), 100)